@@ -0,0 +1,555 @@
+# -*- coding: utf-8 -*-
+"""
+Git Commit Extractor - 效能基準測試。
+
+產生幾個合成的本機儲存庫(大量小檔、少數大型二進位檔、autocrlf / text=auto、
+深層目錄搬移、長歷史),量測匯出與 commit 清單相關函式的耗時、吞吐量與記憶體峰值,
+並可與先前存下的基準比較:
+
+    python bench_git_diff_export.py --save-baseline bench_baseline.json   # 改動前
+    python bench_git_diff_export.py --baseline bench_baseline.json        # 改動後
+
+每個測項都在獨立的子行程執行,記憶體峰值互不影響。產生的儲存庫會留在工作資料夾
+(--work)重複使用,只有第一次執行需要建立。
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import git_diff_export as gde
+
+# Bump when the generated repositories change, so cached ones are rebuilt.
+SCENARIO_VERSION = 2
+
+DEFAULT_WORK_DIR = os.path.join(tempfile.gettempdir(), "git_export_bench")
+
+# A case this much slower (or faster) than the baseline is flagged, in percent.
+DEFAULT_THRESHOLD = 10.0
+
+EPOCH = 1_600_000_000
+
+
+# --------------------------------------------------------------------------
+# Synthetic repositories
+# --------------------------------------------------------------------------
+class _FastImport:
+    """Feeds a `git fast-import` stream; far quicker than one `git commit` per step."""
+
+    def __init__(self, path):
+        self.proc = subprocess.Popen(["git", "fast-import", "--quiet"], cwd=path,
+                                     stdin=subprocess.PIPE)
+        self.marks = 0
+        self.when = EPOCH
+
+    def _data(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.proc.stdin.write(b"data %d\n" % len(data))
+        self.proc.stdin.write(data)
+        self.proc.stdin.write(b"\n")
+
+    def commit(self, message, files=None, deletes=(), renames=(),
+               ref="refs/heads/main", parent=None, merge=None):
+        """Write one commit; files maps path -> bytes. Returns its mark."""
+        self.marks += 1
+        self.when += 60
+        w = self.proc.stdin.write
+        w(f"commit {ref}\nmark :{self.marks}\n"
+          f"committer Bench <bench@example.com> {self.when} +0000\n".encode())
+        self._data(message)
+        if parent is not None:
+            w(f"from :{parent}\n".encode())
+        if merge is not None:
+            w(f"merge :{merge}\n".encode())
+        for old, new in renames:
+            w(f"R {old} {new}\n".encode())
+        for path in deletes:
+            w(f"D {path}\n".encode())
+        for path, data in (files or {}).items():
+            w(f"M 100644 inline {path}\n".encode())
+            self._data(data)
+        return self.marks
+
+    def close(self):
+        self.proc.stdin.close()
+        if self.proc.wait():
+            raise RuntimeError("git fast-import 失敗")
+
+
+def _git(path, *args):
+    subprocess.run(["git", *args], cwd=path, check=True, stdout=subprocess.DEVNULL)
+
+
+def _init(path):
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    _git(path, "init", "-q")
+    _git(path, "symbolic-ref", "HEAD", "refs/heads/main")
+    _git(path, "config", "user.name", "Bench")
+    _git(path, "config", "user.email", "bench@example.com")
+    return _FastImport(path)
+
+
+def _text(rng, size, eol="\n"):
+    words = ("alpha", "beta", "gamma", "delta", "return", "static", "int", "void",
+             "struct", "#include", "if", "else", "0x1F", "{", "}", ";")
+    lines, total = [], 0
+    while total < size:
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(3, 12)))
+        lines.append(line)
+        total += len(line) + len(eol)
+    return (eol.join(lines) + eol).encode()
+
+
+def build_small(path, scale, rng):
+    """Many small text files: a root commit, then an edit touching a tenth of them."""
+    n = max(100, int(20000 * scale))
+    imp = _init(path)
+    files = {f"src/m{i // 500:03d}/file{i:05d}.c": _text(rng, rng.randint(200, 4000))
+             for i in range(n)}
+    imp.commit("add small files", files)
+    names = sorted(files)
+    edits = {p: _text(rng, rng.randint(200, 4000)) for p in rng.sample(names, n // 10)}
+    edits.update({f"src/new/file{i:05d}.c": _text(rng, 800) for i in range(n // 100)})
+    imp.commit("edit small files", edits, deletes=rng.sample(names, n // 100))
+    imp.close()
+
+
+def build_binaries(path, scale, rng):
+    """A few large incompressible files, two of which are replaced."""
+    size = max(1 << 20, int((48 << 20) * scale))
+    imp = _init(path)
+    imp.commit("add binaries", {f"assets/blob{i}.bin": os.urandom(size) for i in range(4)})
+    imp.commit("replace binaries", {f"assets/blob{i}.bin": os.urandom(size)
+                                    for i in range(2)})
+    imp.close()
+
+
+def build_eol(path, scale, rng):
+    """Text stored with LF, checked out as CRLF through autocrlf and text=auto.
+
+    Single-line files grow by exactly one byte on checkout, the case where a reader
+    that trusts the unfiltered size mistakes the file's own newline for the end.
+    """
+    n = max(50, int(3000 * scale))
+    imp = _init(path)
+    files = {".gitattributes": b"* text=auto\n*.bin binary\n", "doc/empty.txt": b"\n"}
+    files.update({f"doc/page{i:05d}.txt": _text(rng, rng.randint(1000, 8000))
+                  for i in range(n)})
+    files.update({f"doc/line{i:05d}.txt": f"v{i}\n".encode() for i in range(n // 5)})
+    imp.commit("add text", files)
+    names = sorted(files)[2:]
+    edits = {p: _text(rng, rng.randint(1000, 8000)) if "page" in p else b"y\n"
+             for p in rng.sample(names, n // 5)}
+    edits.update({f"doc/new{i:05d}.txt": f"n{i}\n".encode() for i in range(n // 20)})
+    imp.commit("edit text", edits)
+    imp.close()
+    _git(path, "config", "core.autocrlf", "true")
+    # A checkout, so git versions without GIT_ATTR_SOURCE still find .gitattributes.
+    _git(path, "reset", "-q", "--hard")
+
+
+def build_renames(path, scale, rng):
+    """A deep directory tree moved elsewhere, a few files edited on the way."""
+    n = max(50, int(2000 * scale))
+    deep = "/".join(f"level{d}" for d in range(12))
+    imp = _init(path)
+    files = {f"old/{deep}/unit{i:05d}.c": _text(rng, rng.randint(500, 3000))
+             for i in range(n)}
+    imp.commit("add deep tree", files)
+    edits = {}
+    for p in rng.sample(sorted(files), n // 20):
+        edits["new/" + p[len("old/"):]] = files[p] + b"/* edited */\n"
+    imp.commit("move deep tree", edits, renames=[("old", "new")])
+    imp.close()
+
+
+def build_history(path, scale, rng):
+    """A long history of one-file commits with a merged side branch every 50 commits."""
+    n = max(200, int(5000 * scale))
+    imp = _init(path)
+    head = imp.commit("root", {f"f{i:03d}.txt": _text(rng, 300) for i in range(200)})
+    for i in range(1, n):
+        if i % 50 == 0:
+            side = head
+            for j in range(3):
+                side = imp.commit(f"side {i}.{j}", {f"side{j}.txt": _text(rng, 200)},
+                                  ref="refs/heads/side", parent=side)
+            head = imp.commit(f"merge {i}", parent=head, merge=side)
+        else:
+            head = imp.commit(f"change {i}", {f"f{rng.randrange(200):03d}.txt":
+                                              _text(rng, 300)}, parent=head)
+    imp.close()
+
+
+def build_worktree(path, scale, rng):
+    """A checked-out repository with modified, deleted, staged and untracked files."""
+    n = max(100, int(5000 * scale))
+    imp = _init(path)
+    files = {f"app/part{i // 200:02d}/code{i:05d}.py": _text(rng, rng.randint(300, 3000))
+             for i in range(n)}
+    imp.commit("base", files)
+    imp.close()
+    _git(path, "reset", "-q", "--hard")
+    names = sorted(files)
+    for p in rng.sample(names, n // 5):
+        with open(os.path.join(path, p), "ab") as f:
+            f.write(b"# local edit\n")
+    for p in rng.sample(names, n // 50):
+        if os.path.exists(os.path.join(path, p)):
+            os.remove(os.path.join(path, p))
+    for i in range(n // 20):
+        p = os.path.join(path, "scratch", f"new{i:05d}.py")
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        with open(p, "wb") as f:
+            f.write(_text(rng, 500))
+    _git(path, "add", "app/part00")
+
+
+SCENARIOS = {
+    "small": build_small,
+    "binaries": build_binaries,
+    "eol": build_eol,
+    "renames": build_renames,
+    "history": build_history,
+    "worktree": build_worktree,
+}
+
+
+def prepare(work, scale, names):
+    """Build (or reuse) the scenario repositories under work."""
+    for name in names:
+        path = os.path.join(work, "repos", name)
+        stamp = os.path.join(work, "repos", f"{name}.ready")
+        key = f"{SCENARIO_VERSION} {scale}"
+        try:
+            with open(stamp, encoding="utf-8") as f:
+                if f.read() == key and os.path.isdir(path):
+                    continue
+        except OSError:
+            pass
+        print(f"建立測試儲存庫：{name} …", flush=True)
+        start = time.perf_counter()
+        SCENARIOS[name](path, scale, random.Random(name))
+        with open(stamp, "w", encoding="utf-8") as f:
+            f.write(key)
+        print(f"  完成({time.perf_counter() - start:.1f} 秒)", flush=True)
+
+
+# --------------------------------------------------------------------------
+# Cases
+# --------------------------------------------------------------------------
+def _quiet():
+    return gde.Reporter(log_fn=lambda msg, tag="info": None)
+
+
+def _export_result(stats):
+    report = stats["report"]["counters"]
+    return {"files": stats["files"], "bytes": report.get("bytes_written", 0)}
+
+
+def _fresh(out):
+    if os.path.exists(out):
+        shutil.rmtree(out)
+    os.makedirs(out)
+
+
+def _verify_checkout(ctx, rev):
+    """Export rev and compare ORG/ and MOD/ byte for byte with real checkouts.
+
+    The export runs three times with many writer threads, each spawning git with its
+    own GIT_ATTR_SOURCE; none of that may be left behind in the shared repo.git.
+    """
+    repo = ctx["repo"]
+    out = os.path.join(ctx["out"], "verify")
+    for _ in range(3):
+        _fresh(out)
+        stats = gde.extract_commit(repo, rev, out, _quiet(), workers=16)
+        if repo.git.environment():
+            raise AssertionError(f"匯出後 repo.git 仍帶有環境變數：{repo.git.environment()}")
+    commit = repo.commit(rev)
+    checkout = os.path.join(ctx["out"], "checkout")
+    compared = 0
+    for side, tree in (("ORG", commit.parents[0]), ("MOD", commit)):
+        _git(repo.working_tree_dir, "worktree", "add", "-q", "--detach", checkout,
+             tree.hexsha)
+        try:
+            root = os.path.join(stats["out_dir"], side)
+            for folder, _dirs, names in os.walk(root):
+                for name in names:
+                    rel = os.path.relpath(os.path.join(folder, name), root)
+                    with open(os.path.join(root, rel), "rb") as a, \
+                            open(os.path.join(checkout, rel), "rb") as b:
+                        if a.read() != b.read():
+                            raise AssertionError(f"{side}/{rel} 與 checkout 的內容不同")
+                    compared += 1
+        finally:
+            _git(repo.working_tree_dir, "worktree", "remove", "--force", checkout)
+    if not compared:
+        raise AssertionError("沒有可比對的檔案")
+
+
+def _case_commit(scenario, rev, overwrite=False, verify=False):
+    """verify compares one export with a real checkout before anything is timed."""
+    def setup(ctx):
+        if verify and "verified" not in ctx:
+            _verify_checkout(ctx, rev)
+            ctx["verified"] = True
+        if not overwrite or "primed" not in ctx:
+            _fresh(ctx["out"])
+        if overwrite and "primed" not in ctx:
+            # The timed runs then re-export into an up-to-date folder.
+            gde.extract_commit(ctx["repo"], rev, ctx["out"], _quiet())
+            ctx["primed"] = True
+
+    def run(ctx):
+        return _export_result(gde.extract_commit(ctx["repo"], rev, ctx["out"], _quiet(),
+                                                 overwrite=overwrite))
+    return scenario, setup, run
+
+
+def _case_range():
+    def setup(ctx):
+        _fresh(ctx["out"])
+        if "revs" not in ctx:
+            shas = ctx["repo"].git.rev_list("--first-parent", "-300", "HEAD").split()
+            ctx["revs"] = shas[::-1]
+
+    def run(ctx):
+        return _export_result(gde.extract_commit_range(ctx["repo"], ctx["revs"],
+                                                       ctx["out"], _quiet()))
+    return "history", setup, run
+
+
+def _case_worktree():
+    def run(ctx):
+        return _export_result(gde.extract_working_tree(ctx["repo"], ctx["out"], _quiet()))
+    return "worktree", lambda ctx: _fresh(ctx["out"]), run
+
+
+def _case_order(step):
+    def setup(ctx):
+        if "chain" not in ctx:
+            shas = ctx["repo"].git.rev_list("--first-parent", "-1500", "HEAD").split()
+            chain = [ctx["repo"].commit(s) for s in shas[::step][:500]]
+            random.Random(step).shuffle(chain)
+            ctx["chain"] = chain
+
+    def run(ctx):
+        gde.order_commit_chain(ctx["chain"], ctx["repo"])
+        return {"items": len(ctx["chain"])}
+    return "history", setup, run
+
+
+def _case_log_walk():
+    def run(ctx):
+        return {"items": sum(1 for _ in gde.iter_log(ctx["repo"], "HEAD"))}
+    return "history", lambda ctx: None, run
+
+
+def _case_cache(warm):
+    def setup(ctx):
+        root = os.path.join(ctx["out"], "cache")
+        if not warm and os.path.exists(root):
+            shutil.rmtree(root)
+        ctx["root"] = root
+        if warm:
+            with gde.CommitCache(ctx["repo"], root) as cache:
+                cache.update(ctx["repo"], ctx["repo"].head.commit.hexsha)
+
+    def run(ctx):
+        tip = ctx["repo"].head.commit.hexsha
+        with gde.CommitCache(ctx["repo"], ctx["root"]) as cache:
+            if warm:
+                return {"items": sum(1 for _ in cache.walk(tip))}
+            cache.update(ctx["repo"], tip)
+            return {}
+    return "history", setup, run
+
+
+CASES = {
+    "commit_small_root": _case_commit("small", "HEAD~1"),
+    "commit_small_edit": _case_commit("small", "HEAD"),
+    "commit_small_resync": _case_commit("small", "HEAD~1", overwrite=True),
+    "commit_binaries": _case_commit("binaries", "HEAD"),
+    "commit_eol": _case_commit("eol", "HEAD", verify=True),
+    "commit_renames": _case_commit("renames", "HEAD"),
+    "range_history": _case_range(),
+    "worktree": _case_worktree(),
+    "order_chain": _case_order(1),
+    "order_chain_gaps": _case_order(3),
+    "log_walk": _case_log_walk(),
+    "cache_build": _case_cache(warm=False),
+    "cache_walk": _case_cache(warm=True),
+}
+
+
+def _peak_rss_mb(children=False):
+    """Peak resident memory of this process (or of its waited-for children), in MB."""
+    try:
+        import resource
+    except ImportError:     # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children
+                              else resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def run_case(work, name, repeat):
+    """Run one case repeat times in this process; return its result dict."""
+    scenario, setup, run = CASES[name]
+    ctx = {"repo": gde.Repo(os.path.join(work, "repos", scenario)),
+           "out": os.path.join(work, "out", name)}
+    times, result = [], None
+    for _ in range(repeat):
+        setup(ctx)
+        start = time.perf_counter()
+        result = run(ctx)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    result.update({
+        "seconds": round(best, 4),
+        "median": round(statistics.median(times), 4),
+        "peak_rss_mb": _peak_rss_mb(),
+        "git_peak_rss_mb": _peak_rss_mb(children=True),
+    })
+    if "files" in result:
+        result["files_per_s"] = round(result["files"] / best, 1)
+        result["mb_per_s"] = round(result.pop("bytes") / best / 1e6, 2)
+    if "items" in result:
+        result["items_per_s"] = round(result["items"] / best, 1)
+    return result
+
+
+def _run_isolated(work, name, repeat):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--work", work,
+                           "--repeat", str(repeat), "--case", name],
+                          stdout=subprocess.PIPE, text=True)
+    if proc.returncode:
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# --------------------------------------------------------------------------
+# Report
+# --------------------------------------------------------------------------
+def _git_version():
+    try:
+        return subprocess.run(["git", "--version"], stdout=subprocess.PIPE,
+                              text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def _throughput(r):
+    if "files_per_s" in r:
+        return f"{r['files_per_s']:>10.0f} 檔/s {r['mb_per_s']:>8.2f} MB/s"
+    if "items_per_s" in r:
+        return f"{r['items_per_s']:>10.0f} 筆/s {'':>13}"
+    return f"{'':>27}"
+
+
+def print_report(results, baseline, threshold):
+    base = (baseline or {}).get("cases", {})
+    print()
+    print(f"{'測項':<22}{'秒(最佳)':>10}{'中位數':>9}  {'吞吐量':<27}"
+          f"{'RSS MB':>8}{'git MB':>8}  比較基準")
+    slower = 0
+    for name, r in results.items():
+        if r is None:
+            print(f"{name:<22}{'失敗':>10}")
+            continue
+        note = ""
+        old = base.get(name)
+        if old and old.get("seconds"):
+            delta = (r["seconds"] - old["seconds"]) / old["seconds"] * 100
+            note = f"{old['seconds']:.3f} → {delta:+.1f}%"
+            if delta > threshold:
+                note += "  ▲ 較慢"
+                slower += 1
+            elif delta < -threshold:
+                note += "  ▼ 較快"
+        rss = "-" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.0f}"
+        git_rss = "-" if r["git_peak_rss_mb"] is None else f"{r['git_peak_rss_mb']:.0f}"
+        print(f"{name:<22}{r['seconds']:>10.3f}{r['median']:>9.3f}  {_throughput(r)}"
+              f"{rss:>8}{git_rss:>8}  {note}")
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Git Commit Extractor 效能基準測試")
+    parser.add_argument("--work", default=DEFAULT_WORK_DIR,
+                        help=f"測試儲存庫與輸出的工作資料夾(預設 {DEFAULT_WORK_DIR})")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="測試資料量倍率;0.1 可快速試跑")
+    parser.add_argument("--repeat", type=int, default=3, help="每個測項執行次數,取最佳值")
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), metavar="CASE",
+                        help="只跑指定的測項:" + "、".join(CASES))
+    parser.add_argument("--baseline", help="與此基準檔比較")
+    parser.add_argument("--save-baseline", metavar="PATH", help="把這次結果存成基準檔")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"與基準相差超過此百分比時標示(預設 {DEFAULT_THRESHOLD:g})")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.work, args.case, args.repeat)))
+        return 0
+    if args.prepare:
+        prepare(args.work, args.scale, args.prepare)
+        return 0
+
+    names = args.only or list(CASES)
+    # Building the repositories holds large files in memory. Linux carries a process's
+    # peak RSS over into the children it starts, so that happens in a child as well.
+    subprocess.run([sys.executable, os.path.abspath(__file__), "--work", args.work,
+                    "--scale", str(args.scale), "--prepare",
+                    *sorted({CASES[n][0] for n in names})], check=True)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("scale") != args.scale:
+            print(f"⚠ 基準檔的資料量倍率為 {baseline.get('meta', {}).get('scale')},"
+                  f"與這次的 {args.scale} 不同,比較結果僅供參考")
+
+    results = {}
+    for name in names:
+        print(f"執行 {name} …", flush=True)
+        results[name] = _run_isolated(args.work, name, args.repeat)
+    slower = print_report(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        data = {
+            "meta": {
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "app_version": gde.APP_VERSION,
+                "python": platform.python_version(),
+                "git": _git_version(),
+                "platform": platform.platform(),
+                "scale": args.scale,
+                "repeat": args.repeat,
+            },
+            "cases": results,
+        }
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"\n已存成基準檔：{args.save_baseline}")
+    failed = sum(1 for r in results.values() if r is None)
+    return 1 if failed or slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,40 +11,61 @@ Git Commit Extractor
         MOD/                變更後的檔案(修改版本)
         commit_message.txt  commit 資訊 + 變更檔案清單
         changes.patch       unified diff(可關閉)
+        export_stats.json   各階段耗時與統計(ExportStats)
 """
 
+import collections
+import contextlib
+import hashlib
+import heapq
+import itertools
 import json
 import os
-import queue
 import re
 import shutil
 import subprocess
 import sys
+import tempfile
 import threading
-import tkinter as tk
-import tkinter.font as tkfont
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime
-from tkinter import filedialog
 
-import ttkbootstrap as ttk
-from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-from ttkbootstrap.tooltip import ToolTip
-from git import Repo, InvalidGitRepositoryError, NoSuchPathError
+from git import Blob, Repo, InvalidGitRepositoryError, NoSuchPathError
 
 APP_NAME = "Git Commit Extractor"
 APP_VERSION = "2.3"
 CONFIG_FILE = os.path.expanduser("~/.git_export_tool_config.json")
 MAX_HISTORY = 12
 
-DEFAULT_THEME = "darkly"
-THEME_CHOICES = ["darkly", "cyborg", "superhero", "solar", "vapor",
-                 "flatly", "cosmo", "litera", "minty", "sandstone", "yeti"]
-COMMIT_LIMITS = ["50", "100", "200", "500", "1000"]
+# Per-repository commit metadata caches (CommitCache), next to CONFIG_FILE.
+COMMIT_CACHE_DIR = os.path.expanduser("~/.git_export_tool_cache")
 
-UI_FONT_CANDIDATES = ["Microsoft JhengHei UI", "Microsoft JhengHei",
-                      "Noto Sans TC", "Segoe UI"]
-MONO_FONT_CANDIDATES = ["Cascadia Mono", "Consolas", "Courier New"]
+# Changes written concurrently by _write_changes (blob reads overlap disk latency).
+WRITE_WORKERS = 4
+
+# Blob content is streamed to disk in pieces of this size, never read whole.
+COPY_CHUNK = 1 << 20
+
+# Shared blob cache (BlobStore) kept directly under the output folder.
+BLOB_STORE_DIR = ".blob_store"
+
+# What ORG/ and MOD/ of an export folder hold (ExportManifest), inside that folder.
+MANIFEST_FILE = ".export_manifest.json"
+
+# Which commits an output folder already holds (ExportIndex), directly under it.
+EXPORT_INDEX_FILE = ".export_index.json"
+
+# Full logs of GUI exports (BufferedReporter log_path), directly under the output folder.
+# Profiles taken by profile_export go there as well.
+EXPORT_LOG_DIR = ".export_logs"
+
+# Set to anything but "" or "0" to profile every export (see profile_export).
+PROFILE_ENV = "GIT_EXPORT_PROFILE"
+
+# The empty tree, diffed against to export a root commit.
+EMPTY_TREE_SHA1 = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+EMPTY_TREE_SHA256 = "6ef19b41225c5369f1c104d45d8d85efa9b057b53b14b4b9b939dd74decc5321"
 
 # Files/folders that identify a directory as produced by this tool.
 EXPORT_MARKERS = ("ORG", "MOD", "commit_message.txt")
@@ -76,8 +97,205 @@ def ensure_parent(path):
         os.makedirs(long_path(parent), exist_ok=True)
 
 
-def write_blob(dest, blob, repo=None, attr_source=None, reporter=None):
-    """Write a blob out the way `git checkout` would.
+_RAW_STREAM_LOCK = threading.Lock()
+
+
+class _GitProcess:
+    """A git subprocess with piped stdin/stdout and a background-drained stderr.
+
+    stderr is a pipe nobody else reads; draining it means chatty commands (git-lfs
+    progress, rename-limit warnings) can never fill the buffer and stall the process.
+    """
+
+    def __init__(self, repo, command, *args, attr_source=None):
+        run = getattr(repo.git, command.replace("-", "_"))
+        kw = dict(as_process=True, istream=subprocess.PIPE)
+        if attr_source:
+            # Only this process gets the variable. Writer threads share repo.git, so
+            # custom_environment (state on that object) would leak between spawns.
+            kw["env"] = {"GIT_ATTR_SOURCE": str(attr_source)}
+        self.proc = run(*args, **kw)
+        self.stdin = self.proc.proc.stdin
+        self.stdout = self.proc.proc.stdout
+        self._errors = []
+        self._drainer = threading.Thread(target=self._drain, daemon=True)
+        self._drainer.start()
+
+    def _drain(self):
+        for line in iter(self.proc.proc.stderr.readline, b""):
+            self._errors.append(line)
+            del self._errors[:-20]
+
+    def chunks(self):
+        # read1 hands over whatever git has written so far (up to COPY_CHUNK) instead
+        # of waiting for a full chunk, so slow producers (a long log walk) stream.
+        return iter(lambda: self.stdout.read1(COPY_CHUNK), b"")
+
+    def finish(self, kill=False):
+        """Wait for the process. Returns (exit code, last line written to stderr)."""
+        try:
+            if kill:
+                self.proc.proc.kill()
+            else:
+                self.stdin.close()
+            self.proc.proc.wait()
+        except Exception:
+            pass
+        self._drainer.join(1)
+        # The last line is git's own verdict ("fatal: <path>: smudge filter ... failed").
+        lines = b"".join(self._errors).decode("utf-8", "replace").strip().splitlines()
+        return self.proc.proc.returncode, (lines[-1] if lines else "")
+
+
+_BATCH_PROBES = {}
+_BATCH_PROBE_LOCK = threading.Lock()
+
+
+def _batch_sizes_filtered(repo):
+    """True when `git cat-file --batch --filters` announces the size AFTER filtering.
+
+    Decided once per git version by converting a two-line probe blob with autocrlf in
+    a scratch repository; the user's repository and its configuration are not touched.
+    If the probe itself fails the answer is False, which is slow but always correct.
+    """
+    try:
+        version = repo.git.version_info
+    except Exception:
+        return False
+    with _BATCH_PROBE_LOCK:
+        if version not in _BATCH_PROBES:
+            _BATCH_PROBES[version] = _probe_batch_sizes(repo.git.GIT_PYTHON_GIT_EXECUTABLE)
+        return _BATCH_PROBES[version]
+
+
+def _probe_batch_sizes(executable):
+    content = b"a\nb\n"
+    # Keep global attributes (a `* -text` somewhere) from turning the conversion off.
+    config = ["-c", "core.autocrlf=true", "-c", "core.attributesFile=" + os.devnull]
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            def git(*args, data=None):
+                return subprocess.run([executable or "git", *config, *args], cwd=scratch,
+                                      input=data, stdout=subprocess.PIPE,
+                                      stderr=subprocess.DEVNULL, check=True).stdout
+            git("init", "-q")
+            sha = git("hash-object", "-w", "--stdin", data=content).strip()
+            reply = git("cat-file", "--batch", "--filters", data=sha + b" probe.txt\n")
+    except (OSError, subprocess.SubprocessError):
+        return False
+    header, _, body = reply.partition(b"\n")
+    fields = header.split()
+    return (len(fields) == 3 and body == b"a\r\nb\r\n\n"
+            and fields[2] == str(len(body) - 1).encode())
+
+
+class BlobReader:
+    """Long-lived `git cat-file --batch --filters` processes, one per attr_source.
+
+    Spawning `git cat-file --filters` for every blob costs ~25 ms per file, which is
+    nearly all of the export time on large commits. In batch mode one process answers
+    `<sha> <path>` requests for as long as it lives and applies the same smudge/eol
+    filters, so ORG/ and MOD/ stay byte-identical to a real checkout.
+
+    GIT_ATTR_SOURCE is fixed when a process starts, hence one process per attr_source.
+    A process that dies (e.g. a required filter failed) is dropped and respawned on
+    the next request; the failing blob raises so write_blob can fall back and warn.
+
+    Older git (seen with 2.39) announces the size of the blob BEFORE filtering, so the
+    header of a converted file (autocrlf, text=auto) cannot be used to find its end.
+    Whether this git can be trusted is probed once (see _batch_sizes_filtered); if
+    not, every blob gets a process of its own, which reads to EOF instead.
+
+    processes, bytes_read and seconds count what the reader has cost so far (see
+    ExportStats).
+    """
+
+    def __init__(self, repo):
+        self.repo = repo
+        self._procs = {}
+        self._batch = None      # decided on the first request
+        self._lock = threading.Lock()
+        self.processes = self.bytes_read = 0
+        self.seconds = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def copy(self, blob, out, attr_source=None):
+        """Stream the checkout-filtered content of blob into the file object out.
+
+        Content moves in COPY_CHUNK pieces, so memory stays flat however big the
+        blob is.
+        """
+        if self._batch is None:
+            self._batch = _batch_sizes_filtered(self.repo)
+        if "\n" in blob.path or not self._batch:
+            # The batch protocol is line based; such paths get a process of their own.
+            return self._copy_one_shot(blob, out, attr_source)
+        request = f"{blob.hexsha} {blob.path}\n".encode("utf-8", "surrogateescape")
+        with self._lock:
+            start = time.perf_counter()
+            git = self._procs.get(attr_source)
+            if git is None:
+                git = self._procs[attr_source] = _GitProcess(
+                    self.repo, "cat-file", "--batch", "--filters",
+                    attr_source=attr_source)
+                self.processes += 1
+            try:
+                git.stdin.write(request)
+                git.stdin.flush()
+                header = git.stdout.readline().split()
+                if len(header) != 3:
+                    raise ValueError(b" ".join(header).decode("utf-8", "replace")
+                                     or "git cat-file 已結束")
+                remaining = int(header[2])
+                while remaining:
+                    chunk = git.stdout.read(min(COPY_CHUNK, remaining))
+                    if not chunk:
+                        raise ValueError("git cat-file 輸出不完整")
+                    out.write(chunk)
+                    remaining -= len(chunk)
+                if git.stdout.read(1) != b"\n":
+                    raise ValueError("git cat-file 輸出不完整")
+                self.bytes_read += int(header[2])
+            except Exception as e:
+                del self._procs[attr_source]
+                _code, detail = git.finish(kill=True)
+                raise ValueError(detail or str(e)) from e
+            finally:
+                self.seconds += time.perf_counter() - start
+
+    def _copy_one_shot(self, blob, out, attr_source):
+        start = time.perf_counter()
+        git = _GitProcess(self.repo, "cat-file", "--filters", blob.hexsha,
+                          "--path=" + blob.path, attr_source=attr_source)
+        size = 0
+        try:
+            git.stdin.close()
+            for chunk in git.chunks():
+                out.write(chunk)
+                size += len(chunk)
+        finally:
+            code, detail = git.finish()
+            with self._lock:
+                self.processes += 1
+                self.bytes_read += size
+                self.seconds += time.perf_counter() - start
+        if code:
+            raise ValueError(detail or f"git cat-file 結束碼 {code}")
+
+    def close(self):
+        with self._lock:
+            for attr_source in list(self._procs):
+                self._procs.pop(attr_source).finish()
+
+
+def write_blob(dest, blob, repo=None, attr_source=None, reporter=None, reader=None,
+               store=None):
+    """Write a blob out the way `git checkout` would. True when it was filtered.
 
     blob.data_stream gives the raw object contents. With core.autocrlf=true or a
     .gitattributes `text=auto`, git stores text normalised to LF and only converts back
@@ -94,39 +312,421 @@ def write_blob(dest, blob, repo=None, attr_source=None, reporter=None):
     attribute lookup at the right revision; on older git it is ignored and behaviour
     falls back to today's rules.
 
-    strip_newline_in_stdout=False is required: GitPython otherwise eats the final byte,
-    which on a CRLF file leaves a broken lone \\r at EOF.
-
     If the filtered read fails for any reason the raw stream is used, and - unlike a
     silent fallback - the reporter is told, because that output may have the wrong line
     endings and nothing else would reveal it.
+
+    With a BlobReader the filtered content comes from its long-lived batch process
+    instead of a new `git cat-file` per blob. Either route streams the content to dest
+    in COPY_CHUNK pieces, so a several-hundred-MB asset never sits in memory whole.
+
+    With a BlobStore the content is written once into the store and dest becomes a
+    link to it (see BlobStore).
     """
+    if store is not None:
+        return store.write(dest, blob, attr_source, lambda path: write_blob(
+            path, blob, repo, attr_source, reporter, reader))
     ensure_parent(dest)
-    data = None
-    if repo is not None:
-        try:
-            args = ("--filters", blob.hexsha, "--path=" + blob.path)
-            kw = dict(stdout_as_string=False, strip_newline_in_stdout=False)
-            if attr_source:
-                with repo.git.custom_environment(GIT_ATTR_SOURCE=str(attr_source)):
-                    data = repo.git.cat_file(*args, **kw)
-            else:
-                data = repo.git.cat_file(*args, **kw)
-        except Exception as e:
-            data = None
-            if reporter is not None:
-                reporter.log(
-                    f"   ⚠ {blob.path}：無法套用 checkout 轉換({e}),"
-                    f"改用未轉換內容,換行符可能與工作區不同", "warning")
-    if data is None:
-        data = blob.data_stream.read()
     with open(long_path(dest), "wb") as f:
-        f.write(data)
+        if reader is not None or repo is not None:
+            try:
+                if reader is not None:
+                    reader.copy(blob, f, attr_source)
+                else:
+                    with BlobReader(repo) as one_off:
+                        one_off.copy(blob, f, attr_source)
+                return True
+            except Exception as e:
+                f.seek(0)
+                f.truncate()
+                if reporter is not None:
+                    reporter.log(
+                        f"   ⚠ {blob.path}：無法套用 checkout 轉換({e}),"
+                        f"改用未轉換內容,換行符可能與工作區不同", "warning")
+        # blob.data_stream reads through GitPython's single shared cat-file process,
+        # which cannot serve two threads at once.
+        with _RAW_STREAM_LOCK:
+            shutil.copyfileobj(blob.data_stream, f, COPY_CHUNK)
+    return False
+
+
+class WorkTreeFile:
+    """The MOD side of an uncommitted change: a file on disk rather than a blob."""
+
+    def __init__(self, path, disk):
+        self.path = path
+        self.disk = disk
+
 
+def copy_file(src, dest, allow_hardlink=False):
+    """Copy a work-tree file to dest; see clone_file for how."""
+    clone_file(src, dest, allow_hardlink)
 
-def copy_file(src, dest):
+
+def _reflink(src, dest):
+    """Clone src to dest sharing its extents (btrfs / XFS). False when unsupported."""
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+    ficlone = 0x40049409
+    try:
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            fcntl.ioctl(d.fileno(), ficlone, s.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(dest)
+        except OSError:
+            pass
+        return False
+
+
+def _copy_range(src, dest):
+    """Copy src to dest inside the kernel with copy_file_range. False when unsupported.
+
+    Data never passes through this process, and file systems that can share extents
+    (or copy server-side, like NFS 4.2) do that instead of duplicating the bytes.
+    """
+    if not hasattr(os, "copy_file_range"):
+        return False
+    try:
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            while os.copy_file_range(s.fileno(), d.fileno(), 1 << 30):
+                pass
+        return True
+    except OSError:
+        try:
+            os.remove(dest)
+        except OSError:
+            pass
+        return False
+
+
+def remove_file(path):
+    """os.remove that also takes read-only files, which Windows refuses to delete.
+
+    Blob store entries are read-only, and so is every hardlink to them.
+    """
+    try:
+        os.remove(path)
+    except PermissionError:
+        os.chmod(path, 0o644)
+        os.remove(path)
+
+
+def clone_file(src, dest, allow_hardlink=False):
+    """Copy src to dest as cheaply as the file system allows.
+
+    A reflink shares storage until either side changes. A hardlink shares the file
+    itself - editing dest edits src - so it is only tried when the caller says so.
+    Then copy_file_range, and a plain streamed copy as the last resort.
+    """
     ensure_parent(dest)
-    shutil.copyfile(long_path(src), long_path(dest))
+    src, dest = long_path(src), long_path(dest)
+    if os.path.lexists(dest):
+        remove_file(dest)
+    if _reflink(src, dest):
+        return
+    if allow_hardlink:
+        try:
+            os.link(src, dest)
+            return
+        except OSError:
+            pass
+    if _copy_range(src, dest):
+        return
+    shutil.copyfile(src, dest)
+
+
+def _filter_config(repo):
+    """The eol / filter configuration checkout-filtered content depends on."""
+    if repo is None:
+        return ""
+    try:
+        return repo.git.config("--get-regexp", r"^core\.(autocrlf|eol)$|^filter\.")
+    except Exception:
+        return ""
+
+
+class BlobStore:
+    """Content-addressed cache of exported blobs, shared by exports in one output base.
+
+    Consecutive commits mostly carry the same files: commit N's MOD is commit N+1's ORG.
+    With a store each (blob, path, attr_source) is fetched and written once, and every
+    ORG/ or MOD/ entry becomes a reflink or hardlink to the cached copy.
+
+    The key covers everything the checkout filters depend on: the blob, the path
+    (.gitattributes matches on it), the revision the attributes come from, and the
+    repository's eol / filter configuration. Content that fell back to the unfiltered
+    stream is never cached, so a missing git-lfs does not poison later exports.
+
+    Entries are read-only, and the size and mtime each had when it was stored sit in a
+    STAMP file beside it. A hardlinked ORG/ or MOD/ file that was edited anyway (root
+    ignores the permission) changes the entry too; the stamp no longer matches, and the
+    entry is written afresh instead of being handed to the next export.
+    """
+
+    STAMP = ".stamp"
+
+    def __init__(self, root, repo=None):
+        self.root = root
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._salt = _filter_config(repo)
+
+    def path_for(self, blob, attr_source):
+        key = hashlib.sha1("\0".join(
+            (blob.hexsha, blob.path, str(attr_source or ""), self._salt)
+        ).encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.root, key[:2], key[2:])
+
+    def write(self, dest, blob, attr_source, write):
+        """Materialise dest from the store, filling it through write(path) on a miss."""
+        cached = self.path_for(blob, attr_source)
+        if self._intact(cached):
+            with self._lock:
+                self.hits += 1
+        else:
+            tmp = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                filtered = write(tmp)
+            except Exception:
+                if os.path.exists(long_path(tmp)):
+                    os.remove(long_path(tmp))
+                raise
+            if not filtered:
+                ensure_parent(dest)
+                os.replace(long_path(tmp), long_path(dest))
+                return False
+            self._store(tmp, cached)
+            with self._lock:
+                self.misses += 1
+        clone_file(cached, dest, allow_hardlink=True)
+        return True
+
+    def _intact(self, cached):
+        try:
+            with open(long_path(cached + self.STAMP), encoding="ascii") as f:
+                size, mtime_ns = (int(v) for v in f.read().split())
+            st = os.stat(long_path(cached))
+        except (OSError, ValueError):
+            return False
+        return st.st_size == size and st.st_mtime_ns == mtime_ns
+
+    def _store(self, tmp, cached):
+        os.chmod(long_path(tmp), 0o444)
+        try:
+            os.replace(long_path(tmp), long_path(cached))
+        except PermissionError:
+            # Windows will not replace a read-only file (a damaged entry).
+            os.chmod(long_path(cached), 0o644)
+            os.replace(long_path(tmp), long_path(cached))
+        st = os.stat(long_path(cached))
+        stamp = tmp + self.STAMP
+        with open(long_path(stamp), "w", encoding="ascii") as f:
+            f.write(f"{st.st_size} {st.st_mtime_ns}\n")
+        os.replace(long_path(stamp), long_path(cached + self.STAMP))
+
+
+class ExportManifest:
+    """Record of what an export folder's ORG/ and MOD/ hold, so overwriting it is a sync.
+
+    Every written file is stored with the key of its source (blob + attribute revision,
+    or the size and mtime of a working-tree file, and whether it may be a link) and the
+    size and mtime it had once written. When the same folder is exported again, a file
+    whose key is unchanged and which still has that size and mtime is left alone; only
+    new or different entries are rewritten and files the new export does not list are
+    removed. Re-exporting a commit, or a working tree that changed in one file, then
+    costs time in proportion to what changed.
+
+    Like BlobStore, content that fell back to the unfiltered stream is never recorded,
+    and a change in the repository's eol / filter configuration invalidates everything.
+    """
+
+    def __init__(self, out_dir, repo=None):
+        self.out_dir = out_dir
+        self.kept = self.written = self.removed = 0
+        self.bytes_written = 0
+        self.files = {}
+        self._lock = threading.Lock()
+        self._filters = _filter_config(repo)
+        self._old = {}
+        try:
+            with open(long_path(os.path.join(out_dir, MANIFEST_FILE)),
+                      encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == 1 and data.get("filters") == self._filters:
+                self._old = data["files"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    @staticmethod
+    def blob_key(blob, attr_source, linked=False):
+        return f"{blob.hexsha} {attr_source or ''}{' linked' if linked else ''}"
+
+    @staticmethod
+    def disk_key(path, linked=False):
+        st = os.stat(long_path(path))
+        return f"disk {st.st_size} {st.st_mtime_ns}{' linked' if linked else ''}"
+
+    def _disk(self, rel):
+        return os.path.join(self.out_dir, *rel.split("/"))
+
+    def is_current(self, rel, key):
+        """True when rel was written from key and has not been touched since."""
+        old = self._old.get(rel)
+        if old is None or old[0] != key:
+            return False
+        try:
+            st = os.stat(long_path(self._disk(rel)))
+        except OSError:
+            return False
+        if [st.st_size, st.st_mtime_ns] != old[1:]:
+            return False
+        with self._lock:
+            self.files[rel] = old
+            self.kept += 1
+        return True
+
+    def discard(self, rel):
+        """Remove the previous rel before it is rewritten.
+
+        The old file may be a link into the blob store or the working tree; writing
+        through it would change the linked file too.
+        """
+        path = long_path(self._disk(rel))
+        if os.path.lexists(path):
+            remove_file(path)
+
+    def record(self, rel, key):
+        st = os.stat(long_path(self._disk(rel)))
+        with self._lock:
+            self.files[rel] = [key, st.st_size, st.st_mtime_ns]
+            self.written += 1
+            self.bytes_written += st.st_size
+
+    def prune(self, wanted):
+        """Remove every file under ORG/ and MOD/ that is not in wanted, and empty folders.
+
+        Runs before anything is written, so a path that turned from a folder into a
+        file (or back) is free by the time it is needed.
+        """
+        def sweep(folder, prefix):
+            empty = True
+            with os.scandir(long_path(folder)) as it:
+                for entry in it:
+                    rel = prefix + entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if sweep(entry.path, rel + "/"):
+                            os.rmdir(long_path(entry.path))
+                            continue
+                    elif rel not in wanted:
+                        remove_file(long_path(entry.path))
+                        self.removed += 1
+                        continue
+                    empty = False
+            return empty
+
+        for side in ("ORG", "MOD"):
+            folder = os.path.join(self.out_dir, side)
+            if os.path.isdir(long_path(folder)):
+                sweep(folder, side + "/")
+
+    def save(self):
+        path = long_path(os.path.join(self.out_dir, MANIFEST_FILE))
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "filters": self._filters, "files": self.files},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @property
+    def reused(self):
+        """True when a previous manifest was found, i.e. this was a sync."""
+        return bool(self._old)
+
+
+class ExportIndex:
+    """Which commits have been exported into an output folder, and where to.
+
+    The folder name depends on the subject, the date and the name_with_sha option, so
+    it cannot tell whether a commit is already done; this index can. It maps a commit
+    SHA and what shapes the output (export mode, with_patch, the eol / filter
+    configuration) to the folder produced. A batch that finds a commit here, with its
+    folder still in place, reports that folder instead of exporting again - a nightly
+    run over a growing commit list then only exports the new commits.
+
+    Only completed exports without failures are recorded, and the index is only
+    written from the process that owns the batch.
+    """
+
+    def __init__(self, output_base, repo=None):
+        self.path = os.path.join(output_base, EXPORT_INDEX_FILE)
+        self.output_base = output_base
+        self._filters = hashlib.sha1(
+            _filter_config(repo).encode("utf-8", "surrogateescape")).hexdigest()[:12]
+        self._dirty = False
+        try:
+            with open(long_path(self.path), encoding="utf-8") as f:
+                data = json.load(f)
+            self._entries = data["commits"] if data.get("version") == 1 else {}
+        except (OSError, ValueError, KeyError, AttributeError):
+            self._entries = {}
+
+    def _key(self, sha, mode, with_patch):
+        return f"{sha} {mode} {'patch' if with_patch else 'nopatch'} {self._filters}"
+
+    def find(self, sha, with_patch=True, mode="commit"):
+        """Stats of an earlier export of sha whose folder still holds it, else None.
+
+        The folder is trusted only while its commit_message.txt names sha: an
+        --overwrite export of another commit, or a folder deleted and recreated by
+        hand, drops the entry instead of reusing someone else's files.
+        """
+        key = self._key(sha, mode, with_patch)
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+        out_dir = os.path.join(self.output_base, entry["folder"])
+        if self._exported_sha(out_dir) != sha:
+            del self._entries[key]
+            self._dirty = True
+            return None
+        return {"folder": entry["folder"], "out_dir": out_dir,
+                "files": entry["files"], "failed": 0}
+
+    @staticmethod
+    def _exported_sha(out_dir):
+        """The SHA on the Commit: line commit_message.txt starts with, or None."""
+        try:
+            with open(long_path(os.path.join(out_dir, "commit_message.txt")),
+                      encoding="utf-8", errors="replace") as f:
+                first = f.readline()
+        except OSError:
+            return None
+        label, _, sha = first.partition(":")
+        return sha.strip() if label == "Commit" else None
+
+    def add(self, sha, stats, with_patch=True, mode="commit"):
+        if stats and not stats["failed"]:
+            key = self._key(sha, mode, with_patch)
+            # The folder now holds sha: entries of other commits pointing to it are
+            # stale (an --overwrite export reused their folder name).
+            for other in [k for k, entry in self._entries.items()
+                          if entry["folder"] == stats["folder"] and k != key]:
+                del self._entries[other]
+            self._entries[key] = {"folder": stats["folder"], "files": stats["files"]}
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(long_path(tmp), "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "commits": self._entries}, f,
+                      ensure_ascii=False, separators=(",", ":"))
+        os.replace(long_path(tmp), long_path(self.path))
+        self._dirty = False
 
 
 def looks_like_export_dir(path):
@@ -147,6 +747,17 @@ def push_history(history, path, limit=MAX_HISTORY):
 def open_folder(path):
     if not path or not os.path.isdir(path):
         return False
+    return _open_with_system(path)
+
+
+def open_file(path):
+    """Open a file in the application the system associates with it."""
+    if not path or not os.path.isfile(path):
+        return False
+    return _open_with_system(path)
+
+
+def _open_with_system(path):
     if os.name == "nt":
         os.startfile(path)
     elif sys.platform == "darwin":
@@ -192,24 +803,302 @@ class Reporter:
         return self._cancel is not None and self._cancel.is_set()
 
 
+class ExportStats:
+    """Where one export spent its time: wall time per phase, plus counters.
+
+    Phases are timed with `with stats.phase(name):`; counters (files written, bytes
+    read from git, git processes started, ...) are added with count(). Both are
+    thread-safe. The export writes the result as export_stats.json next to
+    commit_message.txt and logs a one-line summary, so slow exports can be compared
+    across versions and repositories.
+    """
+
+    PHASE_NAMES = {"resolve": "解析", "status": "掃描", "diff": "比對", "write": "寫檔",
+                   "note": "說明", "patch": "patch"}
+
+    def __init__(self, kind, target=None):
+        self.kind = kind
+        self.target = target
+        self.phases = {}
+        self.counters = collections.Counter()
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._seconds = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def add_reader(self, reader):
+        self.count("git_processes", reader.processes)
+        self.count("bytes_read", reader.bytes_read)
+        self.count("blob_read_seconds", reader.seconds)
+
+    def finish(self):
+        if self._seconds is None:
+            self._seconds = time.perf_counter() - self._start
+        return self._seconds
+
+    def as_dict(self):
+        counters = dict(self.counters)
+        if "blob_read_seconds" in counters:
+            counters["blob_read_seconds"] = round(counters["blob_read_seconds"], 4)
+        return {
+            "kind": self.kind,
+            "target": self.target,
+            "version": APP_VERSION,
+            "finished": datetime.now().isoformat(timespec="seconds"),
+            "total_seconds": round(self.finish(), 4),
+            "phases": {k: round(v, 4) for k, v in self.phases.items()},
+            "counters": counters,
+        }
+
+    def write(self, out_dir, reporter):
+        """Write export_stats.json into out_dir and log the summary."""
+        data = self.as_dict()
+        try:
+            with open(long_path(os.path.join(out_dir, "export_stats.json")), "w",
+                      encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            reporter.log(f"⚠ 無法輸出 export_stats.json：{e}", "warning")
+        phases = " · ".join(f"{self.PHASE_NAMES.get(k, k)} {v:.2f}"
+                            for k, v in data["phases"].items())
+        c = self.counters
+        reporter.log(f"ℹ 耗時 {data['total_seconds']:.2f} 秒({phases})"
+                     f" · 讀取 {_format_size(c['bytes_read'])}"
+                     f" · 寫入 {_format_size(c['bytes_written'])}"
+                     f" · git 行程 {c['git_processes']}", "muted")
+        return data
+
+
+def _format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def profiling_requested():
+    """True when PROFILE_ENV asks for every export to be profiled."""
+    return os.environ.get(PROFILE_ENV, "").strip() not in ("", "0")
+
+
+# The active _ProfileSession while profile_export runs, so that _write_changes can
+# profile its writer threads too.
+_profiling = None
+
+
+class _ProfileSession:
+    """A cProfile for the exporting thread plus one per writer thread.
+
+    Before Python 3.12 cProfile only sees the thread that enabled it. Each pool thread
+    then gets a profile of its own, switched on only while it runs a task; stats()
+    adds them all up. From 3.12 cProfile runs on sys.monitoring: the main profile
+    already sees every thread, and a second one could not be enabled beside it.
+    """
+
+    PER_THREAD = sys.version_info < (3, 12)
+
+    def __init__(self):
+        import cProfile
+        self._new = cProfile.Profile
+        self.main = cProfile.Profile()
+        self._threads = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def wrap(self, fn):
+        if not self.PER_THREAD:
+            return fn
+
+        def run(*args):
+            prof = getattr(self._local, "prof", None)
+            if prof is None:
+                prof = self._local.prof = self._new()
+                with self._lock:
+                    self._threads.append(prof)
+            prof.enable()
+            try:
+                return fn(*args)
+            finally:
+                prof.disable()
+        return run
+
+    def stats(self):
+        import pstats
+        stats = pstats.Stats(self.main)
+        for prof in self._threads:
+            stats.add(prof)
+        return stats
+
+
+@contextlib.contextmanager
+def profile_export(output_base, reporter, enabled=None, name=None):
+    """Profile the enclosed export with cProfile and tracemalloc when enabled.
+
+    enabled=None follows PROFILE_ENV. Two files go to EXPORT_LOG_DIR in output_base,
+    ready to attach to a bug report: <name>.prof (open with pstats or snakeviz) and
+    <name>_alloc.txt (peak traced memory and the top allocation sites). Both tools
+    slow the export down noticeably; only the timings relative to each other count.
+    """
+    global _profiling
+    if enabled is None:
+        enabled = profiling_requested()
+    if not enabled or _profiling is not None:
+        yield
+        return
+    import tracemalloc
+    name = name or datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    session = _ProfileSession()
+    try:
+        session.main.enable()
+    except ValueError as e:
+        # 3.12+: another profiler (python -m cProfile) already holds sys.monitoring.
+        reporter.log(f"⚠ 無法啟動效能剖析：{e}", "warning")
+        yield
+        return
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        # One frame per trace is all the "lineno" report needs; deeper tracebacks
+        # multiply the overhead on exports with many files.
+        tracemalloc.start()
+    reporter.log("ℹ 效能剖析模式(cProfile + tracemalloc),匯出會比平常慢", "muted")
+    _profiling = session
+    try:
+        yield
+    finally:
+        session.main.disable()
+        _profiling = None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        folder = os.path.join(output_base, EXPORT_LOG_DIR)
+        prof_path = os.path.join(folder, name + ".prof")
+        alloc_path = os.path.join(folder, name + "_alloc.txt")
+        try:
+            os.makedirs(long_path(folder), exist_ok=True)
+            session.stats().dump_stats(long_path(prof_path))
+            with open(long_path(alloc_path), "w", encoding="utf-8") as f:
+                f.write(f"Peak traced memory:    {_format_size(peak)}\n")
+                f.write(f"Traced at the end:     {_format_size(current)}\n")
+                f.write("\nTop allocation sites (still allocated at the end):\n")
+                for stat in snapshot.statistics("lineno")[:30]:
+                    frame = stat.traceback[0]
+                    f.write(f"  {_format_size(stat.size):>10}  {stat.count:>8} blocks  "
+                            f"{frame.filename}:{frame.lineno}\n")
+            reporter.log(f"ℹ 效能剖析已存到 {prof_path} 與 {os.path.basename(alloc_path)}",
+                         "muted")
+        except Exception as e:
+            # A profile that cannot be written must never fail the export it measured.
+            reporter.log(f"⚠ 無法輸出效能剖析：{e}", "warning")
+
+
+class BufferedReporter(Reporter):
+    """Reporter for a front-end that polls: lines are batched, progress coalesced.
+
+    An export reports every file, far faster than a UI can draw one line at a time.
+    Here a log call only appends to a bounded buffer and a progress call only replaces
+    the last value; the front-end collects both with take() on its own timer. When it
+    falls behind, the oldest pending lines are dropped (and counted) rather than
+    piling up, so the cost per file stays the same however large the export is.
+
+    With log_path every line is also written to that file, dropped or not, so the
+    complete log survives whatever the front-end chooses to keep on screen. Opening
+    the file raises OSError; close() when the export is over.
+    """
+
+    def __init__(self, cancel_event=None, limit=5000, log_path=None):
+        super().__init__(cancel_event=cancel_event)
+        self._lock = threading.Lock()
+        self._lines = collections.deque(maxlen=limit)
+        self._dropped = 0
+        self._progress = None
+        self.log_path = log_path
+        self._file = None
+        if log_path:
+            ensure_parent(log_path)
+            self._file = open(long_path(log_path), "w", encoding="utf-8",
+                              errors="replace")
+
+    def log(self, msg, tag="info"):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self._dropped += 1
+            self._lines.append((msg, tag))
+            if self._file is not None:
+                self._file.write(msg + "\n")
+
+    def progress(self, done, total):
+        with self._lock:
+            self._progress = (done, total)
+
+    def take(self):
+        """(lines, dropped, progress) since the last call; progress may be None."""
+        with self._lock:
+            lines, self._lines = list(self._lines), collections.deque(
+                maxlen=self._lines.maxlen)
+            dropped, self._dropped = self._dropped, 0
+            progress, self._progress = self._progress, None
+            if self._file is not None:
+                self._file.flush()
+        return lines, dropped, progress
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
 # --------------------------------------------------------------------------
 # Extraction core
 # --------------------------------------------------------------------------
-def _prepare_output_dir(out_dir, reporter, overwrite):
-    """Return True when out_dir is ready to receive files."""
+def _prepare_output_dir(out_dir, reporter, overwrite, repo=None):
+    """Return an ExportManifest for out_dir when it is ready to receive files, else None.
+
+    An existing export is not deleted: everything beside ORG/ and MOD/ is, and
+    _write_changes then syncs those two through the manifest.
+    """
     name = os.path.basename(out_dir)
     if os.path.exists(out_dir):
         if not overwrite:
             reporter.log(f"⚠ 已存在,略過：{name}", "warning")
-            return False
+            return None
         if not looks_like_export_dir(out_dir):
             reporter.log(f"⚠ 目標資料夾不像本工具的輸出，為避免誤刪而略過：{name}", "warning")
-            return False
-        shutil.rmtree(long_path(out_dir), ignore_errors=True)
+            return None
+        with os.scandir(long_path(out_dir)) as it:
+            for entry in it:
+                if entry.name in ("ORG", "MOD", MANIFEST_FILE):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.remove(entry.path)
+        for side in ("ORG", "MOD"):
+            path = long_path(os.path.join(out_dir, side))
+            if os.path.lexists(path) and not os.path.isdir(path):
+                os.remove(path)
         reporter.log(f"↻ 覆蓋既有資料夾：{name}", "warning")
     os.makedirs(long_path(os.path.join(out_dir, "ORG")), exist_ok=True)
     os.makedirs(long_path(os.path.join(out_dir, "MOD")), exist_ok=True)
-    return True
+    return ExportManifest(out_dir, repo)
 
 
 def _write_note(path, header_lines, message, entries):
@@ -231,44 +1120,136 @@ def _write_note(path, header_lines, message, entries):
 
 
 def _write_patch(out_dir, data, reporter):
+    """Write changes.patch from bytes or from an iterable of byte chunks.
+
+    Chunks go to disk as they arrive, so a multi-GB range patch never sits in memory;
+    only the last byte is kept, for the trailing-newline check. Returns the number of
+    bytes written.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8", "replace")
+    if isinstance(data, bytes):
+        data = (data,)
+    size = 0
     try:
-        if not isinstance(data, bytes):
-            data = data.encode("utf-8", "replace")
-        # A patch whose last line has no trailing newline makes `git apply` fail with
-        # "corrupt patch at line N". Callers pass strip_newline_in_stdout=False so this
-        # should already hold; kept as a backstop for any other caller.
-        if data and not data.endswith(b"\n"):
-            data += b"\n"
+        last = b""
         with open(long_path(os.path.join(out_dir, "changes.patch")), "wb") as f:
-            f.write(data)
+            for chunk in data:
+                if chunk:
+                    f.write(chunk)
+                    size += len(chunk)
+                    last = chunk[-1:]
+            # A patch whose last line has no trailing newline makes `git apply` fail
+            # with "corrupt patch at line N". git's own output always ends in one;
+            # kept as a backstop for any other caller.
+            if last and last != b"\n":
+                f.write(b"\n")
+                size += 1
     except Exception as e:
         reporter.log(f"⚠ 無法輸出 changes.patch：{e}", "warning")
+    finally:
+        close = getattr(data, "close", None)
+        if close is not None:
+            close()
+    return size
+
+
+def _git_output(repo, command, *args):
+    """Yield the stdout of `git <command> <args>` in COPY_CHUNK pieces.
+
+    Raises once the output is exhausted if git failed. Closing the generator early
+    kills the process.
+    """
+    git = _GitProcess(repo, command, *args)
+    finished = False
+    try:
+        yield from git.chunks()
+        finished = True
+    finally:
+        code, detail = git.finish(kill=not finished)
+    if code:
+        raise ValueError(detail or f"git {command} 結束碼 {code}")
 
 
-def _diff_to_changes(diff):
-    """Turn a GitPython diff into (status, display path, ORG blob, MOD blob) tuples."""
+def _empty_tree(commit):
+    """The empty tree id in the repository's hash (SHA-1 or SHA-256)."""
+    return EMPTY_TREE_SHA256 if len(commit.hexsha) == 64 else EMPTY_TREE_SHA1
+
+
+def _parse_raw_diff(repo, raw):
+    """Turn `git diff --raw -z` output into (status, display path, ORG blob, MOD blob)."""
     changes = []
-    for ch in diff:
-        if ch.renamed_file:
-            changes.append(("RENAMED", f"{ch.rename_from} → {ch.rename_to}",
-                            ch.a_blob, ch.b_blob))
-        elif ch.deleted_file:
-            changes.append(("DELETED", ch.a_path, ch.a_blob, ch.b_blob))
-        elif ch.new_file:
-            changes.append(("ADDED", ch.b_path, ch.a_blob, ch.b_blob))
+    fields = iter(raw.split(b"\0"))
+    for meta in fields:
+        if not meta.startswith(b":"):
+            continue
+        old_mode, new_mode, old_sha, new_sha, status = meta[1:].decode("ascii").split()
+        src = next(fields).decode("utf-8", "surrogateescape")
+        dst = (next(fields).decode("utf-8", "surrogateescape")
+               if status[0] in "RC" else src)
+        a_blob = Blob(repo, bytes.fromhex(old_sha), int(old_mode, 8), src)
+        b_blob = Blob(repo, bytes.fromhex(new_sha), int(new_mode, 8), dst)
+        if status[0] == "R":
+            changes.append(("RENAMED", f"{src} → {dst}", a_blob, b_blob))
+        elif status == "D":
+            changes.append(("DELETED", src, a_blob, None))
+        elif status[0] in "AC":
+            changes.append(("ADDED", dst, None, b_blob))
         else:
-            changes.append(("MODIFIED", ch.a_path, ch.a_blob, ch.b_blob))
+            changes.append(("MODIFIED", src, a_blob, b_blob))
     return changes
 
 
-def _tree_to_changes(commit):
-    """Every file of a root commit counts as newly added."""
-    return [("ADDED", item.path, None, item)
-            for item in commit.tree.traverse() if item.type == "blob"]
+def _diff_commits(repo, base, target, reporter, patch_dir=None, stats=None):
+    """Return the changes between two commits from a single `git diff` run.
+
+    The raw listing and the unified patch come out of the same invocation, so tree
+    comparison and rename detection are paid for once - and the file list and
+    changes.patch can never disagree about what was renamed. -M is explicit for the
+    same reason: a diff.renames=copies setting would otherwise only affect the patch.
 
+    With patch_dir, the patch part is streamed straight into changes.patch there.
 
-def _write_changes(out_dir, changes, reporter, repo=None,
-                   org_rev=None, mod_rev=None):
+    base=None diffs against the empty tree, which is how a root commit (or a range
+    starting at one) is exported.
+
+    stats (an ExportStats) gets the "diff" phase - tree comparison and rename
+    detection - and the "patch" phase separately.
+    """
+    if stats is None:
+        stats = ExportStats("diff")
+    args = ["--raw", "-z", "-M", "--no-abbrev", "--no-color", "--no-ext-diff"]
+    if patch_dir is not None:
+        args.append("-p")
+    old = base.hexsha if base is not None else _empty_tree(target)
+    output = _git_output(repo, "diff", *args, old, target.hexsha)
+    stats.count("git_processes")
+    try:
+        # With -p an empty record separates the NUL-terminated raw section from the
+        # patch; the raw part is buffered (it is one short record per file), the
+        # patch never is.
+        with stats.phase("diff"):
+            raw, rest = bytearray(), b""
+            for chunk in output:
+                start = max(len(raw) - 1, 0)
+                raw += chunk
+                end = raw.find(b"\0\0", start)
+                if end >= 0:
+                    raw, rest = raw[:end], bytes(raw[end + 2:])
+                    break
+            changes = _parse_raw_diff(repo, bytes(raw))
+        if patch_dir is not None:
+            with stats.phase("patch"):
+                stats.count("patch_bytes", _write_patch(
+                    patch_dir, itertools.chain((rest,), output), reporter))
+    finally:
+        output.close()
+    return changes
+
+
+def _write_changes(out_dir, changes, reporter, repo=None, org_rev=None, mod_rev=None,
+                   reader=None, workers=WRITE_WORKERS, store=None, link_worktree=False,
+                   manifest=None, stats=None):
     """Write every change into ORG/ and MOD/. Returns (entries, failed).
 
     repo is passed through to write_blob so blobs go through the checkout filters
@@ -276,49 +1257,434 @@ def _write_changes(out_dir, changes, reporter, repo=None,
 
     org_rev / mod_rev name the revisions each side came from, so .gitattributes is read
     from the right point in history rather than from today's working tree.
+
+    The MOD side may be a WorkTreeFile instead of a blob; it is cloned from disk, and
+    hardlinked when link_worktree allows it (see clone_file).
+    Blobs go through store (a BlobStore) when one is given.
+
+    With a manifest (from _prepare_output_dir) files still current from an earlier
+    export of the same folder are kept, stale ones are removed, and the manifest is
+    saved at the end - also after a cancel or a failure.
+
+    stats (an ExportStats) receives the counters: files written / kept / removed,
+    bytes, git processes started and time spent reading blobs.
+
+    Up to `workers` changes are written at once so blob reads overlap file-system
+    latency (directory creation, open/close on network shares). Each worker thread
+    reads through its own BlobReader unless the caller passes a shared one. Results
+    are still reported strictly in input order, and reporter.cancelled is checked
+    between items: nothing new starts after a cancel, and what already ran is
+    reported so the summary matches the files on disk.
     """
+    local = threading.local()
+    readers = []
+    linked = store is not None
+
+    def thread_reader():
+        if reader is not None or repo is None:
+            return reader
+        if not hasattr(local, "reader"):
+            local.reader = BlobReader(repo)
+            readers.append(local.reader)
+        return local.reader
+
+    def sync(side, item, key, write):
+        # key identifies what write would produce; it is only used with a manifest.
+        rel = f"{side}/{item.path}"
+        if manifest is None:
+            write(os.path.join(out_dir, side, item.path))
+            return
+        if manifest.is_current(rel, key):
+            return
+        manifest.discard(rel)
+        if write(os.path.join(out_dir, side, item.path)) is not False:
+            manifest.record(rel, key)
+
+    def write_one(a_blob, b_side):
+        blob_reader = thread_reader()
+        if a_blob is not None:
+            sync("ORG", a_blob, ExportManifest.blob_key(a_blob, org_rev, linked),
+                 lambda dest: write_blob(dest, a_blob, repo, org_rev, reporter,
+                                         blob_reader, store))
+        if isinstance(b_side, WorkTreeFile):
+            key = None
+            if manifest is not None:
+                key = ExportManifest.disk_key(b_side.disk, link_worktree)
+            sync("MOD", b_side, key,
+                 lambda dest: copy_file(b_side.disk, dest, link_worktree))
+        elif b_side is not None:
+            sync("MOD", b_side, ExportManifest.blob_key(b_side, mod_rev, linked),
+                 lambda dest: write_blob(dest, b_side, repo, mod_rev, reporter,
+                                         blob_reader, store))
+
+    task = write_one if _profiling is None else _profiling.wrap(write_one)
     total = len(changes)
     entries, failed = [], 0
-    for idx, (status, display, a_blob, b_blob) in enumerate(changes, 1):
-        if reporter.cancelled:
-            reporter.log("■ 使用者已取消", "warning")
-            break
+
+    def collect(idx, status, display, future):
+        nonlocal failed
         reporter.progress(idx, total)
         try:
-            if a_blob is not None:
-                write_blob(os.path.join(out_dir, "ORG", a_blob.path), a_blob,
-                           repo, org_rev, reporter)
-            if b_blob is not None:
-                write_blob(os.path.join(out_dir, "MOD", b_blob.path), b_blob,
-                           repo, mod_rev, reporter)
+            future.result()
             entries.append((status, display))
             reporter.log(f"   [{status}] {display}", status.lower())
         except Exception as e:
             failed += 1
             reporter.log(f"   ✖ 無法輸出 {display}：{e}", "error")
+
+    # Keep a short window in flight: enough to cover latency, small enough that a
+    # cancel stops promptly and memory does not grow with the size of the commit.
+    window = max(1, workers) * 2
+    pending = collections.deque()
+    stopped = False
+    try:
+        if manifest is not None:
+            manifest.prune({f"{side}/{item.path}"
+                            for _status, _display, a_blob, b_side in changes
+                            for side, item in (("ORG", a_blob), ("MOD", b_side))
+                            if item is not None})
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for idx, (status, display, a_blob, b_side) in enumerate(changes, 1):
+                if reporter.cancelled:
+                    stopped = True
+                    break
+                future = pool.submit(task, a_blob, b_side)
+                pending.append((idx, status, display, future))
+                while len(pending) >= window or (pending and pending[0][3].done()):
+                    collect(*pending.popleft())
+            while pending:
+                idx, status, display, future = pending.popleft()
+                if reporter.cancelled and future.cancel():
+                    stopped = True
+                    continue
+                collect(idx, status, display, future)
+        if stopped:
+            reporter.log("■ 使用者已取消", "warning")
+    finally:
+        for r in readers:
+            r.close()
+        if manifest is not None:
+            manifest.save()
+        if stats is not None:
+            for r in readers:
+                stats.add_reader(r)
+            stats.count("changes", len(changes))
+            stats.count("failed", failed)
+            if manifest is not None:
+                stats.count("written", manifest.written)
+                stats.count("kept", manifest.kept)
+                stats.count("removed", manifest.removed)
+                stats.count("bytes_written", manifest.bytes_written)
+            if store is not None:
+                stats.count("store_hits", store.hits)
+                stats.count("store_misses", store.misses)
+    if manifest is not None and manifest.reused:
+        reporter.log(f"ℹ 增量覆蓋：沿用 {manifest.kept} 個、重寫 {manifest.written} 個、"
+                     f"移除 {manifest.removed} 個檔案", "muted")
     return entries, failed
 
 
+def _open_store(repo, output_base, shared_store):
+    if not shared_store:
+        return None
+    return BlobStore(os.path.join(output_base, BLOB_STORE_DIR), repo)
+
+
+def _log_store(store, reporter):
+    if store is not None and (store.hits or store.misses):
+        reporter.log(f"ℹ 共用快取：重用 {store.hits} 個、新增 {store.misses} 個檔案", "muted")
+
+
+# One `git log` entry; parents is a tuple of SHAs.
+LogEntry = collections.namedtuple("LogEntry", "sha date author subject parents")
+
+
+def _log_row(record):
+    sha, parents, date, author, message = \
+        record.decode("utf-8", "replace").split("\x1f", 4)
+    subject = next((l for l in message.splitlines() if l.strip()), "")
+    return LogEntry(sha, int(date), author, subject.strip(), tuple(parents.split()))
+
+
+def log_search_options(author="", grep="", since="", until=""):
+    """git log options for a history search; empty fields are left out.
+
+    author and grep are extended regular expressions, matched case-insensitively
+    against the author and the whole commit message. since / until take anything
+    git understands ("2021-03-01", "3 years ago").
+    """
+    options = []
+    if author:
+        options.append(f"--author={author}")
+    if grep:
+        options.append(f"--grep={grep}")
+    if author or grep:
+        options += ["--extended-regexp", "--regexp-ignore-case"]
+    if since:
+        options.append(f"--since={since}")
+    if until:
+        options.append(f"--until={until}")
+    return options
+
+
+def iter_log(repo, *revs, options=(), paths=()):
+    """Yield a LogEntry per commit of `git log <options> <revs> -- <paths>`.
+
+    Entries come in git's own order. One streaming git process serves the whole
+    walk, so a caller can take a page, stop, and carry on later without git walking
+    the skipped part again the way iter_commits(skip=...) does. Closing the
+    generator ends the process.
+
+    options (see log_search_options) and paths let git itself do the filtering, so
+    a search covers the whole history and matches arrive as git finds them.
+    """
+    pending = b""
+    for chunk in _git_output(repo, "log", "-z",
+                             "--format=%H%x1f%P%x1f%ct%x1f%an%x1f%B", *options, *revs,
+                             "--", *paths):
+        records = (pending + chunk).split(b"\0")
+        pending = records.pop()
+        for record in records:
+            yield _log_row(record)
+    if pending:
+        yield _log_row(pending)
+
+
+class CommitCache:
+    """Commit metadata (parents, date, author, subject) of one repository, in SQLite.
+
+    Commits never change, so once a commit is stored it is never read from git
+    again. Every stored commit has its whole ancestry stored too: update() adds a
+    tip together with everything it reaches that is not already known, in one
+    transaction. Listing a cached tip is then a walk over the table, without
+    starting git at all.
+
+    The database lives in COMMIT_CACHE_DIR, one file per repository.
+    """
+
+    SCHEMA = 1
+    # Recently added tips, handed to git as ^exclusions by update().
+    KEEP_TIPS = 20
+
+    def __init__(self, repo, root=COMMIT_CACHE_DIR):
+        import sqlite3
+
+        os.makedirs(root, exist_ok=True)
+        key = hashlib.sha1(os.path.realpath(repo.common_dir).encode("utf-8",
+                                                                  "surrogateescape"))
+        self.path = os.path.join(root, f"{key.hexdigest()[:16]}.sqlite")
+        # Pages of a walk are pulled from different worker threads, one at a time.
+        self.db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._lock = threading.Lock()
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA:
+            with self.db:
+                self.db.execute("DROP TABLE IF EXISTS commits")
+                self.db.execute("DROP TABLE IF EXISTS tips")
+                self.db.execute("CREATE TABLE commits (sha TEXT PRIMARY KEY, parents TEXT,"
+                                " date INTEGER, author TEXT, subject TEXT) WITHOUT ROWID")
+                self.db.execute("CREATE TABLE tips (sha TEXT PRIMARY KEY, added INTEGER)")
+                self.db.execute(f"PRAGMA user_version = {self.SCHEMA}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def get(self, sha):
+        """The cached LogEntry for sha, or None."""
+        with self._lock:
+            row = self.db.execute("SELECT parents, date, author, subject FROM commits"
+                                  " WHERE sha = ?", (sha,)).fetchone()
+        if row is None:
+            return None
+        parents, date, author, subject = row
+        return LogEntry(sha, date, author, subject, tuple(parents.split()))
+
+    def update(self, repo, tip):
+        """Store tip and its ancestry. Returns how many commits were new."""
+        if self.get(tip) is not None:
+            return 0
+        with self._lock:
+            known = [sha for (sha,) in self.db.execute(
+                "SELECT sha FROM tips ORDER BY added DESC LIMIT ?", (self.KEEP_TIPS,))]
+        rows = [(e.sha, " ".join(e.parents), e.date, e.author, e.subject)
+                for e in iter_log(repo, tip, *[f"^{sha}" for sha in known])]
+        with self._lock, self.db:
+            self.db.executemany("INSERT OR IGNORE INTO commits VALUES (?, ?, ?, ?, ?)", rows)
+            self.db.execute("INSERT OR REPLACE INTO tips VALUES (?,"
+                            " (SELECT IFNULL(MAX(added), 0) + 1 FROM tips))", (tip,))
+            self.db.execute("DELETE FROM tips WHERE sha NOT IN (SELECT sha FROM tips"
+                            " ORDER BY added DESC LIMIT ?)", (self.KEEP_TIPS,))
+        return len(rows)
+
+    def walk(self, tip):
+        """Yield LogEntry from tip down, in `git log` order; tip must be cached.
+
+        git log pops the newest commit (by committer date) off a queue and queues
+        its parents; equal dates come out in the order they were queued. The same
+        walk is done here over the table.
+        """
+        first = self.get(tip)
+        if first is None:
+            raise KeyError(tip)
+        seen, queued = {tip}, itertools.count()
+        heap = [(-first.date, next(queued), first)]
+        while heap:
+            entry = heapq.heappop(heap)[2]
+            yield entry
+            for sha in entry.parents:
+                if sha in seen:
+                    continue
+                seen.add(sha)
+                parent = self.get(sha)
+                # Missing only past a shallow-clone boundary.
+                if parent is not None:
+                    heapq.heappush(heap, (-parent.date, next(queued), parent))
+
+
 def is_same_line(repo, oldest, newest):
-    """True when oldest is reachable from newest (i.e. they form a range)."""
+    """True when oldest is reachable from newest (i.e. they form a range).
+
+    Unused here since CommitGraph answers ancestry in memory; kept as public API.
+    """
     try:
         return repo.is_ancestor(oldest, newest)
     except Exception:
         return False
 
 
-def order_commit_chain(commits, repo=None):
+# merge-base takes its commits on the command line; keep each call well below the
+# Windows command-line limit.
+MERGE_BASE_CHUNK = 200
+
+
+class CommitGraph:
+    """Parent links of the history a set of selected commits lives in.
+
+    Asking git about ancestry one pair at a time (`repo.is_ancestor`, `iter_commits`)
+    is a subprocess per question, which adds up to seconds on a selection of a few
+    hundred commits. Instead the graph is loaded once - one `git rev-list --parents`
+    over the selection, stopped at a common ancestor of all of it - and every
+    ancestry / range question is answered in memory.
+
+    Only the part above that common ancestor is loaded. It is enough for questions
+    between selected commits: anything below it is an ancestor of every one of them.
+    Generation numbers (longest distance from the loaded boundary) prune the walks:
+    a commit can only be an ancestor of commits with a higher generation.
+    """
+
+    def __init__(self, repo, commits):
+        self.selected = list(dict.fromkeys(c.hexsha for c in commits))
+        self.bases = set(self._common_ancestor(repo, self.selected))
+        self.parents = {}
+        self.generation = {}
+        git = _GitProcess(repo, "rev-list", "--stdin", "--parents",
+                          "--topo-order", "--reverse")
+        try:
+            git.stdin.write("".join(
+                [f"{sha}\n" for sha in self.selected]
+                + [f"^{sha}\n" for sha in self.bases]).encode("ascii"))
+            git.stdin.close()
+            # --reverse --topo-order: parents always come before their children.
+            for line in git.stdout:
+                sha, *parents = line.decode("ascii").split()
+                self.parents[sha] = parents
+                self.generation[sha] = 1 + max(
+                    (self.generation.get(p, 0) for p in parents), default=0)
+        finally:
+            code, detail = git.finish()
+        if code:
+            raise ValueError(detail or f"git rev-list 結束碼 {code}")
+
+    @staticmethod
+    def _common_ancestor(repo, shas):
+        """One commit every sha descends from, as a list (empty for unrelated histories).
+
+        A merge base of merge bases is still a common ancestor, so long selections are
+        reduced in chunks instead of one oversized command line.
+        """
+        while len(shas) > 1:
+            reduced = []
+            for i in range(0, len(shas), MERGE_BASE_CHUNK):
+                chunk = shas[i:i + MERGE_BASE_CHUNK]
+                try:
+                    base = repo.git.merge_base("--octopus", *chunk).strip()
+                except Exception:
+                    return []
+                if not base:
+                    return []
+                reduced.append(base)
+            shas = reduced
+        return shas
+
+    def is_ancestor(self, older, newer):
+        """True when commit older is reachable from newer (a commit is its own ancestor).
+
+        Both must be commits of the selection the graph was loaded for.
+        """
+        if older == newer or older in self.bases:
+            return True
+        if newer in self.bases or older not in self.generation:
+            return False
+        floor = self.generation[older]
+        seen, stack = set(), [newer]
+        while stack:
+            sha = stack.pop()
+            for p in self.parents.get(sha, ()):
+                if p == older:
+                    return True
+                if p not in seen and self.generation.get(p, 0) > floor:
+                    seen.add(p)
+                    stack.append(p)
+        return False
+
+    def reachable(self, sha):
+        """sha plus every loaded commit it descends from."""
+        seen, stack = {sha}, [sha]
+        while stack:
+            for p in self.parents.get(stack.pop(), ()):
+                if p not in seen and p in self.parents:
+                    seen.add(p)
+                    stack.append(p)
+        return seen
+
+    def range(self, oldest, newest):
+        """SHAs covered by the oldest..newest range, oldest included.
+
+    Unused here since CommitGraph answers ancestry in memory; kept as public API.
+    """
+        shas = self.reachable(newest)
+        if oldest not in self.bases:
+            shas -= self.reachable(oldest)
+        shas.add(oldest)
+        return shas
+
+    def first_parent(self, sha):
+        parents = self.parents.get(sha)
+        return parents[0] if parents else None
+
+
+def order_commit_chain(commits, repo=None, graph=None):
     """Return (oldest, newest, contiguous) for a set of commits.
 
     Uses first-parent links so the endpoints stay correct even when commit
     dates are out of order (rebase / cherry-pick / same-second commits).
     When the selection has gaps, falls back to an ancestry scan; commit dates
     only decide the scan order, never the result.
+
+    graph is a CommitGraph for commits; one is loaded when not given.
     """
+    graph = graph or CommitGraph(repo or commits[0].repo, commits)
     by_sha = {c.hexsha: c for c in commits}
-    parent_of = {c.hexsha: (c.parents[0].hexsha
-                            if c.parents and c.parents[0].hexsha in by_sha else None)
-                 for c in commits}
+    parent_of = {}
+    for c in commits:
+        first = graph.first_parent(c.hexsha)
+        parent_of[c.hexsha] = first if first in by_sha else None
     linked_parents = {p for p in parent_of.values() if p}
     tips = [c for c in commits if c.hexsha not in linked_parents]
     roots = [c for c in commits if parent_of[c.hexsha] is None]
@@ -331,19 +1697,21 @@ def order_commit_chain(commits, repo=None):
         if len(walk) == len(commits):
             return walk[-1], walk[0], True
 
-    repo = repo or commits[0].repo
     ordered = sorted(commits, key=lambda c: c.committed_date)
     oldest = newest = ordered[0]
     for c in ordered[1:]:
-        if is_same_line(repo, newest, c):
+        if graph.is_ancestor(newest.hexsha, c.hexsha):
             newest = c
-        if is_same_line(repo, c, oldest):
+        if graph.is_ancestor(c.hexsha, oldest.hexsha):
             oldest = c
     return oldest, newest, False
 
 
 def commits_in_range(repo, oldest, newest):
-    """SHAs covered by the oldest..newest range, oldest included."""
+    """SHAs covered by the oldest..newest range, oldest included.
+
+    Unused here since CommitGraph answers ancestry in memory; kept as public API.
+    """
     try:
         shas = {c.hexsha for c in repo.iter_commits(f"{oldest.hexsha}..{newest.hexsha}")}
     except Exception:
@@ -352,55 +1720,140 @@ def commits_in_range(repo, oldest, newest):
     return shas
 
 
-def analyze_merge_selection(repo, commits):
-    """Work out the range a merged export would cover.
+class MergeSelection(collections.namedtuple(
+        "MergeSelection", "oldest newest contiguous covered outside")):
+    """What analyze_merge_selection found; unpacks as (oldest, newest, contiguous,
+    covered, outside).
+
+    It also keeps the de-duplicated commits and revs (each requested revision ->
+    the SHA it resolved to), so a pre-flight check can hand the result to
+    extract_commit_range instead of the export analysing everything again.
+    """
+
+    def __new__(cls, oldest, newest, contiguous, covered, outside,
+                commits=(), revs=None):
+        self = super().__new__(cls, oldest, newest, contiguous, covered, outside)
+        self.commits = list(commits)
+        self.revs = dict(revs) if revs else {c.hexsha: c.hexsha for c in self.commits}
+        return self
+
+    def is_current(self, repo):
+        """True while every rev still resolves to the commit it did when analysed.
+
+        Full SHAs cannot move; branch names, tags, HEAD~n and the like are
+        re-resolved together in one rev-parse.
+        """
+        moving = [rev for rev, sha in self.revs.items() if rev.lower() != sha]
+        if not moving:
+            return True
+        try:
+            now = repo.git.rev_parse(*[f"{rev}^{{commit}}" for rev in moving]).split()
+        except Exception:
+            return False
+        return now == [self.revs[rev] for rev in moving]
+
+    def bind(self, repo):
+        """The same selection with its commits looked up in repo (e.g. another thread's)."""
+        by_sha = {c.hexsha: repo.commit(c.hexsha) for c in self.commits}
+        return MergeSelection(by_sha[self.oldest.hexsha], by_sha[self.newest.hexsha],
+                              self.contiguous, self.covered,
+                              [by_sha[c.hexsha] for c in self.outside],
+                              by_sha.values(), self.revs)
+
+
+def resolve_commits(repo, revs):
+    """Resolve each rev once. Returns (commits without duplicates, {rev: sha}).
+
+    Raises ValueError naming the first rev that is not a commit.
+    """
+    by_sha, resolved = {}, {}
+    for rev in revs:
+        try:
+            commit = repo.commit(rev)
+        except Exception as e:
+            raise ValueError(f"找不到 commit「{rev}」：{e}") from e
+        by_sha.setdefault(commit.hexsha, commit)
+        resolved[rev] = commit.hexsha
+    return list(by_sha.values()), resolved
 
-    Returns (oldest, newest, contiguous, covered, outside) where covered is the
-    number of commits inside the range and outside lists the selected commits
+
+def analyze_merge_selection(repo, commits, revs=None):
+    """Work out the range a merged export would cover. Returns a MergeSelection.
+
+    It unpacks as (oldest, newest, contiguous, covered, outside) where covered is
+    the number of commits inside the range and outside lists the selected commits
     that do not belong to it (i.e. they sit on a different branch).
+
+    revs is the {rev: sha} mapping from resolve_commits, kept so the result can
+    later be checked with MergeSelection.is_current.
+
+    The whole analysis runs on one CommitGraph, so the number of git processes
+    does not grow with the number of selected commits.
     """
-    oldest, newest, contiguous = order_commit_chain(commits, repo)
-    if not is_same_line(repo, oldest, newest):
-        return oldest, newest, False, 0, list(commits)
-    range_shas = commits_in_range(repo, oldest, newest)
+    graph = CommitGraph(repo, commits)
+    oldest, newest, contiguous = order_commit_chain(commits, repo, graph)
+    if not graph.is_ancestor(oldest.hexsha, newest.hexsha):
+        return MergeSelection(oldest, newest, False, 0, list(commits), commits, revs)
+    range_shas = graph.range(oldest.hexsha, newest.hexsha)
     outside = [c for c in commits if c.hexsha not in range_shas]
-    return oldest, newest, contiguous, len(range_shas), outside
-
+    return MergeSelection(oldest, newest, contiguous, len(range_shas), outside,
+                          commits, revs)
 
-def extract_commit(repo, rev, output_base, reporter,
-                   overwrite=False, with_patch=True, name_with_sha=False):
-    """Export the before/after files of one commit. Returns a stats dict or None."""
-    try:
-        commit = repo.commit(rev)
-    except Exception as e:
-        reporter.log(f"✖ 找不到 commit「{rev}」：{e}", "error")
-        return None
 
-    message = (commit.message or "").strip()
-    subject = next((l for l in message.splitlines() if l.strip()), "no_message")
-    date = datetime.fromtimestamp(commit.committed_date)
-    folder = f"{date.strftime('%Y-%m-%d')}_{sanitize_filename(subject)}"
+def commit_folder_name(commit, name_with_sha=False):
+    """Folder name extract_commit uses for commit: YYYY-MM-DD_<subject>[_<short sha>]."""
+    subject = next((l for l in (commit.message or "").strip().splitlines()
+                    if l.strip()), "no_message")
+    folder = (f"{datetime.fromtimestamp(commit.committed_date):%Y-%m-%d}"
+              f"_{sanitize_filename(subject)}")
     if name_with_sha:
         folder += f"_{commit.hexsha[:8]}"
-    out_dir = os.path.join(output_base, folder)
+    return folder
+
+
+def extract_commit(repo, rev, output_base, reporter,
+                   overwrite=False, with_patch=True, name_with_sha=False,
+                   workers=WRITE_WORKERS, shared_store=False):
+    """Export the before/after files of one commit. Returns a stats dict or None.
+
+    The dict's "report" is the ExportStats written to export_stats.json.
+    """
+    stats = ExportStats("commit", rev)
+    with stats.phase("resolve"):
+        try:
+            commit = repo.commit(rev)
+        except Exception as e:
+            reporter.log(f"✖ 找不到 commit「{rev}」：{e}", "error")
+            return None
+
+        message = (commit.message or "").strip()
+        subject = next((l for l in message.splitlines() if l.strip()), "no_message")
+        date = datetime.fromtimestamp(commit.committed_date)
+        folder = commit_folder_name(commit, name_with_sha)
+        out_dir = os.path.join(output_base, folder)
+        stats.target = commit.hexsha
 
     reporter.log(f"▶ {commit.hexsha[:8]}  {subject}", "head")
-    if not _prepare_output_dir(out_dir, reporter, overwrite):
+    manifest = _prepare_output_dir(out_dir, reporter, overwrite, repo)
+    if manifest is None:
         return None
 
     parent = commit.parents[0] if commit.parents else None
     if parent is None:
         reporter.log("ℹ 此 commit 沒有父節點,視為全新加入所有檔案", "muted")
-        changes = _tree_to_changes(commit)
-    else:
-        changes = _diff_to_changes(parent.diff(commit))
+    changes = _diff_commits(repo, parent, commit, reporter,
+                            out_dir if with_patch else None, stats)
 
     if not changes:
         reporter.log("ℹ 此 commit 沒有檔案變更", "muted")
-    entries, failed = _write_changes(
-        out_dir, changes, reporter, repo,
-        org_rev=(parent.hexsha if parent is not None else None),
-        mod_rev=commit.hexsha)
+    store = _open_store(repo, output_base, shared_store)
+    with stats.phase("write"):
+        entries, failed = _write_changes(
+            out_dir, changes, reporter, repo,
+            org_rev=(parent.hexsha if parent is not None else None),
+            mod_rev=commit.hexsha, workers=workers, store=store, manifest=manifest,
+            stats=stats)
+    _log_store(store, reporter)
 
     header = [
         f"Commit:  {commit.hexsha}",
@@ -408,50 +1861,54 @@ def extract_commit(repo, rev, output_base, reporter,
         f"Date:    {date.isoformat()}",
         f"Parent:  {parent.hexsha if parent else '(root commit)'}",
     ]
-    _write_note(os.path.join(out_dir, "commit_message.txt"), header, message, entries)
-
-    if with_patch:
-        try:
-            if parent is not None:
-                data = repo.git.diff(parent.hexsha, commit.hexsha,
-                                     stdout_as_string=False,
-                                     strip_newline_in_stdout=False)
-            else:
-                data = repo.git.show(commit.hexsha,
-                                     stdout_as_string=False,
-                                     strip_newline_in_stdout=False)
-            _write_patch(out_dir, data, reporter)
-        except Exception as e:
-            reporter.log(f"⚠ 無法產生 diff：{e}", "warning")
+    with stats.phase("note"):
+        _write_note(os.path.join(out_dir, "commit_message.txt"), header, message, entries)
+    report = stats.write(out_dir, reporter)
 
     reporter.log(f"✔ 完成 {len(entries)} 個檔案"
                  f"{f'(失敗 {failed})' if failed else ''} → {folder}", "success")
     return {"folder": folder, "out_dir": out_dir,
-            "files": len(entries), "failed": failed}
+            "files": len(entries), "failed": failed, "report": report}
 
 
 def extract_commit_range(repo, revs, output_base, reporter,
-                         overwrite=False, with_patch=True, name_with_sha=False):
+                         overwrite=False, with_patch=True, name_with_sha=False,
+                         workers=WRITE_WORKERS, shared_store=False, selection=None):
     """Export several commits as ONE package: the combined change of the whole run.
 
     ORG holds the files as they were before the oldest commit, MOD as they are
     after the newest one, so intermediate edits collapse into a single result.
+
+    selection is a MergeSelection already computed for these revs (the GUI's
+    pre-flight check). It is used as is unless a branch or tag it was resolved
+    from has moved since, in which case the selection is analysed again.
     """
-    commits = []
-    for rev in revs:
-        try:
-            commits.append(repo.commit(rev))
-        except Exception as e:
-            reporter.log(f"✖ 找不到 commit「{rev}」：{e}", "error")
-            return None
-    # Drop duplicates, keep it deterministic.
-    commits = list({c.hexsha: c for c in commits}.values())
+    stats = ExportStats("range")
+    with stats.phase("resolve"):
+        if selection is not None and (set(selection.revs) != set(revs)
+                                      or not selection.is_current(repo)):
+            reporter.log("ℹ 分析後參照已變動,重新分析選取的 commit", "muted")
+            selection = None
+        if selection is not None:
+            selection = selection.bind(repo)
+            commits = selection.commits
+        else:
+            try:
+                commits, resolved = resolve_commits(repo, revs)
+            except ValueError as e:
+                reporter.log(f"✖ {e}", "error")
+                return None
     if len(commits) == 1:
         return extract_commit(repo, commits[0].hexsha, output_base, reporter,
                               overwrite=overwrite, with_patch=with_patch,
-                              name_with_sha=name_with_sha)
-
-    oldest, newest, contiguous, covered, outside = analyze_merge_selection(repo, commits)
+                              name_with_sha=name_with_sha, workers=workers,
+                              shared_store=shared_store)
+
+    with stats.phase("resolve"):
+        if selection is None:
+            selection = analyze_merge_selection(repo, commits, resolved)
+    oldest, newest, contiguous, covered, outside = selection
+    stats.target = f"{oldest.hexsha}..{newest.hexsha}"
     if outside:
         reporter.log("✖ 選取的 commit 不在同一條線上(分屬不同分支),無法合併成一包", "error")
         return None
@@ -471,22 +1928,26 @@ def extract_commit_range(repo, revs, output_base, reporter,
     if covered > len(commits):
         reporter.log(f"⚠ 這段範圍實際包含 {covered} 筆 commit,"
                      f"其中 {covered - len(commits)} 筆未被選取,變更也會一併匯出", "warning")
-    if not _prepare_output_dir(out_dir, reporter, overwrite):
+    manifest = _prepare_output_dir(out_dir, reporter, overwrite, repo)
+    if manifest is None:
         return None
 
     base = oldest.parents[0] if oldest.parents else None
     if base is None:
         reporter.log("ℹ 起點是初始 commit,視為全新加入所有檔案", "muted")
-        changes = _tree_to_changes(newest)
-    else:
-        changes = _diff_to_changes(base.diff(newest))
+    changes = _diff_commits(repo, base, newest, reporter,
+                            out_dir if with_patch else None, stats)
 
     if not changes:
         reporter.log("ℹ 這段範圍的總變更為空(可能互相抵銷了)", "muted")
-    entries, failed = _write_changes(
-        out_dir, changes, reporter, repo,
-        org_rev=(base.hexsha if base is not None else None),
-        mod_rev=newest.hexsha)
+    store = _open_store(repo, output_base, shared_store)
+    with stats.phase("write"):
+        entries, failed = _write_changes(
+            out_dir, changes, reporter, repo,
+            org_rev=(base.hexsha if base is not None else None),
+            mod_rev=newest.hexsha, workers=workers, store=store, manifest=manifest,
+            stats=stats)
+    _log_store(store, reporter)
 
     ordered = sorted(commits, key=lambda c: c.committed_date)
     header = [
@@ -505,32 +1966,213 @@ def extract_commit_range(repo, revs, output_base, reporter,
                       f"{c.author.name}  {line}")
     if covered > len(commits):
         header.append(f"  (範圍內另有 {covered - len(commits)} 筆未選取的 commit)")
-    _write_note(os.path.join(out_dir, "commit_message.txt"), header, None, entries)
-
-    if with_patch:
-        try:
-            if base is not None:
-                data = repo.git.diff(base.hexsha, newest.hexsha,
-                                     stdout_as_string=False,
-                                     strip_newline_in_stdout=False)
-            else:
-                data = repo.git.show(newest.hexsha,
-                                     stdout_as_string=False,
-                                     strip_newline_in_stdout=False)
-            _write_patch(out_dir, data, reporter)
-        except Exception as e:
-            reporter.log(f"⚠ 無法產生 diff：{e}", "warning")
+    with stats.phase("note"):
+        _write_note(os.path.join(out_dir, "commit_message.txt"), header, None, entries)
+    report = stats.write(out_dir, reporter)
 
     reporter.log(f"✔ 完成 {len(entries)} 個檔案"
                  f"{f'(失敗 {failed})' if failed else ''} → {folder}", "success")
     return {"folder": folder, "out_dir": out_dir,
-            "files": len(entries), "failed": failed}
+            "files": len(entries), "failed": failed, "report": report}
+
+
+def _config_true(value):
+    return value.lower() in ("", "true", "yes", "on", "1")
+
+
+def worktree_accelerators(repo):
+    """(fsmonitor, untracked cache): which status accelerators the repository enables.
+
+    With core.fsmonitor git asks a file-system watcher what changed instead of
+    stat-ing every tracked file; with core.untrackedCache (also implied by
+    feature.manyFiles) it remembers which directories hold no new files. Both only
+    pay off when `git status` may write what it learned back into the index, so
+    callers must not disable optional locks for such repositories.
+    """
+    try:
+        out = repo.git.config(
+            "--get-regexp", r"^(core\.fsmonitor|core\.untrackedcache|feature\.manyfiles)$")
+    except Exception:
+        return False, False
+    values = {}
+    for line in out.splitlines():
+        key, _, value = line.partition(" ")
+        values[key.lower()] = value.strip()
+    fsmonitor = "core.fsmonitor" in values and values["core.fsmonitor"].lower() not in (
+        "false", "no", "off", "0")
+    cache = values.get("core.untrackedcache")
+    if cache is None:
+        untracked_cache = _config_true(values.get("feature.manyfiles", "false"))
+    else:
+        untracked_cache = cache.lower() == "keep" or _config_true(cache)
+    return fsmonitor, untracked_cache
+
+
+class WorkTreeStatus:
+    """Uncommitted changes against HEAD, from one `git status --porcelain=v2 -z` pass.
+
+    A single status run classifies everything - staged and unstaged, renames, and
+    (optionally) untracked files - instead of a HEAD-to-work-tree diff, a second
+    scan for untracked files and a stat per path.
+
+    changes is a list of (status, display path, HEAD path, HEAD blob sha, HEAD mode,
+    work-tree path); the HEAD fields are None for added files and the work-tree path
+    is None for deleted ones. for_repo() turns them into _write_changes items.
+    Submodules are left out.
+
+    Status runs in git's default untracked mode, with wholly untracked directories
+    collapsed to "dir/" - the only mode the untracked cache answers, and the output
+    is_current compares against - and just those directories are expanded
+    afterwards, by one `git ls-files`. core.fsmonitor is used by git on its own.
+    """
+
+    def __init__(self, repo, include_untracked=True):
+        self.include_untracked = include_untracked
+        self.head = repo.head.commit.hexsha
+        self.fsmonitor = worktree_accelerators(repo)[0]
+        self.changes = []
+        work_dir = repo.working_tree_dir
+        raw = self._summary = self._status(repo)
+        self._index = self._index_stat(repo)
+        dirs = [r[2:] for r in raw.split(b"\0") if r[:2] == b"? " and r[-1:] == b"/"]
+        self._untracked_dirs = [os.path.join(work_dir, d.decode("utf-8", "surrogateescape"))
+                                for d in dirs]
+        # Walked before ls-files lists them: a file added in between moves a folder's
+        # mtime past what was recorded, so is_current cannot miss it.
+        walked = self._walk_untracked()
+        if dirs:
+            raw += b"".join(b"? " + f + b"\0" for f in b"".join(_git_output(
+                repo, "ls-files", "-z", "--others", "--exclude-standard", "--",
+                *[":(literal)" + d.decode("utf-8", "surrogateescape") for d in dirs]
+            )).split(b"\0") if f)
+        fields = iter(raw.split(b"\0"))
+        for record in fields:
+            kind = record[:1]
+            if kind == b"?":
+                path = record[2:].decode("utf-8", "surrogateescape")
+                # A nested repository is listed as a directory ("sub/"); skip it.
+                if not path.endswith("/"):
+                    self.changes.append(("UNTRACKED", path, None, None, None, path))
+                continue
+            if kind not in (b"1", b"2", b"u"):
+                continue
+            parts = record.split(b" ", {b"1": 8, b"2": 9, b"u": 10}[kind])
+            xy, sub = parts[1].decode("ascii"), parts[2]
+            path = parts[-1].decode("utf-8", "surrogateescape")
+            orig = (next(fields).decode("utf-8", "surrogateescape")
+                    if kind == b"2" else path)
+            if sub.startswith(b"S"):
+                continue
+            # HEAD's side: the HEAD entry, or "ours" (stage 2) during a conflict.
+            mode, sha = (parts[3], parts[6]) if kind != b"u" else (parts[4], parts[8])
+            in_head = sha.strip(b"0") != b""
+            if xy[1] == "D" or (xy[0] == "D" and not os.path.isfile(
+                    os.path.join(work_dir, path))):
+                if in_head:
+                    self.changes.append(("DELETED", orig, orig, sha.decode("ascii"),
+                                         int(mode, 8), None))
+            elif not in_head or xy[0] == "C":
+                self.changes.append(("ADDED", path, None, None, None, path))
+            elif kind == b"2":
+                self.changes.append(("RENAMED", f"{orig} → {path}", orig,
+                                     sha.decode("ascii"), int(mode, 8), path))
+            else:
+                self.changes.append(("MODIFIED", path, path, sha.decode("ascii"),
+                                     int(mode, 8), path))
+        # An entry removed from the index but still on disk is reported as deleted
+        # and again as untracked; it is a modification of the HEAD version.
+        kept = {c[5] for c in self.changes if c[0] != "UNTRACKED"}
+        self.changes = [c for c in self.changes
+                        if c[0] != "UNTRACKED" or c[5] not in kept]
+        self._stamp = (self._stat_listed(repo), walked)
+
+    def _status(self, repo):
+        return b"".join(_git_output(
+            repo, "status", "--porcelain=v2", "-z", "--find-renames",
+            "--untracked-files=" + ("normal" if self.include_untracked else "no")))
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(long_path(path))
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _index_stat(self, repo):
+        return self._stat(os.path.join(repo.git_dir, "index"))
+
+    def _stat_listed(self, repo):
+        work_dir = repo.working_tree_dir
+        return [self._stat(os.path.join(work_dir, c[5] or c[2])) for c in self.changes]
+
+    def _walk_untracked(self):
+        """{folder: mtime} for every folder inside the collapsed untracked ones."""
+        folders = {}
+        for top in self._untracked_dirs:
+            if os.path.exists(os.path.join(top, ".git")):
+                continue    # a nested repository; skipped by the export as well
+            for folder, _dirs, _files in os.walk(long_path(top)):
+                folders[folder] = self._stat(folder)
+        return folders
+
+    def is_current(self, repo, include_untracked=True):
+        """True when nothing this snapshot describes has changed since it was taken.
+
+        git status (in the snapshot's own mode) must print exactly what it printed
+        then - which catches edits to clean files, new files next to tracked ones and
+        anything staged - while HEAD, the index file, every listed file and every
+        folder under a collapsed untracked one keep their stat: status does not show
+        a second edit to a modified file, or a new file inside an untracked folder.
+        That skips listing untracked folders and parsing; git still looks at every
+        tracked file, so the check is sound rather than free.
+
+        With core.fsmonitor a new scan is itself cheap and exact, so the snapshot is
+        never reused.
+        """
+        if self.fsmonitor or (include_untracked and not self.include_untracked):
+            return False
+        try:
+            if (repo.head.commit.hexsha != self.head
+                    or self._index_stat(repo) != self._index):
+                return False
+            if self._status(repo) != self._summary:
+                return False
+        except Exception:
+            return False
+        if (self._stat_listed(repo), self._walk_untracked()) != self._stamp:
+            return False
+        # status may have refreshed the index file; keep the next check comparable.
+        self._index = self._index_stat(repo)
+        return True
+
+    def for_repo(self, repo, include_untracked=True):
+        """(status, display, ORG blob, WorkTreeFile) items for _write_changes."""
+        work_dir = repo.working_tree_dir
+        items = []
+        for status, display, head_path, sha, mode, path in self.changes:
+            if status == "UNTRACKED" and not include_untracked:
+                continue
+            a_blob = (Blob(repo, bytes.fromhex(sha), mode, head_path)
+                      if sha is not None else None)
+            b_side = (WorkTreeFile(path, os.path.join(work_dir, path))
+                      if path is not None else None)
+            items.append((status, display, a_blob, b_side))
+        return items
 
 
 def extract_working_tree(repo, output_base, reporter,
-                         overwrite=False, with_patch=True, include_untracked=True):
-    """Export uncommitted changes (working tree + index) against HEAD."""
-    work_dir = repo.working_tree_dir
+                         overwrite=False, with_patch=True, include_untracked=True,
+                         workers=WRITE_WORKERS, shared_store=False, status=None,
+                         link_worktree=False):
+    """Export uncommitted changes (working tree + index) against HEAD.
+
+    status is a WorkTreeStatus taken earlier (the GUI's uncommitted tab); it is used
+    instead of a new scan when WorkTreeStatus.is_current confirms nothing changed.
+
+    link_worktree lets MOD/ files be hardlinks to the working tree when no reflink is
+    possible: instant and free on the same volume, but the two stay one file.
+    """
     folder = datetime.now().strftime("%Y-%m-%d_%H%M") + "_uncommitted"
     out_dir = os.path.join(output_base, folder)
 
@@ -541,959 +2183,327 @@ def extract_working_tree(repo, output_base, reporter,
         reporter.log(f"✖ 無法讀取 HEAD：{e}", "error")
         return None
 
-    # (status, path, blob for ORG, on-disk file for MOD)
-    changes = []
-    for d in head.diff(None):
-        path = d.b_path or d.a_path
-        disk = os.path.join(work_dir, path)
-        if not os.path.exists(disk):
-            changes.append(("DELETED", d.a_path, d.a_blob, None))
-        elif d.a_blob is None:
-            changes.append(("ADDED", path, None, disk))
+    stats = ExportStats("worktree", head.hexsha)
+    with stats.phase("status"):
+        if status is not None and status.is_current(repo, include_untracked):
+            reporter.log("ℹ 工作區自上次讀取後沒有變動,沿用該份清單", "muted")
         else:
-            changes.append(("MODIFIED", path, d.a_blob, disk))
-
-    if include_untracked:
-        for path in repo.untracked_files:
-            disk = os.path.join(work_dir, path)
-            if os.path.isfile(disk):
-                changes.append(("UNTRACKED", path, None, disk))
+            status = WorkTreeStatus(repo, include_untracked)
+        stats.count("git_processes")
+        changes = status.for_repo(repo, include_untracked)
 
     if not changes:
         reporter.log("ℹ 工作區沒有任何未提交的變更", "muted")
         return None
-    if not _prepare_output_dir(out_dir, reporter, overwrite):
+    manifest = _prepare_output_dir(out_dir, reporter, overwrite, repo)
+    if manifest is None:
         return None
 
-    total = len(changes)
-    entries, failed = [], 0
-    for idx, (status, path, a_blob, disk) in enumerate(changes, 1):
-        if reporter.cancelled:
-            reporter.log("■ 使用者已取消", "warning")
-            break
-        reporter.progress(idx, total)
-        try:
-            if a_blob is not None:
-                write_blob(os.path.join(out_dir, "ORG", a_blob.path), a_blob,
-                           repo, "HEAD", reporter)
-            if disk is not None:
-                copy_file(disk, os.path.join(out_dir, "MOD", path))
-            entries.append((status, path))
-            reporter.log(f"   [{status}] {path}",
-                         "added" if status == "UNTRACKED" else status.lower())
-        except Exception as e:
-            failed += 1
-            reporter.log(f"   ✖ 無法輸出 {path}：{e}", "error")
+    store = _open_store(repo, output_base, shared_store)
+    with stats.phase("write"):
+        entries, failed = _write_changes(
+            out_dir, changes, reporter, repo, org_rev=head.hexsha, workers=workers,
+            store=store, link_worktree=link_worktree, manifest=manifest, stats=stats)
+    _log_store(store, reporter)
 
     header = [
         "Commit:  (uncommitted working tree)",
         f"Base:    {head.hexsha}",
         f"Date:    {datetime.now().isoformat(timespec='seconds')}",
     ]
-    _write_note(os.path.join(out_dir, "commit_message.txt"), header, None, entries)
+    with stats.phase("note"):
+        _write_note(os.path.join(out_dir, "commit_message.txt"), header, None, entries)
 
     if with_patch:
-        try:
-            _write_patch(out_dir,
-                         repo.git.diff("HEAD",
-                                       stdout_as_string=False,
-                                       strip_newline_in_stdout=False),
-                         reporter)
-            reporter.log("ℹ changes.patch 不包含未追蹤(untracked)檔案", "muted")
-        except Exception as e:
-            reporter.log(f"⚠ 無法產生 diff：{e}", "warning")
+        with stats.phase("patch"):
+            stats.count("git_processes")
+            stats.count("patch_bytes", _write_patch(
+                out_dir, _git_output(repo, "diff", "--no-color", "--no-ext-diff", "HEAD"),
+                reporter))
+        reporter.log("ℹ changes.patch 不包含未追蹤(untracked)檔案", "muted")
+    report = stats.write(out_dir, reporter)
 
     reporter.log(f"✔ 完成 {len(entries)} 個檔案"
                  f"{f'(失敗 {failed})' if failed else ''} → {folder}", "success")
     return {"folder": folder, "out_dir": out_dir,
-            "files": len(entries), "failed": failed}
+            "files": len(entries), "failed": failed, "report": report}
 
 
 # --------------------------------------------------------------------------
-# GUI
+# Batch export / command line
 # --------------------------------------------------------------------------
-def pick_font(candidates, fallback):
-    available = set(tkfont.families())
-    for name in candidates:
-        if name in available:
-            return name
-    return fallback
-
+_batch_repos = {}
 
-class GitExportApp(ttk.Window):
 
-    def __init__(self):
-        self.config_data = load_config()
-        theme = self.config_data.get("theme", DEFAULT_THEME)
-        if theme not in THEME_CHOICES:
-            theme = DEFAULT_THEME
-        super().__init__(title=f"{APP_NAME}  v{APP_VERSION}", themename=theme,
-                         size=(1180, 880), minsize=(980, 640))
-
-        self.queue = queue.Queue()
-        self.cancel_event = threading.Event()
-        self.worker = None
-        self.repo_ok = False
-        self.commits = []
-        self._validate_job = None
-        # Most-recently-used path lists; legacy single-value keys are migrated in.
-        self.repo_history = push_history(
-            list(self.config_data.get("repo_history", [])),
-            self.config_data.get("git", ""))
-        self.out_history = push_history(
-            list(self.config_data.get("out_history", [])),
-            self.config_data.get("out", ""))
-
-        self.ui_font = pick_font(UI_FONT_CANDIDATES, "TkDefaultFont")
-        self.mono_font = pick_font(MONO_FONT_CANDIDATES, "TkFixedFont")
-        self._init_fonts()
-        self._build_ui()
-        self._apply_palette()
-        self._restore_config()
-
-        self.protocol("WM_DELETE_WINDOW", self._on_close)
-        self.after(80, self._drain_queue)
-        self._validate_repo()
-
-    # -- setup -------------------------------------------------------------
-    def _init_fonts(self):
-        for name, size in (("TkDefaultFont", 10), ("TkTextFont", 10),
-                           ("TkMenuFont", 10), ("TkHeadingFont", 10)):
-            try:
-                tkfont.nametofont(name).configure(family=self.ui_font, size=size)
-            except tk.TclError:
-                pass
-        try:
-            tkfont.nametofont("TkFixedFont").configure(family=self.mono_font, size=10)
-        except tk.TclError:
-            pass
-        self.style.configure("Treeview", rowheight=26)
-        self.style.configure("Treeview.Heading", font=(self.ui_font, 10, "bold"))
-        # Secondary text: readable in both light and dark themes.
-        self.style.configure("Muted.TLabel", foreground=self._muted_color())
-
-    def _muted_color(self):
-        c = self.style.colors
-        try:
-            return c.make_transparent(0.6, c.fg, c.bg)
-        except Exception:
-            return c.secondary
-
-    def _build_ui(self):
-        root = ttk.Frame(self, padding=(16, 12, 16, 10))
-        root.pack(fill=BOTH, expand=YES)
-        root.rowconfigure(3, weight=1)
-        root.columnconfigure(0, weight=1)
-
-        self._build_header(root).grid(row=0, column=0, sticky=EW)
-        ttk.Separator(root).grid(row=1, column=0, sticky=EW, pady=(10, 12))
-        self._build_repo_card(root).grid(row=2, column=0, sticky=EW)
-
-        body = ttk.Frame(root)
-        body.grid(row=3, column=0, sticky=NSEW, pady=(12, 0))
-        body.rowconfigure(0, weight=3, minsize=300)
-        body.rowconfigure(1, weight=2, minsize=180)
-        body.columnconfigure(0, weight=1)
-
-        upper = ttk.Frame(body)
-        upper.grid(row=0, column=0, sticky=NSEW)
-        upper.rowconfigure(0, weight=1)
-        upper.columnconfigure(0, weight=1)
-        upper.columnconfigure(1, minsize=340)
-        self._build_source_card(upper).grid(row=0, column=0, sticky=NSEW)
-        self._build_side_column(upper).grid(row=0, column=1, sticky="new", padx=(12, 0))
-
-        self._build_log_card(body).grid(row=1, column=0, sticky=NSEW, pady=(12, 0))
-        self._build_action_bar(root).grid(row=4, column=0, sticky=EW, pady=(12, 0))
-        self._build_status_bar(root).grid(row=5, column=0, sticky=EW, pady=(10, 0))
-
-        self.bind("<Control-Return>", lambda e: self._start_export())
-        self.bind("<F5>", lambda e: self._load_commits())
-
-    def _build_header(self, master):
-        bar = ttk.Frame(master)
-        bar.columnconfigure(1, weight=1)
-
-        text = ttk.Frame(bar)
-        text.grid(row=0, column=0, sticky=W)
-        ttk.Label(text, text=APP_NAME,
-                  font=(self.ui_font, 19, "bold")).pack(anchor=W)
-        ttk.Label(text, text="匯出 commit 的變更前 / 變更後檔案,方便比對與存檔",
-                  style="Muted.TLabel").pack(anchor=W, pady=(2, 0))
-
-        right = ttk.Frame(bar)
-        right.grid(row=0, column=2, sticky=E)
-        ttk.Label(right, text="外觀主題", style="Muted.TLabel").pack(side=LEFT, padx=(0, 8))
-        self.theme_var = tk.StringVar(value=self.style.theme.name)
-        theme_box = ttk.Combobox(right, textvariable=self.theme_var, width=12,
-                                 values=THEME_CHOICES, state="readonly")
-        theme_box.pack(side=LEFT)
-        theme_box.bind("<<ComboboxSelected>>", self._on_theme_change)
-        return bar
-
-    def _build_repo_card(self, master):
-        card = ttk.Labelframe(master, text=" ① Git 儲存庫 ", padding=12)
-        card.columnconfigure(1, weight=1)
-
-        ttk.Label(card, text="路徑").grid(row=0, column=0, sticky=W, padx=(0, 10))
-        self.repo_var = tk.StringVar()
-        self.repo_box = ttk.Combobox(card, textvariable=self.repo_var,
-                                     values=self.repo_history, font=(self.mono_font, 10))
-        self.repo_box.grid(row=0, column=1, sticky=EW)
-        ToolTip(self.repo_box, text="可直接輸入,或從下拉選單挑選用過的儲存庫",
-                bootstyle=(INFO, INVERSE))
-        self.repo_var.trace_add("write", lambda *_: self._schedule_validate())
-
-        ttk.Button(card, text="瀏覽…", bootstyle=(OUTLINE, PRIMARY), width=8,
-                   command=self._browse_repo).grid(row=0, column=2, padx=(8, 0))
-        forget = ttk.Button(card, text="✕", bootstyle=(OUTLINE, DANGER), width=3,
-                            command=lambda: self._forget_path("repo"))
-        forget.grid(row=0, column=3, padx=(6, 0))
-        ToolTip(forget, text="把目前路徑從歷史紀錄中移除", bootstyle=(INFO, INVERSE))
-
-        self.repo_state = ttk.Label(card, text="尚未選擇儲存庫", style="Muted.TLabel")
-        self.repo_state.grid(row=1, column=1, columnspan=3, sticky=W, pady=(8, 0))
-        return card
-
-    def _build_source_card(self, master):
-        card = ttk.Labelframe(master, text=" ② 要匯出的內容 ", padding=12)
-        card.rowconfigure(0, weight=1)
-        card.columnconfigure(0, weight=1)
-
-        self.tabs = ttk.Notebook(card, bootstyle=PRIMARY)
-        self.tabs.grid(row=0, column=0, sticky=NSEW)
-        self.tabs.add(self._build_commit_tab(self.tabs), text="  Commit 清單  ")
-        self.tabs.add(self._build_manual_tab(self.tabs), text="  手動輸入 SHA  ")
-        self.tabs.add(self._build_dirty_tab(self.tabs), text="  未提交的變更  ")
-        return card
-
-    def _build_commit_tab(self, master):
-        tab = ttk.Frame(master, padding=12)
-        tab.rowconfigure(1, weight=1)
-        tab.columnconfigure(0, weight=1)
-
-        bar = ttk.Frame(tab)
-        bar.grid(row=0, column=0, sticky=EW, pady=(0, 10))
-        bar.columnconfigure(5, weight=1)
-
-        ttk.Label(bar, text="分支").grid(row=0, column=0, padx=(0, 6))
-        self.branch_var = tk.StringVar(value="HEAD")
-        self.branch_box = ttk.Combobox(bar, textvariable=self.branch_var,
-                                       width=22, values=["HEAD"], state="readonly")
-        self.branch_box.grid(row=0, column=1)
-        self.branch_box.bind("<<ComboboxSelected>>", lambda e: self._load_commits())
-
-        ttk.Label(bar, text="筆數").grid(row=0, column=2, padx=(12, 6))
-        self.limit_var = tk.StringVar(value="100")
-        ttk.Combobox(bar, textvariable=self.limit_var, width=6,
-                     values=COMMIT_LIMITS, state="readonly").grid(row=0, column=3)
-
-        reload_btn = ttk.Button(bar, text="重新載入", bootstyle=(OUTLINE, INFO),
-                                command=self._load_commits)
-        reload_btn.grid(row=0, column=4, padx=(12, 0))
-        ToolTip(reload_btn, text="重新讀取 commit 清單 (F5)", bootstyle=(INFO, INVERSE))
-
-        ttk.Label(bar, text="搜尋", style="Muted.TLabel").grid(row=0, column=6,
-                                                             sticky=E, padx=(12, 6))
-        self.filter_var = tk.StringVar()
-        filter_entry = ttk.Entry(bar, textvariable=self.filter_var, width=24)
-        filter_entry.grid(row=0, column=7, sticky=E)
-        self.filter_var.trace_add("write", lambda *_: self._apply_filter())
-        ToolTip(filter_entry, text="以 SHA / 作者 / 標題關鍵字過濾",
-                bootstyle=(INFO, INVERSE))
-
-        wrap = ttk.Frame(tab)
-        wrap.grid(row=1, column=0, sticky=NSEW)
-        wrap.rowconfigure(0, weight=1)
-        wrap.columnconfigure(0, weight=1)
-
-        columns = ("sha", "date", "author", "subject")
-        self.tree = ttk.Treeview(wrap, columns=columns, show="headings", height=10,
-                                 selectmode=EXTENDED, bootstyle=PRIMARY)
-        for col, title, width, anchor, stretch in (
-                ("sha", "SHA", 90, W, False),
-                ("date", "日期", 130, W, False),
-                ("author", "作者", 130, W, False),
-                ("subject", "標題", 420, W, True)):
-            self.tree.heading(col, text=title, anchor=W)
-            self.tree.column(col, width=width, anchor=anchor, stretch=stretch)
-        self.tree.grid(row=0, column=0, sticky=NSEW)
-        self.tree.bind("<Double-1>", self._show_commit_detail)
-        self.tree.bind("<<TreeviewSelect>>", lambda e: self._update_selection_hint())
-
-        vbar = ttk.Scrollbar(wrap, orient=VERTICAL, command=self.tree.yview,
-                             bootstyle=ROUND)
-        vbar.grid(row=0, column=1, sticky=NS)
-        self.tree.configure(yscrollcommand=vbar.set)
-
-        self.select_hint = ttk.Label(
-            tab, text="可用 Ctrl / Shift 複選;連按兩下可查看完整 commit 訊息",
-            style="Muted.TLabel")
-        self.select_hint.grid(row=2, column=0, sticky=W, pady=(8, 0))
-        return tab
-
-    def _build_manual_tab(self, master):
-        tab = ttk.Frame(master, padding=12)
-        tab.rowconfigure(1, weight=1)
-        tab.columnconfigure(0, weight=1)
-
-        ttk.Label(tab, text="輸入一或多筆 commit SHA / 分支 / tag,以空白、逗號或換行分隔:",
-                  style="Muted.TLabel").grid(row=0, column=0, sticky=W, pady=(0, 8))
-
-        wrap = ttk.Frame(tab)
-        wrap.grid(row=1, column=0, sticky=NSEW)
-        wrap.rowconfigure(0, weight=1)
-        wrap.columnconfigure(0, weight=1)
-
-        self.sha_text = tk.Text(wrap, height=6, wrap="word", relief=FLAT,
-                                font=(self.mono_font, 10), padx=10, pady=8)
-        self.sha_text.grid(row=0, column=0, sticky=NSEW)
-        sbar = ttk.Scrollbar(wrap, orient=VERTICAL, command=self.sha_text.yview,
-                             bootstyle=ROUND)
-        sbar.grid(row=0, column=1, sticky=NS)
-        self.sha_text.configure(yscrollcommand=sbar.set)
-        return tab
-
-    def _build_dirty_tab(self, master):
-        tab = ttk.Frame(master, padding=12)
-        tab.rowconfigure(1, weight=1)
-        tab.columnconfigure(0, weight=1)
-
-        bar = ttk.Frame(tab)
-        bar.grid(row=0, column=0, sticky=EW, pady=(0, 8))
-        bar.columnconfigure(0, weight=1)
-        ttk.Label(bar, text="直接匯出工作區中尚未 commit 的變更(含已 staged 的內容)",
-                  style="Muted.TLabel").grid(row=0, column=0, sticky=W)
-        ttk.Button(bar, text="重新檢查", bootstyle=(OUTLINE, INFO),
-                   command=self._refresh_dirty).grid(row=0, column=1)
-
-        wrap = ttk.Frame(tab)
-        wrap.grid(row=1, column=0, sticky=NSEW)
-        wrap.rowconfigure(0, weight=1)
-        wrap.columnconfigure(0, weight=1)
-
-        self.dirty_text = tk.Text(wrap, wrap="none", relief=FLAT, state=DISABLED,
-                                  font=(self.mono_font, 10), padx=10, pady=8)
-        self.dirty_text.grid(row=0, column=0, sticky=NSEW)
-        dbar = ttk.Scrollbar(wrap, orient=VERTICAL, command=self.dirty_text.yview,
-                             bootstyle=ROUND)
-        dbar.grid(row=0, column=1, sticky=NS)
-        self.dirty_text.configure(yscrollcommand=dbar.set)
-        return tab
-
-    def _build_side_column(self, master):
-        col = ttk.Frame(master)
-        col.columnconfigure(0, weight=1)
-
-        out = ttk.Labelframe(col, text=" ③ 輸出資料夾 ", padding=12)
-        out.grid(row=0, column=0, sticky=EW)
-        out.columnconfigure(0, weight=1)
-
-        out.columnconfigure(1, weight=1)
-        self.out_var = tk.StringVar()
-        self.out_box = ttk.Combobox(out, textvariable=self.out_var,
-                                    values=self.out_history, font=(self.mono_font, 10))
-        self.out_box.grid(row=0, column=0, columnspan=3, sticky=EW)
-        ToolTip(self.out_box, text="可直接輸入,或從下拉選單挑選用過的輸出資料夾",
-                bootstyle=(INFO, INVERSE))
-
-        ttk.Button(out, text="瀏覽…", bootstyle=(OUTLINE, PRIMARY),
-                   command=self._browse_output).grid(row=1, column=0, sticky=EW,
-                                                     pady=(8, 0), padx=(0, 4))
-        ttk.Button(out, text="開啟資料夾", bootstyle=(OUTLINE, INFO),
-                   command=self._open_output).grid(row=1, column=1, sticky=EW,
-                                                   pady=(8, 0), padx=(0, 4))
-        forget = ttk.Button(out, text="✕", bootstyle=(OUTLINE, DANGER), width=3,
-                            command=lambda: self._forget_path("out"))
-        forget.grid(row=1, column=2, sticky=E, pady=(8, 0))
-        ToolTip(forget, text="把目前路徑從歷史紀錄中移除", bootstyle=(INFO, INVERSE))
-
-        opt = ttk.Labelframe(col, text=" ④ 選項 ", padding=12)
-        opt.grid(row=1, column=0, sticky=EW, pady=(12, 0))
-        opt.columnconfigure(0, weight=1)
-
-        self.opt_overwrite = tk.BooleanVar(value=False)
-        self.opt_patch = tk.BooleanVar(value=True)
-        self.opt_sha_suffix = tk.BooleanVar(value=False)
-        self.opt_untracked = tk.BooleanVar(value=True)
-        self.opt_auto_open = tk.BooleanVar(value=False)
-
-        for row, (var, text, tip) in enumerate((
-                (self.opt_overwrite, "覆蓋已存在的輸出資料夾",
-                 "關閉時會略過同名資料夾。開啟時只會覆蓋本工具產生的資料夾"),
-                (self.opt_patch, "同時輸出 changes.patch",
-                 "以 git diff 產生 unified diff 檔"),
-                (self.opt_sha_suffix, "資料夾名稱加上短 SHA",
-                 "避免同日期、同標題的 commit 互相衝突"),
-                (self.opt_untracked, "未提交模式包含未追蹤檔案",
-                 "把 untracked 檔案一併複製到 MOD"),
-                (self.opt_auto_open, "完成後自動開啟輸出資料夾", None))):
-            cb = ttk.Checkbutton(opt, text=text, variable=var,
-                                 bootstyle="round-toggle")
-            cb.grid(row=row, column=0, sticky=W, pady=4)
-            if tip:
-                ToolTip(cb, text=tip, bootstyle=(INFO, INVERSE))
-
-        merge = ttk.Labelframe(col, text=" ⑤ 選多筆 commit 時 ", padding=12)
-        merge.grid(row=2, column=0, sticky=EW, pady=(12, 0))
-        merge.columnconfigure(0, weight=1)
-
-        self.merge_mode = tk.StringVar(value="separate")
-        for row, (value, text, tip) in enumerate((
-                ("separate", "分開匯出(每筆一個資料夾)",
-                 "選幾筆就產生幾個資料夾,各自是該 commit 的變更"),
-                ("merged", "合併成一包(整段總變更)",
-                 "把連續的 commit 當成一次修改：ORG 是最舊 commit 之前的版本,"
-                 "MOD 是最新 commit 之後的版本,中間過程會被壓平"))):
-            rb = ttk.Radiobutton(merge, text=text, value=value,
-                                 variable=self.merge_mode, bootstyle=PRIMARY,
-                                 command=self._update_selection_hint)
-            rb.grid(row=row, column=0, sticky=W, pady=4)
-            ToolTip(rb, text=tip, bootstyle=(INFO, INVERSE))
-        return col
-
-    def _build_log_card(self, master):
-        card = ttk.Labelframe(master, text=" ⑥ 執行紀錄 ", padding=12)
-        card.rowconfigure(0, weight=1)
-        card.columnconfigure(0, weight=1)
-
-        self.log_text = tk.Text(card, wrap="none", relief=FLAT, state=DISABLED, height=8,
-                                font=(self.mono_font, 10), padx=10, pady=8)
-        self.log_text.grid(row=0, column=0, sticky=NSEW)
-        vbar = ttk.Scrollbar(card, orient=VERTICAL, command=self.log_text.yview,
-                             bootstyle=ROUND)
-        vbar.grid(row=0, column=1, sticky=NS)
-        hbar = ttk.Scrollbar(card, orient=HORIZONTAL, command=self.log_text.xview,
-                             bootstyle=ROUND)
-        hbar.grid(row=1, column=0, sticky=EW)
-        self.log_text.configure(yscrollcommand=vbar.set, xscrollcommand=hbar.set)
-        return card
-
-    def _build_action_bar(self, master):
-        bar = ttk.Frame(master)
-        bar.columnconfigure(0, weight=1)
-
-        self.progress = ttk.Progressbar(bar, mode="determinate",
-                                        bootstyle=(SUCCESS, STRIPED))
-        self.progress.grid(row=0, column=0, sticky=EW, padx=(0, 16))
-
-        self.clear_btn = ttk.Button(bar, text="清除紀錄", bootstyle=(LINK, INFO),
-                                    command=self._clear_log)
-        self.clear_btn.grid(row=0, column=1, padx=(0, 8))
-
-        self.cancel_btn = ttk.Button(bar, text="取消", bootstyle=(OUTLINE, DANGER),
-                                     width=8, state=DISABLED, command=self._cancel)
-        self.cancel_btn.grid(row=0, column=2, padx=(0, 8))
-
-        self.export_btn = ttk.Button(bar, text="開始匯出", bootstyle=SUCCESS,
-                                     width=14, command=self._start_export)
-        self.export_btn.grid(row=0, column=3)
-        ToolTip(self.export_btn, text="Ctrl + Enter", bootstyle=(INFO, INVERSE))
-        return bar
-
-    def _build_status_bar(self, master):
-        bar = ttk.Frame(master)
-        bar.columnconfigure(0, weight=1)
-        self.status_var = tk.StringVar(value="就緒")
-        ttk.Label(bar, textvariable=self.status_var,
-                  style="Muted.TLabel").grid(row=0, column=0, sticky=W)
-        ttk.Label(bar, text=f"{APP_NAME} v{APP_VERSION}",
-                  style="Muted.TLabel").grid(row=0, column=1, sticky=E)
-        return bar
-
-    # -- appearance --------------------------------------------------------
-    def _apply_palette(self):
-        c = self.style.colors
-        for widget in (self.log_text, self.sha_text, self.dirty_text):
-            widget.configure(background=c.inputbg, foreground=c.inputfg,
-                             insertbackground=c.inputfg,
-                             selectbackground=c.selectbg,
-                             selectforeground=c.selectfg,
-                             highlightthickness=0, borderwidth=0)
-        tags = {
-            "info": c.inputfg,
-            "muted": self._muted_color(),
-            "head": c.primary,
-            "success": c.success,
-            "warning": c.warning,
-            "error": c.danger,
-            "added": c.success,
-            "deleted": c.danger,
-            "modified": c.info,
-            "renamed": c.warning,
-            "untracked": c.success,
-        }
-        for tag, color in tags.items():
-            self.log_text.tag_configure(tag, foreground=color)
-        self.log_text.tag_configure("head", foreground=c.primary,
-                                    font=(self.mono_font, 10, "bold"))
+def _log_reused(reporter, sha, stats):
+    reporter.log(f"↷ {sha[:8]} 已匯出過,略過 → {stats['folder']}", "muted")
+    return stats
 
-    def _on_theme_change(self, _event=None):
-        name = self.theme_var.get()
-        try:
-            self.style.theme_use(name)
-        except Exception:
-            return
-        self._init_fonts()
-        self._apply_palette()
-
-    # -- repository --------------------------------------------------------
-    def _browse_repo(self):
-        initial = self.repo_var.get().strip() or os.getcwd()
-        path = filedialog.askdirectory(title="選擇 Git 儲存庫", initialdir=initial)
-        if path:
-            self.repo_var.set(os.path.normpath(path))
-
-    def _browse_output(self):
-        initial = self.out_var.get().strip() or os.getcwd()
-        path = filedialog.askdirectory(title="選擇輸出資料夾", initialdir=initial)
-        if path:
-            self.out_var.set(os.path.normpath(path))
-            self._remember_path("out", path)
-
-    # -- path history ------------------------------------------------------
-    def _remember_path(self, kind, path):
-        if kind == "repo":
-            self.repo_history = push_history(self.repo_history, path)
-        else:
-            self.out_history = push_history(self.out_history, path)
-        self._refresh_history()
-
-    def _forget_path(self, kind):
-        box, current = ((self.repo_box, self.repo_var.get())
-                        if kind == "repo" else (self.out_box, self.out_var.get()))
-        current = os.path.normpath(current.strip()) if current.strip() else ""
-        if not current:
-            return
-        keep = [p for p in (self.repo_history if kind == "repo" else self.out_history)
-                if p.lower() != current.lower()]
-        if kind == "repo":
-            self.repo_history = keep
-        else:
-            self.out_history = keep
-        self._refresh_history()
-        box.set("")
-        self.status_var.set(f"已從歷史紀錄移除：{current}")
-
-    def _refresh_history(self):
-        self.repo_box.configure(values=self.repo_history)
-        self.out_box.configure(values=self.out_history)
-
-    def _open_output(self):
-        if not open_folder(self.out_var.get().strip()):
-            Messagebox.show_warning("輸出資料夾不存在", title="開啟失敗", parent=self)
-
-    def _schedule_validate(self):
-        if self._validate_job:
-            self.after_cancel(self._validate_job)
-        self._validate_job = self.after(400, self._validate_repo)
-
-    def _validate_repo(self):
-        self._validate_job = None
-        path = self.repo_var.get().strip()
-        self.repo_ok = False
-        if not path:
-            self.repo_state.configure(text="尚未選擇儲存庫", style="Muted.TLabel")
-            return
-        try:
-            repo = Repo(path, search_parent_directories=False)
-            head = repo.head.commit
-            try:
-                branch = repo.active_branch.name
-            except TypeError:
-                branch = "(detached HEAD)"
-            dirty = repo.is_dirty(untracked_files=True)
-            self.repo_ok = True
-            self.repo_state.configure(
-                text=f"✓ 分支 {branch} · HEAD {head.hexsha[:8]} · "
-                     f"{'有未提交變更' if dirty else '工作區乾淨'}",
-                bootstyle=SUCCESS)
-            self._remember_path("repo", path)
-            branches = ["HEAD"] + sorted(b.name for b in repo.branches)
-            self.branch_box.configure(values=branches)
-            if self.branch_var.get() not in branches:
-                self.branch_var.set("HEAD")
-            self._load_commits()
-            self._refresh_dirty()
-        except (InvalidGitRepositoryError, NoSuchPathError):
-            self.repo_state.configure(text="✖ 此路徑不是 Git 儲存庫", bootstyle=DANGER)
-        except Exception as e:
-            self.repo_state.configure(text=f"✖ 無法讀取儲存庫：{e}", bootstyle=DANGER)
-
-    # -- commit list -------------------------------------------------------
-    def _load_commits(self):
-        if not self.repo_ok:
-            return
-        path = self.repo_var.get().strip()
-        rev = self.branch_var.get() or "HEAD"
-        try:
-            limit = int(self.limit_var.get())
-        except ValueError:
-            limit = 100
-        self.status_var.set("載入 commit 清單…")
 
-        def work():
-            rows, err = [], None
-            try:
-                repo = Repo(path)
-                for c in repo.iter_commits(rev, max_count=limit):
-                    subject = next((l for l in (c.message or "").splitlines()
-                                    if l.strip()), "")
-                    rows.append((
-                        c.hexsha,
-                        c.hexsha[:8],
-                        datetime.fromtimestamp(c.committed_date).strftime("%Y-%m-%d %H:%M"),
-                        c.author.name or "",
-                        subject.strip(),
-                    ))
-            except Exception as e:
-                err = str(e)
-            self.queue.put(("commits", rows, err))
+def extract_commit_indexed(repo, rev, output_base, reporter, index, **options):
+    """extract_commit, unless index (an ExportIndex) already lists rev as exported.
 
-        threading.Thread(target=work, daemon=True).start()
+    The export is recorded in index when it completes; saving index is up to the
+    caller, once the batch is over.
+    """
+    try:
+        sha = repo.commit(rev).hexsha
+    except Exception:
+        sha = None  # extract_commit reports the bad rev
+    with_patch = options.get("with_patch", True)
+    if sha is not None and not options.get("overwrite"):
+        stats = index.find(sha, with_patch)
+        if stats:
+            return _log_reused(reporter, sha, stats)
+    stats = extract_commit(repo, rev, output_base, reporter, **options)
+    if sha is not None and not reporter.cancelled:
+        index.add(sha, stats, with_patch)
+    return stats
+
+
+def _batch_export_one(repo_path, rev, output_base, options):
+    """Process-pool task: export one commit through this worker's own Repo.
+
+    Log lines are collected and returned rather than printed, so the parent can
+    replay them in input order no matter which worker finished first.
+    """
+    repo = _batch_repos.get(repo_path)
+    if repo is None:
+        repo = _batch_repos[repo_path] = Repo(repo_path)
+    lines = []
+    reporter = Reporter(log_fn=lambda msg, tag="info": lines.append((msg, tag)))
+    try:
+        stats = extract_commit(repo, rev, output_base, reporter, **options)
+    except Exception as e:
+        stats = None
+        lines.append((f"✖ 執行失敗：{e}", "error"))
+    return stats, lines
 
-    def _fill_tree(self, rows):
-        self.tree.delete(*self.tree.get_children())
-        keyword = self.filter_var.get().strip().lower()
-        shown = 0
-        for full_sha, short, date, author, subject in rows:
-            if keyword and keyword not in f"{full_sha} {author} {subject}".lower():
-                continue
-            self.tree.insert("", END, iid=full_sha,
-                             values=(short, date, author, subject))
-            shown += 1
-        self._update_selection_hint(shown)
-
-    def _apply_filter(self):
-        self._fill_tree(self.commits)
-
-    def _update_selection_hint(self, shown=None):
-        if shown is None:
-            shown = len(self.tree.get_children())
-        picked = len(self.tree.selection())
-        if picked > 1:
-            tail = (" · 合併成 1 包匯出" if self.merge_mode.get() == "merged"
-                    else f" · 分開匯出成 {picked} 個資料夾")
-        elif picked:
-            tail = ""
-        else:
-            tail = " · 可用 Ctrl / Shift 複選,連按兩下看完整訊息"
-        self.select_hint.configure(text=f"顯示 {shown} 筆 · 已選取 {picked} 筆{tail}")
 
-    def _show_commit_detail(self, _event=None):
-        sel = self.tree.selection()
-        if not sel or not self.repo_ok:
-            return
-        try:
-            commit = Repo(self.repo_var.get().strip()).commit(sel[0])
-        except Exception as e:
-            self._append_log(f"✖ 無法讀取 commit：{e}", "error")
-            return
-        self._append_log(f"── {commit.hexsha}", "head")
-        self._append_log(f"   作者 : {commit.author.name} <{commit.author.email}>", "muted")
-        self._append_log(
-            f"   時間 : {datetime.fromtimestamp(commit.committed_date):%Y-%m-%d %H:%M:%S}",
-            "muted")
-        for line in (commit.message or "").strip().splitlines():
-            self._append_log(f"   {line}", "info")
-
-    # -- uncommitted -------------------------------------------------------
-    def _refresh_dirty(self):
-        if not self.repo_ok:
-            return
-        path = self.repo_var.get().strip()
+def export_commits(repo_path, revs, output_base, reporter, jobs=None, **options):
+    """Export each rev into its own folder, spread over a pool of processes.
 
-        def work():
-            lines = []
-            try:
-                repo = Repo(path)
-                head = repo.head.commit
-                for d in head.diff(None):
-                    p = d.b_path or d.a_path
-                    disk = os.path.join(repo.working_tree_dir, p)
-                    if not os.path.exists(disk):
-                        lines.append(f"[DELETED]   {d.a_path}")
-                    elif d.a_blob is None:
-                        lines.append(f"[ADDED]     {p}")
-                    else:
-                        lines.append(f"[MODIFIED]  {p}")
-                for p in repo.untracked_files:
-                    lines.append(f"[UNTRACKED] {p}")
-                text = "\n".join(lines) if lines else "工作區沒有未提交的變更。"
-                text = f"共 {len(lines)} 個檔案\n\n" + text if lines else text
-            except Exception as e:
-                text = f"無法讀取工作區狀態：{e}"
-            self.queue.put(("dirty", text))
-
-        threading.Thread(target=work, daemon=True).start()
-
-    # -- export ------------------------------------------------------------
-    def _collect_targets(self):
-        """Return (mode, targets) based on the active tab, or (None, None)."""
-        idx = self.tabs.index(self.tabs.select())
-        if idx == 0:
-            picked = list(self.tree.selection())
-            if not picked:
-                Messagebox.show_warning("請先在清單中選擇至少一筆 commit",
-                                        title="尚未選取", parent=self)
-                return None, None
-            order = [row[0] for row in self.commits]
-            picked.sort(key=lambda s: order.index(s) if s in order else 0)
-            return "commit", picked
-        if idx == 1:
-            raw = self.sha_text.get("1.0", END).strip()
-            targets = [s for s in re.split(r"[\s,;]+", raw) if s]
-            if not targets:
-                Messagebox.show_warning("請輸入至少一筆 commit SHA",
-                                        title="欄位未填", parent=self)
-                return None, None
-            return "commit", targets
-        return "worktree", [None]
-
-    def _start_export(self):
-        if self.worker and self.worker.is_alive():
-            return
-        repo_path = self.repo_var.get().strip()
-        out_path = self.out_var.get().strip()
+    Every worker process opens its own Repo and runs extract_commit; the results, with
+    their log lines, are reported strictly in the order of revs. Commits that would
+    land in the same folder (same date and subject) never run at the same time: they
+    go in successive waves, so the outcome matches a sequential run.
 
-        if not self.repo_ok:
-            Messagebox.show_error("請先選擇有效的 Git 儲存庫", title="錯誤", parent=self)
-            return
-        if not out_path:
-            Messagebox.show_error("請選擇輸出資料夾", title="錯誤", parent=self)
-            return
-        if not os.path.isdir(out_path):
-            try:
-                os.makedirs(out_path, exist_ok=True)
-                self._append_log(f"ℹ 已建立輸出資料夾：{out_path}", "muted")
-            except Exception as e:
-                Messagebox.show_error(f"無法建立輸出資料夾：{e}", title="錯誤", parent=self)
-                return
+    Unless overwrite is set, commits the output folder's ExportIndex already lists are
+    not exported again; their earlier folder is reported instead. The index is updated
+    here, in the calling process, as results come in. A commit listed twice (a rev
+    that also falls inside a given range) is exported once, at its first position,
+    and reported the same way after that, whatever jobs is.
 
-        mode, targets = self._collect_targets()
-        if not targets:
-            return
-        if mode == "commit" and len(targets) > 1 and self.merge_mode.get() == "merged":
-            if not self._confirm_merge(repo_path, targets):
-                return
-            mode = "range"
-        self._remember_path("out", out_path)
-
-        options = {
-            "overwrite": self.opt_overwrite.get(),
-            "with_patch": self.opt_patch.get(),
-            "name_with_sha": self.opt_sha_suffix.get(),
-            "include_untracked": self.opt_untracked.get(),
-        }
-        self.cancel_event.clear()
-        self._set_running(True)
-        self.worker = threading.Thread(
-            target=self._run_export, daemon=True,
-            args=(repo_path, out_path, mode, targets, options))
-        self.worker.start()
-
-    def _confirm_merge(self, repo_path, targets):
-        """Pre-flight for merged export: same line of history? any commit in between?"""
+    Returns one stats dict (or None) per rev. jobs=1 runs in this process.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    with_patch = options.get("with_patch", True)
+    repo = Repo(repo_path)
+    index = ExportIndex(output_base, repo)
+    commits = []
+    for rev in revs:
         try:
-            repo = Repo(repo_path)
-            commits = list({repo.commit(t).hexsha: repo.commit(t) for t in targets}.values())
-            oldest, newest, contiguous, covered, outside = \
-                analyze_merge_selection(repo, commits)
-            if outside:
-                Messagebox.show_error(
-                    "選取的 commit 不在同一條線上(分屬不同分支),無法合併成一包。\n"
-                    "請改用「分開匯出」,或只選同一條路徑上的 commit。",
-                    title="無法合併", parent=self)
-                return False
-        except Exception as e:
-            Messagebox.show_error(f"無法分析選取的 commit：{e}", title="錯誤", parent=self)
-            return False
+            commits.append(repo.commit(rev))
+        except Exception:
+            commits.append(None)
+    reused, repeats, first = {}, {}, {}
+    for idx, commit in enumerate(commits):
+        if commit is None:
+            continue
+        if commit.hexsha in first:
+            repeats[idx] = first[commit.hexsha]
+            continue
+        first[commit.hexsha] = idx
+        stats = not options.get("overwrite") and index.find(commit.hexsha, with_patch)
+        if stats:
+            reused[idx] = stats
+
+    def repeat(idx):
+        stats = results[repeats[idx]]
+        return _log_reused(reporter, commits[idx].hexsha, stats) if stats else None
 
-        if contiguous and covered == len(commits):
-            return True
-        extra = max(covered - len(commits), 0)
-        answer = Messagebox.show_question(
-            f"選取的 {len(commits)} 筆 commit 並不連續。\n\n"
-            f"{oldest.hexsha[:8]} → {newest.hexsha[:8]} 這段範圍實際包含 {covered} 筆 commit,"
-            f"其中 {extra} 筆並未被選取,\n它們的變更也會一併被合併進來。\n\n要繼續嗎?",
-            title="選取的 commit 不連續", parent=self,
-            buttons=["取消:secondary", "繼續合併:success"])
-        return answer == "繼續合併"
-
-    def _run_export(self, repo_path, out_path, mode, targets, options):
-        reporter = Reporter(
-            log_fn=lambda msg, tag="info": self.queue.put(("log", msg, tag)),
-            progress_fn=lambda done, total: self.queue.put(("progress", done, total)),
-            cancel_event=self.cancel_event)
-        results = []
-        try:
-            repo = Repo(repo_path)
-            if mode == "range":
-                self.queue.put(("status", f"合併匯出 {len(targets)} 筆 commit…"))
-                stats = extract_commit_range(
-                    repo, targets, out_path, reporter,
-                    overwrite=options["overwrite"],
-                    with_patch=options["with_patch"],
-                    name_with_sha=options["name_with_sha"])
-                if stats:
-                    results.append(stats)
-            else:
-                total = len(targets)
-                for i, target in enumerate(targets, 1):
-                    if reporter.cancelled:
-                        break
-                    self.queue.put(("status", f"處理中 {i}/{total}"))
-                    if mode == "worktree":
-                        stats = extract_working_tree(
-                            repo, out_path, reporter,
-                            overwrite=options["overwrite"],
-                            with_patch=options["with_patch"],
-                            include_untracked=options["include_untracked"])
-                    else:
-                        stats = extract_commit(
-                            repo, target, out_path, reporter,
-                            overwrite=options["overwrite"],
-                            with_patch=options["with_patch"],
-                            name_with_sha=options["name_with_sha"])
-                    if stats:
-                        results.append(stats)
-        except Exception as e:
-            self.queue.put(("log", f"✖ 執行失敗：{e}", "error"))
-        self.queue.put(("done", results, self.cancel_event.is_set()))
-
-    def _cancel(self):
-        self.cancel_event.set()
-        self.status_var.set("取消中…")
-
-    def _set_running(self, running):
-        state = DISABLED if running else NORMAL
-        self.export_btn.configure(state=state)
-        self.cancel_btn.configure(state=NORMAL if running else DISABLED)
-        if running:
-            self.progress.configure(value=0)
-            self.status_var.set("開始匯出…")
-
-    # -- queue / log -------------------------------------------------------
-    def _drain_queue(self):
+    try:
+        if jobs <= 1 or len(revs) - len(reused) - len(repeats) <= 1:
+            results = []
+            for i, rev in enumerate(revs, 1):
+                if reporter.cancelled:
+                    break
+                reporter.progress(i, len(revs))
+                if i - 1 in repeats:
+                    results.append(repeat(i - 1))
+                    continue
+                results.append(extract_commit_indexed(repo, rev, output_base, reporter,
+                                                      index, **options))
+            return results
+
+        waves, seen = [], {}
+        for idx, commit in enumerate(commits):
+            if idx in reused or idx in repeats:
+                continue
+            key = None
+            if commit is not None:
+                key = commit_folder_name(commit,
+                                         options.get("name_with_sha", False)).lower()
+            wave = 0
+            if key is not None:
+                wave = seen[key] = seen.get(key, -1) + 1
+            while len(waves) <= wave:
+                waves.append([])
+            waves[wave].append(idx)
+
+        results = [None] * len(revs)
+        futures = {}
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            next_wave = 0
+
+            def submit_wave():
+                nonlocal next_wave
+                for idx in waves[next_wave]:
+                    futures[idx] = pool.submit(_batch_export_one, repo_path, revs[idx],
+                                               output_base, options)
+                next_wave += 1
+
+            submit_wave()
+            for idx in range(len(revs)):
+                if reporter.cancelled:
+                    for future in futures.values():
+                        future.cancel()
+                    break
+                if idx in reused or idx in repeats:
+                    results[idx] = (_log_reused(reporter, commits[idx].hexsha, reused[idx])
+                                    if idx in reused else repeat(idx))
+                    reporter.progress(idx + 1, len(revs))
+                    continue
+                while idx not in futures:
+                    wait([futures[i] for i in waves[next_wave - 1]])
+                    submit_wave()
+                try:
+                    stats, lines = futures[idx].result()
+                except Exception as e:
+                    stats, lines = None, [(f"✖ 執行失敗：{revs[idx]}：{e}", "error")]
+                for msg, tag in lines:
+                    reporter.log(msg, tag)
+                reporter.progress(idx + 1, len(revs))
+                if commits[idx] is not None:
+                    index.add(commits[idx].hexsha, stats, with_patch)
+                results[idx] = stats
+        return results
+    finally:
+        index.save()
+
+
+def expand_revs(repo, revs):
+    """Expand A..B ranges into their commits (oldest first); other revs pass through."""
+    out = []
+    for rev in revs:
+        if ".." in rev:
+            out.extend(c.hexsha for c in reversed(list(repo.iter_commits(rev))))
+        else:
+            out.append(rev)
+    return out
+
+
+def main(argv=None):
+    """Command-line entry point. With no arguments the GUI starts instead."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        run_gui()
+        return 0
+
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="git_diff_export.py",
+        description="匯出 commit(或工作區未提交變更)的變更前 / 變更後檔案。"
+                    "不帶任何參數執行時開啟圖形介面。")
+    parser.add_argument("revs", nargs="*",
+                        help="commit SHA / 分支 / tag,或 A..B 範圍")
+    parser.add_argument("-C", "--repo", default=".", help="Git 儲存庫路徑(預設目前目錄)")
+    parser.add_argument("-o", "--out", required=True, help="輸出資料夾")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--merged", action="store_true", help="把所有 commit 合併成一包")
+    mode.add_argument("--worktree", action="store_true", help="匯出工作區未提交的變更")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="分開匯出時同時執行的行程數(預設為 CPU 核心數)")
+    parser.add_argument("--overwrite", action="store_true", help="覆蓋已存在的輸出資料夾")
+    parser.add_argument("--no-patch", action="store_true", help="不輸出 changes.patch")
+    parser.add_argument("--name-with-sha", action="store_true", help="資料夾名稱加上短 SHA")
+    parser.add_argument("--no-untracked", action="store_true",
+                        help="未提交模式不包含未追蹤檔案")
+    parser.add_argument("--shared-store", action="store_true", help="共用 blob 快取")
+    parser.add_argument("--link-worktree", action="store_true",
+                        help="未提交模式的 MOD 檔案以硬連結輸出(與工作區為同一檔案)")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"以 cProfile + tracemalloc 剖析這次匯出,結果存到輸出資料夾的 "
+                             f"{EXPORT_LOG_DIR}(也可設定環境變數 {PROFILE_ENV}=1)")
+    args = parser.parse_args(argv)
+    if not args.worktree and not args.revs:
+        parser.error("請指定至少一筆 commit,或使用 --worktree")
+    if args.worktree and args.revs:
+        parser.error("--worktree 不能與 commit 一起指定")
+
+    reporter = Reporter(progress_fn=lambda done, total: None)
+    try:
+        repo = Repo(args.repo, search_parent_directories=False)
+    except (InvalidGitRepositoryError, NoSuchPathError):
+        reporter.log(f"✖ 此路徑不是 Git 儲存庫：{args.repo}", "error")
+        return 2
+    os.makedirs(args.out, exist_ok=True)
+    options = dict(overwrite=args.overwrite, with_patch=not args.no_patch,
+                   shared_store=args.shared_store)
+    profile = args.profile or profiling_requested()
+    if profile and args.jobs != 1 and not (args.worktree or args.merged):
+        # cProfile cannot follow the export into the worker processes.
+        reporter.log("ℹ 效能剖析時改為單一行程匯出", "muted")
+        args.jobs = 1
+    with profile_export(args.out, reporter, enabled=profile):
+        if args.worktree:
+            results = [extract_working_tree(repo, args.out, reporter,
+                                            include_untracked=not args.no_untracked,
+                                            link_worktree=args.link_worktree, **options)]
+        elif args.merged:
+            results = [extract_commit_range(repo, expand_revs(repo, args.revs), args.out,
+                                            reporter, name_with_sha=args.name_with_sha,
+                                            **options)]
+        else:
+            results = export_commits(repo.working_tree_dir, expand_revs(repo, args.revs),
+                                     args.out, reporter, jobs=args.jobs,
+                                     name_with_sha=args.name_with_sha, **options)
+    if args.worktree and not results[0]:
+        # Nothing to export is a success; only a failed export exits non-zero.
         try:
-            while True:
-                msg = self.queue.get_nowait()
-                kind = msg[0]
-                if kind == "log":
-                    self._append_log(msg[1], msg[2])
-                elif kind == "progress":
-                    done, total = msg[1], msg[2]
-                    self.progress.configure(maximum=max(total, 1), value=done)
-                elif kind == "status":
-                    self.status_var.set(msg[1])
-                elif kind == "commits":
-                    self._on_commits_loaded(msg[1], msg[2])
-                elif kind == "dirty":
-                    self._set_dirty_text(msg[1])
-                elif kind == "done":
-                    self._on_done(msg[1], msg[2])
-        except queue.Empty:
+            include_untracked = not args.no_untracked
+            if not WorkTreeStatus(repo, include_untracked).for_repo(repo, include_untracked):
+                return 0
+        except Exception:
             pass
-        self.after(80, self._drain_queue)
-
-    def _on_commits_loaded(self, rows, err):
-        if err:
-            self.status_var.set("載入 commit 失敗")
-            self._append_log(f"✖ 載入 commit 清單失敗：{err}", "error")
-            return
-        self.commits = rows
-        self._fill_tree(rows)
-        self.status_var.set(f"已載入 {len(rows)} 筆 commit")
-
-    def _set_dirty_text(self, text):
-        self.dirty_text.configure(state=NORMAL)
-        self.dirty_text.delete("1.0", END)
-        self.dirty_text.insert("1.0", text)
-        self.dirty_text.configure(state=DISABLED)
-
-    def _on_done(self, results, cancelled):
-        self._set_running(False)
-        files = sum(r["files"] for r in results)
-        failed = sum(r["failed"] for r in results)
-        if cancelled:
-            summary = f"已取消 · 完成 {len(results)} 筆 / {files} 個檔案"
-            tag = "warning"
-        elif results:
-            summary = f"完成 {len(results)} 筆 · 共 {files} 個檔案" + \
-                      (f" · 失敗 {failed}" if failed else "")
-            tag = "success"
-        else:
-            summary = "沒有任何輸出"
-            tag = "warning"
-        self.progress.configure(value=self.progress.cget("maximum") if results else 0)
-        self.status_var.set(summary)
-        self._append_log(f"═ {summary}", tag)
-        if results and self.opt_auto_open.get():
-            open_folder(self.out_var.get().strip())
-
-    def _append_log(self, message, tag="info"):
-        self.log_text.configure(state=NORMAL)
-        self.log_text.insert(END, message + "\n", tag)
-        self.log_text.see(END)
-        self.log_text.configure(state=DISABLED)
-
-    def _clear_log(self):
-        self.log_text.configure(state=NORMAL)
-        self.log_text.delete("1.0", END)
-        self.log_text.configure(state=DISABLED)
-        self.progress.configure(value=0)
-        self.status_var.set("就緒")
-
-    # -- config ------------------------------------------------------------
-    def _restore_config(self):
-        cfg = self.config_data
-        self.repo_var.set(cfg.get("git", ""))
-        self.out_var.set(cfg.get("out", ""))
-        self.sha_text.insert("1.0", cfg.get("sha", ""))
-        self.branch_var.set(cfg.get("branch", "HEAD"))
-        if cfg.get("limit") in COMMIT_LIMITS:
-            self.limit_var.set(cfg["limit"])
-        opts = cfg.get("options", {})
-        self.opt_overwrite.set(bool(opts.get("overwrite", False)))
-        self.opt_patch.set(bool(opts.get("with_patch", True)))
-        self.opt_sha_suffix.set(bool(opts.get("name_with_sha", False)))
-        self.opt_untracked.set(bool(opts.get("include_untracked", True)))
-        self.opt_auto_open.set(bool(opts.get("auto_open", False)))
-        if opts.get("merge_mode") in ("separate", "merged"):
-            self.merge_mode.set(opts["merge_mode"])
-        size = cfg.get("size")
-        if isinstance(size, str) and re.fullmatch(r"\d+x\d+", size):
-            self.geometry(size)
-
-    def _on_close(self):
-        repo_history = push_history(self.repo_history, self.repo_var.get())
-        out_history = push_history(self.out_history, self.out_var.get())
-        save_config({
-            "git": self.repo_var.get().strip(),
-            "out": self.out_var.get().strip(),
-            "repo_history": repo_history,
-            "out_history": out_history,
-            "sha": self.sha_text.get("1.0", END).strip(),
-            "branch": self.branch_var.get(),
-            "limit": self.limit_var.get(),
-            "theme": self.style.theme.name,
-            "size": f"{self.winfo_width()}x{self.winfo_height()}",
-            "options": {
-                "overwrite": self.opt_overwrite.get(),
-                "with_patch": self.opt_patch.get(),
-                "name_with_sha": self.opt_sha_suffix.get(),
-                "include_untracked": self.opt_untracked.get(),
-                "auto_open": self.opt_auto_open.get(),
-                "merge_mode": self.merge_mode.get(),
-            },
-        })
-        self.cancel_event.set()
-        self.destroy()
+    done = [r for r in results if r]
+    files = sum(r["files"] for r in done)
+    failed = sum(r["failed"] for r in done)
+    reporter.log(f"═ 完成 {len(done)} 筆 · 共 {files} 個檔案"
+                 f"{f' · 失敗 {failed}' if failed else ''}",
+                 "success" if done else "warning")
+    return 0 if done and not failed and len(done) == len(results) else 1
 
 
+# --------------------------------------------------------------------------
+# GUI (git_diff_export_gui, loaded on demand)
+# --------------------------------------------------------------------------
 def run_gui():
-    GitExportApp().mainloop()
+    # tkinter / ttkbootstrap are imported here rather than at the top, so scripts
+    # that only extract - and machines without Tk - never pay for them.
+    from git_diff_export_gui import run_gui as run
+    run()
+
+
+def __getattr__(name):
+    if name in ("GitExportApp", "pick_font"):
+        import git_diff_export_gui
+        return getattr(git_diff_export_gui, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
-    run_gui()
+    # Let git_diff_export_gui's `from git_diff_export import ...` reuse this module
+    # instead of loading the file a second time under its real name.
+    sys.modules.setdefault("git_diff_export", sys.modules[__name__])
+    sys.exit(main())
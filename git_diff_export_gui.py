@@ -0,0 +1,1666 @@
+# -*- coding: utf-8 -*-
+"""
+Git Commit Extractor - 圖形介面(ttkbootstrap)。
+
+匯出邏輯都在 git_diff_export;本模組只有在開啟介面時才會被載入,
+只呼叫 extract_commit() 等核心函式的腳本不必付出 tkinter 的載入成本,
+沒有 Tk 的機器也能使用核心。
+"""
+
+import itertools
+import os
+import queue
+import re
+import threading
+import time
+import tkinter as tk
+import tkinter.font as tkfont
+from datetime import datetime
+from tkinter import filedialog
+
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+from ttkbootstrap.dialogs import Messagebox
+from ttkbootstrap.tooltip import ToolTip
+from git import Repo, InvalidGitRepositoryError, NoSuchPathError
+
+from git_diff_export import (
+    APP_NAME, APP_VERSION, BLOB_STORE_DIR, EXPORT_LOG_DIR, BufferedReporter,
+    CommitCache, ExportIndex,
+    analyze_merge_selection, extract_commit_indexed, extract_commit_range,
+    WorkTreeStatus, extract_working_tree, iter_log, load_config,
+    log_search_options, open_file, open_folder, profile_export, push_history,
+    resolve_commits, save_config, worktree_accelerators)
+
+DEFAULT_THEME = "darkly"
+THEME_CHOICES = ["darkly", "cyborg", "superhero", "solar", "vapor",
+                 "flatly", "cosmo", "litera", "minty", "sandstone", "yeti"]
+# Page sizes for the commit list; further pages load as the list is scrolled.
+COMMIT_LIMITS = ["50", "100", "200", "500", "1000"]
+
+UI_FONT_CANDIDATES = ["Microsoft JhengHei UI", "Microsoft JhengHei",
+                      "Noto Sans TC", "Segoe UI"]
+MONO_FONT_CANDIDATES = ["Cascadia Mono", "Consolas", "Courier New"]
+
+# A page still being filled (a history search git is working through) shows what
+# it has found so far at this interval, in seconds.
+PAGE_FLUSH_INTERVAL = 0.25
+
+# Lines kept in the log panel; older ones are trimmed as new ones arrive. The full
+# log of each export is kept in the output folder's EXPORT_LOG_DIR.
+LOG_LINES = 5000
+
+
+def pick_font(candidates, fallback):
+    available = set(tkfont.families())
+    for name in candidates:
+        if name in available:
+            return name
+    return fallback
+
+
+class RepoCheck:
+    """One background validation of the repository path.
+
+    Superseding it (a newer path was typed) calls cancel(), which also kills the
+    git process it may be blocked on, so a stale check of a huge work tree does not
+    keep running behind the new one.
+    """
+
+    def __init__(self, seq, path):
+        self.seq = seq
+        self.path = path
+        self.cancelled = False
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._proc is not None:
+                self._proc.proc.kill()
+
+    def is_dirty(self, repo):
+        """True as soon as `git status` reports anything; None when cancelled.
+
+        Stops at the first byte of output instead of listing every change. Plain
+        repositories are checked without optional locks, so it never competes with
+        the user's own git; with fsmonitor or the untracked cache the refreshed
+        state has to be written back, or every later check is a full scan again.
+        """
+        env = {} if any(worktree_accelerators(repo)) else {"GIT_OPTIONAL_LOCKS": "0"}
+        with self._lock:
+            if self.cancelled:
+                return None
+            # env= applies to this one process; custom_environment would change the
+            # Git object for every thread sharing it.
+            self._proc = repo.git.status("--porcelain", "--untracked-files=normal",
+                                         as_process=True, env=env)
+        proc = self._proc.proc
+        try:
+            dirty = bool(proc.stdout.read(1))
+        finally:
+            with self._lock:
+                self._proc = None
+            proc.kill()
+            proc.wait()
+        return None if self.cancelled else dirty
+
+
+def search_log_args(search):
+    """iter_log keyword arguments for a search dict from the advanced search bar."""
+    return {"options": log_search_options(search.get("author", ""), search.get("grep", ""),
+                                          search.get("since", ""), search.get("until", "")),
+            "paths": search.get("paths", ())}
+
+
+def cache_commits(repo_path, tip):
+    """Add tip to the repository's CommitCache on a background thread."""
+    def work():
+        try:
+            repo = Repo(repo_path)
+            with CommitCache(repo) as cache:
+                cache.update(repo, tip)
+        except Exception:
+            pass    # only a cache; the next load simply asks git again
+
+    threading.Thread(target=work, daemon=True).start()
+
+
+class CommitPager:
+    """Hands out the history of rev a page at a time.
+
+    A tip already in the CommitCache is listed straight from the cache. Otherwise
+    pages come from one streaming `git log` process while the tip is added to the
+    cache in the background, so the next load (F5, switching back to the branch,
+    reopening the repository) does not walk history in git again.
+
+    search (a dict of log_search_options fields plus "paths") turns the pager into
+    a history search run by git; those results are never cached.
+
+    Pages are pulled on a worker thread, one at a time. close() from the UI thread
+    never waits for a page in flight: the worker closes the pager when it finishes.
+    """
+
+    def __init__(self, repo_path, rev, search=None):
+        self.rev = rev
+        self.search = search
+        self.done = False
+        self.closed = False
+        self._lock = threading.Lock()
+        self._cache = None
+        repo = Repo(repo_path)
+        tip = repo.commit(rev).hexsha
+        if search:
+            self._rows = iter_log(repo, tip, **search_log_args(search))
+            return
+        try:
+            self._cache = CommitCache(repo)
+        except Exception:
+            pass
+        if self._cache is not None and self._cache.get(tip) is not None:
+            self._rows = self._cache.walk(tip)
+        else:
+            self._rows = iter_log(repo, tip)
+            if self._cache is not None:
+                cache_commits(repo_path, tip)
+
+    def next_page(self, size, flush=None):
+        """Up to size more entries.
+
+        With flush, entries found so far are handed to flush(entries) every
+        PAGE_FLUSH_INTERVAL seconds instead, so a slow search shows results as
+        they come; the return value holds only the rest.
+        """
+        with self._lock:
+            if self.closed:
+                return []
+            rows, count = [], 0
+            last = time.monotonic()
+            for entry in itertools.islice(self._rows, size):
+                rows.append(entry)
+                count += 1
+                if self.closed:
+                    break
+                if flush is not None and time.monotonic() - last >= PAGE_FLUSH_INTERVAL:
+                    flush(rows)
+                    rows, last = [], time.monotonic()
+            self.done = count < size
+            if self.done:
+                self._release()
+            return rows
+
+    def _release(self):
+        self._rows.close()
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+
+    def close(self):
+        self.closed = True
+        if self._lock.acquire(blocking=False):
+            try:
+                self._release()
+            finally:
+                self._lock.release()
+
+
+class CommitWindow:
+    """The commit list, shown through a Treeview that only holds the visible lines.
+
+    The rows (full SHAs in list order) and the selection live here, not in the
+    widget: the Treeview has one item per visible line, its iid being the line
+    number, and scrolling swaps the values shown on those lines. Scrolling,
+    filtering and selecting therefore cost the same with 200k commits loaded as
+    with 100. Clicks, Ctrl / Shift selection, dragging, the keyboard, the mouse
+    wheel and the scrollbar are all handled against this model, since Tk's own
+    bindings would act on the few items that exist.
+    """
+
+    WHEEL_LINES = 3
+
+    def __init__(self, tree, vbar, values, on_select, on_scroll, on_open):
+        self.tree = tree
+        self.vbar = vbar
+        self.values = values        # sha -> the values of its Treeview line
+        self.on_select = on_select  # called after the selection changed
+        self.on_scroll = on_scroll  # called after the view moved
+        self.on_open = on_open      # on_open(sha) on a double click
+        self.rows = []
+        self.picked = set()
+        self.anchor = None          # where a Shift range starts
+        self.cursor = None          # row the keyboard moves from
+        self.top = 0
+        self.visible = int(tree.cget("height"))
+        self._lines = []            # sha each line item shows
+        self._attached = 0          # line items currently in the tree
+        self._measured = False      # visible is still the requested height
+        vbar.configure(command=self._on_scrollbar)
+        tree.bind("<Configure>", self._on_resize)
+        for sequence, handler in (
+                ("<Button-1>", lambda e: self._on_click(e, "set")),
+                ("<Control-Button-1>", lambda e: self._on_click(e, "toggle")),
+                ("<Shift-Button-1>", lambda e: self._on_click(e, "range")),
+                ("<Double-1>", self._on_double_click),
+                ("<B1-Motion>", self._on_drag),
+                ("<B1-Leave>", lambda e: "break"),
+                ("<MouseWheel>", self._on_wheel),
+                ("<Button-4>", self._on_wheel),
+                ("<Button-5>", self._on_wheel),
+                ("<Control-a>", self._select_all),
+                ("<Control-A>", self._select_all)):
+            tree.bind(sequence, handler)
+        for key, step in (("Up", -1), ("Down", 1), ("Prior", "page-up"),
+                          ("Next", "page-down"), ("Home", "home"), ("End", "end")):
+            tree.bind(f"<{key}>", lambda e, s=step: self._on_key(s, extend=False))
+            tree.bind(f"<Shift-{key}>", lambda e, s=step: self._on_key(s, extend=True))
+
+    # -- model -------------------------------------------------------------
+    def reset(self):
+        self.rows = []
+        self.picked = set()
+        self.anchor = self.cursor = None
+        self.top = 0
+        self._render()
+
+    def add(self, shas, at_top=False):
+        """Append shas, or put them on top without moving the rows in view."""
+        if at_top:
+            self.rows[:0] = shas
+            if self.top:
+                self.top += len(shas)
+        else:
+            self.rows.extend(shas)
+        self._render()
+
+    def set_rows(self, shas):
+        """Show shas instead; selected rows that are not among them are dropped."""
+        self.rows = shas
+        if self.picked:
+            kept = self.picked.intersection(shas)
+            if kept != self.picked:
+                self.picked = kept
+                self.on_select()
+        self.scroll_to(self.top, notify=False)
+
+    def near_end(self):
+        """True when the last row is at most a screen below the view."""
+        return self.top + 2 * self.visible >= len(self.rows)
+
+    # -- view --------------------------------------------------------------
+    def scroll_to(self, top, notify=True):
+        self.top = max(0, min(top, len(self.rows) - self.visible))
+        self._render()
+        if notify:
+            self.on_scroll()
+
+    def _render(self):
+        tree = self.tree
+        shas = self.rows[self.top:self.top + self.visible + 1]    # + the partial line
+        for line in range(len(self._lines), len(shas)):
+            tree.insert("", END, iid=str(line))
+            self._lines.append(None)
+        for line, sha in enumerate(shas):
+            if self._lines[line] != sha:
+                tree.item(str(line), values=self.values(sha))
+                self._lines[line] = sha
+        if self._attached != len(shas):
+            tree.set_children("", *(str(line) for line in range(len(shas))))
+            self._attached = len(shas)
+            if not self._measured:
+                tree.after_idle(self._on_resize)
+        tree.selection_set([str(line) for line, sha in enumerate(shas)
+                            if sha in self.picked])
+        if tree.yview()[0]:
+            tree.yview_moveto(0)
+        if self.rows:
+            total = len(self.rows)
+            self.vbar.set(self.top / total, min(1.0, (self.top + self.visible) / total))
+        else:
+            self.vbar.set(0, 1)
+
+    def _on_resize(self, _event=None):
+        box = self.tree.bbox("0") if self._attached else ""
+        if box:
+            self._measured = True
+            _x, y, _width, height = box
+            visible = max(1, (self.tree.winfo_height() - y) // height)
+            if visible != self.visible:
+                self.visible = visible
+                self.scroll_to(self.top)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(round(float(amount) * len(self.rows)))
+        elif unit == "pages":
+            self.scroll_to(self.top + int(amount) * self.visible)
+        else:
+            self.scroll_to(self.top + int(amount))
+
+    def _on_wheel(self, event):
+        if event.num == 4:
+            lines = -self.WHEEL_LINES
+        elif event.num == 5:
+            lines = self.WHEEL_LINES
+        elif abs(event.delta) >= 120:   # Windows: 120 per notch
+            lines = -event.delta // 120 * self.WHEEL_LINES
+        else:                           # macOS: a few units per notch
+            lines = -event.delta
+        self.scroll_to(self.top + lines)
+        return "break"
+
+    # -- selection ---------------------------------------------------------
+    def _row_at(self, y):
+        line = self.tree.identify_row(y)
+        if not line:
+            return None
+        index = self.top + int(line)
+        return index if index < len(self.rows) else None
+
+    def _on_click(self, event, how):
+        if self.tree.identify_region(event.x, event.y) in ("heading", "separator"):
+            return None     # column resizing stays Tk's
+        self.tree.focus_set()
+        index = self._row_at(event.y)
+        if index is None:
+            return "break"
+        sha = self.rows[index]
+        if how == "range":
+            self._select_range(index)
+        else:
+            if how == "toggle":
+                self.picked ^= {sha}
+            else:
+                self.picked = {sha}
+            self.anchor = self.cursor = sha
+            self._selection_changed()
+        return "break"
+
+    def _on_double_click(self, event):
+        index = self._row_at(event.y)
+        if index is not None:
+            self.on_open(self.rows[index])
+        return "break"
+
+    def _on_drag(self, event):
+        if self.anchor is None:
+            return "break"
+        if event.y < 0 or self.tree.identify_region(event.x, event.y) == "heading":
+            self.scroll_to(self.top - 1)
+            index = self.top
+        elif event.y >= self.tree.winfo_height():
+            self.scroll_to(self.top + 1)
+            index = min(self.top + self.visible, len(self.rows)) - 1
+        else:
+            index = self._row_at(event.y)
+        if index is not None and index >= 0:
+            self._select_range(index)
+        return "break"
+
+    def _on_key(self, step, extend):
+        if not self.rows:
+            return "break"
+        current = self._index_of(self.cursor)
+        if step == "home":
+            index = 0
+        elif step == "end":
+            index = len(self.rows) - 1
+        elif current is None:
+            index = self.top
+        elif step == "page-up":
+            index = current - self.visible
+        elif step == "page-down":
+            index = current + self.visible
+        else:
+            index = current + step
+        index = max(0, min(index, len(self.rows) - 1))
+        if index < self.top:
+            self.scroll_to(index)
+        elif index >= self.top + self.visible:
+            self.scroll_to(index - self.visible + 1)
+        if extend and self.anchor is not None:
+            self._select_range(index)
+        else:
+            self.anchor = self.cursor = self.rows[index]
+            self.picked = {self.cursor}
+            self._selection_changed()
+        return "break"
+
+    def _select_all(self, _event=None):
+        self.picked = set(self.rows)
+        self._selection_changed()
+        return "break"
+
+    def _select_range(self, index):
+        start = self._index_of(self.anchor)
+        if start is None:
+            start = index
+            self.anchor = self.rows[index]
+        low, high = sorted((start, index))
+        self.picked = set(self.rows[low:high + 1])
+        self.cursor = self.rows[index]
+        self._selection_changed()
+
+    def _index_of(self, sha):
+        if sha is None:
+            return None
+        try:
+            return self.rows.index(sha)
+        except ValueError:
+            return None
+
+    def _selection_changed(self):
+        self._render()
+        self.on_select()
+
+
+class GitExportApp(ttk.Window):
+
+    def __init__(self):
+        self.config_data = load_config()
+        theme = self.config_data.get("theme", DEFAULT_THEME)
+        if theme not in THEME_CHOICES:
+            theme = DEFAULT_THEME
+        super().__init__(title=f"{APP_NAME}  v{APP_VERSION}", themename=theme,
+                         size=(1180, 880), minsize=(980, 640))
+
+        self.queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.worker = None
+        self._reporter = None       # BufferedReporter of the running export
+        self._full_log = None       # complete log file of the last export
+        self.repo_ok = False
+        self.commits = []
+        # Search index over the loaded commits: sha -> row / lowercase search text.
+        self._commit_rows = {}
+        self._search_keys = {}
+        self._filter_query = ""
+        self._filter_job = None
+        self._search = None         # advanced search fields while a search is active
+        self._worktree_status = (None, None)    # (repo path, WorkTreeStatus)
+        self._pager = None
+        self._pager_busy = False
+        self._log_seq = 0
+        self._validate_job = None
+        self._repo_check = RepoCheck(0, "")
+        self._repo_summary = ""
+        # Most-recently-used path lists; legacy single-value keys are migrated in.
+        self.repo_history = push_history(
+            list(self.config_data.get("repo_history", [])),
+            self.config_data.get("git", ""))
+        self.out_history = push_history(
+            list(self.config_data.get("out_history", [])),
+            self.config_data.get("out", ""))
+
+        self.ui_font = pick_font(UI_FONT_CANDIDATES, "TkDefaultFont")
+        self.mono_font = pick_font(MONO_FONT_CANDIDATES, "TkFixedFont")
+        self._init_fonts()
+        self._build_ui()
+        self._apply_palette()
+        self._restore_config()
+
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.after(80, self._drain_queue)
+        self._validate_repo()
+
+    # -- setup -------------------------------------------------------------
+    def _init_fonts(self):
+        for name, size in (("TkDefaultFont", 10), ("TkTextFont", 10),
+                           ("TkMenuFont", 10), ("TkHeadingFont", 10)):
+            try:
+                tkfont.nametofont(name).configure(family=self.ui_font, size=size)
+            except tk.TclError:
+                pass
+        try:
+            tkfont.nametofont("TkFixedFont").configure(family=self.mono_font, size=10)
+        except tk.TclError:
+            pass
+        self.style.configure("Treeview", rowheight=26)
+        self.style.configure("Treeview.Heading", font=(self.ui_font, 10, "bold"))
+        # Secondary text: readable in both light and dark themes.
+        self.style.configure("Muted.TLabel", foreground=self._muted_color())
+
+    def _muted_color(self):
+        c = self.style.colors
+        try:
+            return c.make_transparent(0.6, c.fg, c.bg)
+        except Exception:
+            return c.secondary
+
+    def _build_ui(self):
+        root = ttk.Frame(self, padding=(16, 12, 16, 10))
+        root.pack(fill=BOTH, expand=YES)
+        root.rowconfigure(3, weight=1)
+        root.columnconfigure(0, weight=1)
+
+        self._build_header(root).grid(row=0, column=0, sticky=EW)
+        ttk.Separator(root).grid(row=1, column=0, sticky=EW, pady=(10, 12))
+        self._build_repo_card(root).grid(row=2, column=0, sticky=EW)
+
+        body = ttk.Frame(root)
+        body.grid(row=3, column=0, sticky=NSEW, pady=(12, 0))
+        body.rowconfigure(0, weight=3, minsize=300)
+        body.rowconfigure(1, weight=2, minsize=180)
+        body.columnconfigure(0, weight=1)
+
+        upper = ttk.Frame(body)
+        upper.grid(row=0, column=0, sticky=NSEW)
+        upper.rowconfigure(0, weight=1)
+        upper.columnconfigure(0, weight=1)
+        upper.columnconfigure(1, minsize=340)
+        self._build_source_card(upper).grid(row=0, column=0, sticky=NSEW)
+        self._build_side_column(upper).grid(row=0, column=1, sticky="new", padx=(12, 0))
+
+        self._build_log_card(body).grid(row=1, column=0, sticky=NSEW, pady=(12, 0))
+        self._build_action_bar(root).grid(row=4, column=0, sticky=EW, pady=(12, 0))
+        self._build_status_bar(root).grid(row=5, column=0, sticky=EW, pady=(10, 0))
+
+        self.bind("<Control-Return>", lambda e: self._start_export())
+        self.bind("<F5>", lambda e: self._refresh_commits())
+
+    def _build_header(self, master):
+        bar = ttk.Frame(master)
+        bar.columnconfigure(1, weight=1)
+
+        text = ttk.Frame(bar)
+        text.grid(row=0, column=0, sticky=W)
+        ttk.Label(text, text=APP_NAME,
+                  font=(self.ui_font, 19, "bold")).pack(anchor=W)
+        ttk.Label(text, text="匯出 commit 的變更前 / 變更後檔案,方便比對與存檔",
+                  style="Muted.TLabel").pack(anchor=W, pady=(2, 0))
+
+        right = ttk.Frame(bar)
+        right.grid(row=0, column=2, sticky=E)
+        ttk.Label(right, text="外觀主題", style="Muted.TLabel").pack(side=LEFT, padx=(0, 8))
+        self.theme_var = tk.StringVar(value=self.style.theme.name)
+        theme_box = ttk.Combobox(right, textvariable=self.theme_var, width=12,
+                                 values=THEME_CHOICES, state="readonly")
+        theme_box.pack(side=LEFT)
+        theme_box.bind("<<ComboboxSelected>>", self._on_theme_change)
+        return bar
+
+    def _build_repo_card(self, master):
+        card = ttk.Labelframe(master, text=" ① Git 儲存庫 ", padding=12)
+        card.columnconfigure(1, weight=1)
+
+        ttk.Label(card, text="路徑").grid(row=0, column=0, sticky=W, padx=(0, 10))
+        self.repo_var = tk.StringVar()
+        self.repo_box = ttk.Combobox(card, textvariable=self.repo_var,
+                                     values=self.repo_history, font=(self.mono_font, 10))
+        self.repo_box.grid(row=0, column=1, sticky=EW)
+        ToolTip(self.repo_box, text="可直接輸入,或從下拉選單挑選用過的儲存庫",
+                bootstyle=(INFO, INVERSE))
+        self.repo_var.trace_add("write", lambda *_: self._schedule_validate())
+
+        ttk.Button(card, text="瀏覽…", bootstyle=(OUTLINE, PRIMARY), width=8,
+                   command=self._browse_repo).grid(row=0, column=2, padx=(8, 0))
+        forget = ttk.Button(card, text="✕", bootstyle=(OUTLINE, DANGER), width=3,
+                            command=lambda: self._forget_path("repo"))
+        forget.grid(row=0, column=3, padx=(6, 0))
+        ToolTip(forget, text="把目前路徑從歷史紀錄中移除", bootstyle=(INFO, INVERSE))
+
+        self.repo_state = ttk.Label(card, text="尚未選擇儲存庫", style="Muted.TLabel")
+        self.repo_state.grid(row=1, column=1, columnspan=3, sticky=W, pady=(8, 0))
+        return card
+
+    def _build_source_card(self, master):
+        card = ttk.Labelframe(master, text=" ② 要匯出的內容 ", padding=12)
+        card.rowconfigure(0, weight=1)
+        card.columnconfigure(0, weight=1)
+
+        self.tabs = ttk.Notebook(card, bootstyle=PRIMARY)
+        self.tabs.grid(row=0, column=0, sticky=NSEW)
+        self.tabs.add(self._build_commit_tab(self.tabs), text="  Commit 清單  ")
+        self.tabs.add(self._build_manual_tab(self.tabs), text="  手動輸入 SHA  ")
+        self.tabs.add(self._build_dirty_tab(self.tabs), text="  未提交的變更  ")
+        return card
+
+    def _build_commit_tab(self, master):
+        tab = ttk.Frame(master, padding=12)
+        tab.rowconfigure(2, weight=1)
+        tab.columnconfigure(0, weight=1)
+
+        bar = ttk.Frame(tab)
+        bar.grid(row=0, column=0, sticky=EW, pady=(0, 10))
+        bar.columnconfigure(5, weight=1)
+
+        ttk.Label(bar, text="分支").grid(row=0, column=0, padx=(0, 6))
+        self.branch_var = tk.StringVar(value="HEAD")
+        self.branch_box = ttk.Combobox(bar, textvariable=self.branch_var,
+                                       width=22, values=["HEAD"], state="readonly")
+        self.branch_box.grid(row=0, column=1)
+        self.branch_box.bind("<<ComboboxSelected>>", lambda e: self._load_commits())
+
+        ttk.Label(bar, text="每頁").grid(row=0, column=2, padx=(12, 6))
+        self.limit_var = tk.StringVar(value="100")
+        ttk.Combobox(bar, textvariable=self.limit_var, width=6,
+                     values=COMMIT_LIMITS, state="readonly").grid(row=0, column=3)
+
+        reload_btn = ttk.Button(bar, text="重新載入", bootstyle=(OUTLINE, INFO),
+                                command=self._refresh_commits)
+        reload_btn.grid(row=0, column=4, padx=(12, 0))
+        ToolTip(reload_btn, text="讀取新的 commit (F5);捲到清單底部會自動載入更早的",
+                bootstyle=(INFO, INVERSE))
+
+        ttk.Label(bar, text="搜尋", style="Muted.TLabel").grid(row=0, column=6,
+                                                             sticky=E, padx=(12, 6))
+        self.filter_var = tk.StringVar()
+        filter_entry = ttk.Entry(bar, textvariable=self.filter_var, width=24)
+        filter_entry.grid(row=0, column=7, sticky=E)
+        self.filter_var.trace_add("write", lambda *_: self._schedule_filter())
+        ToolTip(filter_entry, text="以 SHA / 作者 / 標題關鍵字過濾已載入的 commit",
+                bootstyle=(INFO, INVERSE))
+        self.search_toggle = ttk.Button(bar, text="進階搜尋 ▾", bootstyle=(LINK, INFO),
+                                        command=self._toggle_search_bar)
+        self.search_toggle.grid(row=0, column=8, padx=(8, 0))
+        ToolTip(self.search_toggle, text="交給 git 搜尋整段歷史(作者、訊息、日期、路徑)",
+                bootstyle=(INFO, INVERSE))
+
+        self._build_search_bar(tab)
+
+        wrap = ttk.Frame(tab)
+        wrap.grid(row=2, column=0, sticky=NSEW)
+        wrap.rowconfigure(0, weight=1)
+        wrap.columnconfigure(0, weight=1)
+
+        columns = ("sha", "date", "author", "subject")
+        self.tree = ttk.Treeview(wrap, columns=columns, show="headings", height=10,
+                                 selectmode=EXTENDED, bootstyle=PRIMARY)
+        for col, title, width, anchor, stretch in (
+                ("sha", "SHA", 90, W, False),
+                ("date", "日期", 130, W, False),
+                ("author", "作者", 130, W, False),
+                ("subject", "標題", 420, W, True)):
+            self.tree.heading(col, text=title, anchor=W)
+            self.tree.column(col, width=width, anchor=anchor, stretch=stretch)
+        self.tree.grid(row=0, column=0, sticky=NSEW)
+
+        vbar = ttk.Scrollbar(wrap, orient=VERTICAL, bootstyle=ROUND)
+        vbar.grid(row=0, column=1, sticky=NS)
+        self.commit_view = CommitWindow(
+            self.tree, vbar, lambda sha: self._commit_rows[sha][1:],
+            on_select=self._update_selection_hint, on_scroll=self._maybe_load_more,
+            on_open=self._show_commit_detail)
+
+        self.select_hint = ttk.Label(
+            tab, text="可用 Ctrl / Shift 複選;連按兩下可查看完整 commit 訊息",
+            style="Muted.TLabel")
+        self.select_hint.grid(row=3, column=0, sticky=W, pady=(8, 0))
+        return tab
+
+    def _build_search_bar(self, master):
+        self.search_bar = ttk.Frame(master)
+        self.search_bar.grid(row=1, column=0, sticky=EW, pady=(0, 10))
+        self.search_vars = {}
+        for col, (key, label, width, tip) in enumerate((
+                ("author", "作者", 12, "作者名稱或 email,可用正規表示式"),
+                ("grep", "訊息", 18, "比對完整 commit 訊息的正規表示式,不分大小寫"),
+                ("since", "從", 11, "例如 2021-03-01 或 3 years ago"),
+                ("until", "到", 11, "例如 2022-12-31 或 1 year ago"),
+                ("paths", "路徑", 18, "只列出改到這些路徑的 commit;"
+                                     "多個用 ; 分隔,可用 *.c 這類萬用字元"))):
+            ttk.Label(self.search_bar, text=label).grid(
+                row=0, column=col * 2, padx=(0 if col == 0 else 10, 4))
+            var = tk.StringVar()
+            entry = ttk.Entry(self.search_bar, textvariable=var, width=width)
+            entry.grid(row=0, column=col * 2 + 1)
+            entry.bind("<Return>", lambda e: self._run_search())
+            ToolTip(entry, text=tip, bootstyle=(INFO, INVERSE))
+            self.search_vars[key] = var
+        ttk.Button(self.search_bar, text="搜尋歷史", bootstyle=SUCCESS,
+                   command=self._run_search).grid(row=0, column=10, padx=(12, 0))
+        ttk.Button(self.search_bar, text="清除", bootstyle=(OUTLINE, SECONDARY),
+                   command=self._clear_search).grid(row=0, column=11, padx=(6, 0))
+        self.search_bar.grid_remove()
+
+    def _build_manual_tab(self, master):
+        tab = ttk.Frame(master, padding=12)
+        tab.rowconfigure(2, weight=1)
+        tab.columnconfigure(0, weight=1)
+
+        ttk.Label(tab, text="輸入一或多筆 commit SHA / 分支 / tag,以空白、逗號或換行分隔:",
+                  style="Muted.TLabel").grid(row=0, column=0, sticky=W, pady=(0, 8))
+
+        wrap = ttk.Frame(tab)
+        wrap.grid(row=1, column=0, sticky=NSEW)
+        wrap.rowconfigure(0, weight=1)
+        wrap.columnconfigure(0, weight=1)
+
+        self.sha_text = tk.Text(wrap, height=6, wrap="word", relief=FLAT,
+                                font=(self.mono_font, 10), padx=10, pady=8)
+        self.sha_text.grid(row=0, column=0, sticky=NSEW)
+        sbar = ttk.Scrollbar(wrap, orient=VERTICAL, command=self.sha_text.yview,
+                             bootstyle=ROUND)
+        sbar.grid(row=0, column=1, sticky=NS)
+        self.sha_text.configure(yscrollcommand=sbar.set)
+        return tab
+
+    def _build_dirty_tab(self, master):
+        tab = ttk.Frame(master, padding=12)
+        tab.rowconfigure(2, weight=1)
+        tab.columnconfigure(0, weight=1)
+
+        bar = ttk.Frame(tab)
+        bar.grid(row=0, column=0, sticky=EW, pady=(0, 8))
+        bar.columnconfigure(0, weight=1)
+        ttk.Label(bar, text="直接匯出工作區中尚未 commit 的變更(含已 staged 的內容)",
+                  style="Muted.TLabel").grid(row=0, column=0, sticky=W)
+        ttk.Button(bar, text="重新檢查", bootstyle=(OUTLINE, INFO),
+                   command=self._refresh_dirty).grid(row=0, column=1)
+
+        wrap = ttk.Frame(tab)
+        wrap.grid(row=1, column=0, sticky=NSEW)
+        wrap.rowconfigure(0, weight=1)
+        wrap.columnconfigure(0, weight=1)
+
+        self.dirty_text = tk.Text(wrap, wrap="none", relief=FLAT, state=DISABLED,
+                                  font=(self.mono_font, 10), padx=10, pady=8)
+        self.dirty_text.grid(row=0, column=0, sticky=NSEW)
+        dbar = ttk.Scrollbar(wrap, orient=VERTICAL, command=self.dirty_text.yview,
+                             bootstyle=ROUND)
+        dbar.grid(row=0, column=1, sticky=NS)
+        self.dirty_text.configure(yscrollcommand=dbar.set)
+        return tab
+
+    def _build_side_column(self, master):
+        col = ttk.Frame(master)
+        col.columnconfigure(0, weight=1)
+
+        out = ttk.Labelframe(col, text=" ③ 輸出資料夾 ", padding=12)
+        out.grid(row=0, column=0, sticky=EW)
+        out.columnconfigure(0, weight=1)
+
+        out.columnconfigure(1, weight=1)
+        self.out_var = tk.StringVar()
+        self.out_box = ttk.Combobox(out, textvariable=self.out_var,
+                                    values=self.out_history, font=(self.mono_font, 10))
+        self.out_box.grid(row=0, column=0, columnspan=3, sticky=EW)
+        ToolTip(self.out_box, text="可直接輸入,或從下拉選單挑選用過的輸出資料夾",
+                bootstyle=(INFO, INVERSE))
+
+        ttk.Button(out, text="瀏覽…", bootstyle=(OUTLINE, PRIMARY),
+                   command=self._browse_output).grid(row=1, column=0, sticky=EW,
+                                                     pady=(8, 0), padx=(0, 4))
+        ttk.Button(out, text="開啟資料夾", bootstyle=(OUTLINE, INFO),
+                   command=self._open_output).grid(row=1, column=1, sticky=EW,
+                                                   pady=(8, 0), padx=(0, 4))
+        forget = ttk.Button(out, text="✕", bootstyle=(OUTLINE, DANGER), width=3,
+                            command=lambda: self._forget_path("out"))
+        forget.grid(row=1, column=2, sticky=E, pady=(8, 0))
+        ToolTip(forget, text="把目前路徑從歷史紀錄中移除", bootstyle=(INFO, INVERSE))
+
+        opt = ttk.Labelframe(col, text=" ④ 選項 ", padding=12)
+        opt.grid(row=1, column=0, sticky=EW, pady=(12, 0))
+        opt.columnconfigure(0, weight=1)
+
+        self.opt_overwrite = tk.BooleanVar(value=False)
+        self.opt_patch = tk.BooleanVar(value=True)
+        self.opt_sha_suffix = tk.BooleanVar(value=False)
+        self.opt_untracked = tk.BooleanVar(value=True)
+        self.opt_auto_open = tk.BooleanVar(value=False)
+        self.opt_shared_store = tk.BooleanVar(value=False)
+        self.opt_link_worktree = tk.BooleanVar(value=False)
+        self.opt_profile = tk.BooleanVar(value=False)
+
+        for row, (var, text, tip) in enumerate((
+                (self.opt_overwrite, "覆蓋已存在的輸出資料夾",
+                 "關閉時會略過同名資料夾。開啟時只會覆蓋本工具產生的資料夾"),
+                (self.opt_patch, "同時輸出 changes.patch",
+                 "以 git diff 產生 unified diff 檔"),
+                (self.opt_sha_suffix, "資料夾名稱加上短 SHA",
+                 "避免同日期、同標題的 commit 互相衝突"),
+                (self.opt_untracked, "未提交模式包含未追蹤檔案",
+                 "把 untracked 檔案一併複製到 MOD"),
+                (self.opt_shared_store, "共用 blob 快取(連結輸出)",
+                 f"同一份檔案只讀取、寫入一次,存在輸出資料夾的 {BLOB_STORE_DIR};"
+                 "ORG / MOD 改為連結到快取,直接修改會影響其他匯出"),
+                (self.opt_link_worktree, "未提交模式以硬連結輸出 MOD",
+                 "不支援 reflink 的磁碟上改用硬連結,不佔空間也不需複製;"
+                 "MOD 檔案與工作區是同一個檔案,修改任一邊兩邊都會變"),
+                (self.opt_profile, "效能剖析(cProfile + tracemalloc)",
+                 f"把這次匯出的 .prof 與記憶體配置排行存到輸出資料夾的 {EXPORT_LOG_DIR},"
+                 "可附在效能問題回報裡;匯出會明顯變慢"),
+                (self.opt_auto_open, "完成後自動開啟輸出資料夾", None))):
+            cb = ttk.Checkbutton(opt, text=text, variable=var,
+                                 bootstyle="round-toggle")
+            cb.grid(row=row, column=0, sticky=W, pady=4)
+            if tip:
+                ToolTip(cb, text=tip, bootstyle=(INFO, INVERSE))
+
+        merge = ttk.Labelframe(col, text=" ⑤ 選多筆 commit 時 ", padding=12)
+        merge.grid(row=2, column=0, sticky=EW, pady=(12, 0))
+        merge.columnconfigure(0, weight=1)
+
+        self.merge_mode = tk.StringVar(value="separate")
+        for row, (value, text, tip) in enumerate((
+                ("separate", "分開匯出(每筆一個資料夾)",
+                 "選幾筆就產生幾個資料夾,各自是該 commit 的變更"),
+                ("merged", "合併成一包(整段總變更)",
+                 "把連續的 commit 當成一次修改：ORG 是最舊 commit 之前的版本,"
+                 "MOD 是最新 commit 之後的版本,中間過程會被壓平"))):
+            rb = ttk.Radiobutton(merge, text=text, value=value,
+                                 variable=self.merge_mode, bootstyle=PRIMARY,
+                                 command=self._update_selection_hint)
+            rb.grid(row=row, column=0, sticky=W, pady=4)
+            ToolTip(rb, text=tip, bootstyle=(INFO, INVERSE))
+        return col
+
+    def _build_log_card(self, master):
+        card = ttk.Labelframe(master, text=" ⑥ 執行紀錄 ", padding=12)
+        card.rowconfigure(0, weight=1)
+        card.columnconfigure(0, weight=1)
+
+        self.log_text = tk.Text(card, wrap="none", relief=FLAT, state=DISABLED, height=8,
+                                font=(self.mono_font, 10), padx=10, pady=8)
+        self.log_text.grid(row=0, column=0, sticky=NSEW)
+        vbar = ttk.Scrollbar(card, orient=VERTICAL, command=self.log_text.yview,
+                             bootstyle=ROUND)
+        vbar.grid(row=0, column=1, sticky=NS)
+        hbar = ttk.Scrollbar(card, orient=HORIZONTAL, command=self.log_text.xview,
+                             bootstyle=ROUND)
+        hbar.grid(row=1, column=0, sticky=EW)
+        self.log_text.configure(yscrollcommand=vbar.set, xscrollcommand=hbar.set)
+        return card
+
+    def _build_action_bar(self, master):
+        bar = ttk.Frame(master)
+        bar.columnconfigure(0, weight=1)
+
+        self.progress = ttk.Progressbar(bar, mode="determinate",
+                                        bootstyle=(SUCCESS, STRIPED))
+        self.progress.grid(row=0, column=0, sticky=EW, padx=(0, 16))
+
+        self.clear_btn = ttk.Button(bar, text="清除紀錄", bootstyle=(LINK, INFO),
+                                    command=self._clear_log)
+        self.clear_btn.grid(row=0, column=1, padx=(0, 8))
+
+        self.full_log_btn = ttk.Button(bar, text="完整紀錄", bootstyle=(LINK, INFO),
+                                       state=DISABLED, command=self._open_full_log)
+        self.full_log_btn.grid(row=0, column=2, padx=(0, 8))
+        ToolTip(self.full_log_btn, text=f"執行紀錄只保留最近 {LOG_LINES} 行;"
+                f"每次匯出的完整紀錄存在輸出資料夾的 {EXPORT_LOG_DIR}",
+                bootstyle=(INFO, INVERSE))
+
+        self.cancel_btn = ttk.Button(bar, text="取消", bootstyle=(OUTLINE, DANGER),
+                                     width=8, state=DISABLED, command=self._cancel)
+        self.cancel_btn.grid(row=0, column=3, padx=(0, 8))
+
+        self.export_btn = ttk.Button(bar, text="開始匯出", bootstyle=SUCCESS,
+                                     width=14, command=self._start_export)
+        self.export_btn.grid(row=0, column=4)
+        ToolTip(self.export_btn, text="Ctrl + Enter", bootstyle=(INFO, INVERSE))
+        return bar
+
+    def _build_status_bar(self, master):
+        bar = ttk.Frame(master)
+        bar.columnconfigure(0, weight=1)
+        self.status_var = tk.StringVar(value="就緒")
+        ttk.Label(bar, textvariable=self.status_var,
+                  style="Muted.TLabel").grid(row=0, column=0, sticky=W)
+        ttk.Label(bar, text=f"{APP_NAME} v{APP_VERSION}",
+                  style="Muted.TLabel").grid(row=0, column=1, sticky=E)
+        return bar
+
+    # -- appearance --------------------------------------------------------
+    def _apply_palette(self):
+        c = self.style.colors
+        for widget in (self.log_text, self.sha_text, self.dirty_text):
+            widget.configure(background=c.inputbg, foreground=c.inputfg,
+                             insertbackground=c.inputfg,
+                             selectbackground=c.selectbg,
+                             selectforeground=c.selectfg,
+                             highlightthickness=0, borderwidth=0)
+        tags = {
+            "info": c.inputfg,
+            "muted": self._muted_color(),
+            "head": c.primary,
+            "success": c.success,
+            "warning": c.warning,
+            "error": c.danger,
+            "added": c.success,
+            "deleted": c.danger,
+            "modified": c.info,
+            "renamed": c.warning,
+            "untracked": c.success,
+        }
+        for tag, color in tags.items():
+            self.log_text.tag_configure(tag, foreground=color)
+        self.log_text.tag_configure("head", foreground=c.primary,
+                                    font=(self.mono_font, 10, "bold"))
+
+    def _on_theme_change(self, _event=None):
+        name = self.theme_var.get()
+        try:
+            self.style.theme_use(name)
+        except Exception:
+            return
+        self._init_fonts()
+        self._apply_palette()
+
+    # -- repository --------------------------------------------------------
+    def _browse_repo(self):
+        initial = self.repo_var.get().strip() or os.getcwd()
+        path = filedialog.askdirectory(title="選擇 Git 儲存庫", initialdir=initial)
+        if path:
+            self.repo_var.set(os.path.normpath(path))
+
+    def _browse_output(self):
+        initial = self.out_var.get().strip() or os.getcwd()
+        path = filedialog.askdirectory(title="選擇輸出資料夾", initialdir=initial)
+        if path:
+            self.out_var.set(os.path.normpath(path))
+            self._remember_path("out", path)
+
+    # -- path history ------------------------------------------------------
+    def _remember_path(self, kind, path):
+        if kind == "repo":
+            self.repo_history = push_history(self.repo_history, path)
+        else:
+            self.out_history = push_history(self.out_history, path)
+        self._refresh_history()
+
+    def _forget_path(self, kind):
+        box, current = ((self.repo_box, self.repo_var.get())
+                        if kind == "repo" else (self.out_box, self.out_var.get()))
+        current = os.path.normpath(current.strip()) if current.strip() else ""
+        if not current:
+            return
+        keep = [p for p in (self.repo_history if kind == "repo" else self.out_history)
+                if p.lower() != current.lower()]
+        if kind == "repo":
+            self.repo_history = keep
+        else:
+            self.out_history = keep
+        self._refresh_history()
+        box.set("")
+        self.status_var.set(f"已從歷史紀錄移除：{current}")
+
+    def _refresh_history(self):
+        self.repo_box.configure(values=self.repo_history)
+        self.out_box.configure(values=self.out_history)
+
+    def _open_output(self):
+        if not open_folder(self.out_var.get().strip()):
+            Messagebox.show_warning("輸出資料夾不存在", title="開啟失敗", parent=self)
+
+    def _schedule_validate(self):
+        if self._validate_job:
+            self.after_cancel(self._validate_job)
+        self._validate_job = self.after(400, self._validate_repo)
+
+    def _validate_repo(self):
+        """Check the repository path on a worker thread; results come back via queue."""
+        self._validate_job = None
+        path = self.repo_var.get().strip()
+        self.repo_ok = False
+        self._repo_check.cancel()
+        self._repo_check = check = RepoCheck(self._repo_check.seq + 1, path)
+        if not path:
+            self.repo_state.configure(text="尚未選擇儲存庫", style="Muted.TLabel")
+            return
+        self.repo_state.configure(text="… 檢查儲存庫中", style="Muted.TLabel")
+        threading.Thread(target=self._check_repo, args=(check,), daemon=True).start()
+
+    def _check_repo(self, check):
+        try:
+            repo = Repo(check.path, search_parent_directories=False)
+            head = repo.head.commit
+            try:
+                branch = repo.active_branch.name
+            except TypeError:
+                branch = "(detached HEAD)"
+            branches = ["HEAD"] + sorted(b.name for b in repo.branches)
+            if check.cancelled:
+                return
+            self.queue.put(("repo", check, (branch, head.hexsha, branches), None))
+            # The work-tree scan is the slow part on big repositories; it reports
+            # separately so the commit list does not wait for it.
+            try:
+                dirty = check.is_dirty(repo)
+            except Exception:
+                dirty = True    # let the full listing run and report the problem
+            if dirty is not None:
+                self.queue.put(("repo_dirty", check, dirty))
+        except (InvalidGitRepositoryError, NoSuchPathError):
+            self.queue.put(("repo", check, None, "✖ 此路徑不是 Git 儲存庫"))
+        except Exception as e:
+            if not check.cancelled:
+                self.queue.put(("repo", check, None, f"✖ 無法讀取儲存庫：{e}"))
+
+    def _on_repo_checked(self, check, info, err):
+        if check is not self._repo_check:
+            return
+        if err:
+            self.repo_state.configure(text=err, bootstyle=DANGER)
+            return
+        branch, head, branches = info
+        self.repo_ok = True
+        self._repo_summary = f"✓ 分支 {branch} · HEAD {head[:8]}"
+        self.repo_state.configure(text=f"{self._repo_summary} · 檢查工作區…",
+                                  bootstyle=SUCCESS)
+        self._remember_path("repo", check.path)
+        self.branch_box.configure(values=branches)
+        if self.branch_var.get() not in branches:
+            self.branch_var.set("HEAD")
+        self._load_commits()
+
+    def _on_repo_dirty(self, check, dirty):
+        if check is not self._repo_check or not self.repo_ok:
+            return
+        self.repo_state.configure(
+            text=f"{self._repo_summary} · {'有未提交變更' if dirty else '工作區乾淨'}",
+            bootstyle=SUCCESS)
+        # A clean tree needs no listing: the check that proved it clean was the scan.
+        if dirty:
+            self._refresh_dirty()
+        else:
+            self._set_dirty_text("工作區沒有未提交的變更。")
+            self._worktree_status = (None, None)
+
+    # -- commit list -------------------------------------------------------
+    # -- history search ----------------------------------------------------
+    def _toggle_search_bar(self):
+        if self.search_bar.winfo_ismapped():
+            self.search_bar.grid_remove()
+            self.search_toggle.configure(text="進階搜尋 ▾")
+            if self._search:
+                self._clear_search()
+        else:
+            self.search_bar.grid()
+            self.search_toggle.configure(text="進階搜尋 ▴")
+
+    def _run_search(self):
+        """Replace the list with the commits git finds for the search fields."""
+        fields = {key: var.get().strip() for key, var in self.search_vars.items()}
+        paths = tuple(p.strip() for p in fields.pop("paths").split(";") if p.strip())
+        search = {key: value for key, value in fields.items() if value}
+        if paths:
+            search["paths"] = paths
+        self._search = search or None
+        self._load_commits()
+
+    def _clear_search(self):
+        for var in self.search_vars.values():
+            var.set("")
+        if self._search:
+            self._search = None
+            self._load_commits()
+
+    def _page_size(self):
+        try:
+            return int(self.limit_var.get())
+        except ValueError:
+            return 100
+
+    def _load_commits(self):
+        """Start the commit list over from the tip of the selected branch."""
+        if not self.repo_ok:
+            return
+        path = self.repo_var.get().strip()
+        rev = self.branch_var.get() or "HEAD"
+        search = self._search
+        if self._pager is not None:
+            self._pager.close()
+        self._log_seq += 1
+        self._pager = None
+        self._pager_busy = True
+        self.status_var.set("搜尋歷史中…" if search else "載入 commit 清單…")
+        threading.Thread(target=self._fetch_page, daemon=True,
+                         args=(self._log_seq, self._page_size(), None,
+                               lambda: CommitPager(path, rev, search))).start()
+
+    def _load_more(self):
+        """Fetch the next page of older commits, unless one is on its way."""
+        pager = self._pager
+        if pager is None or pager.done or self._pager_busy:
+            return
+        self._pager_busy = True
+        self._show_loaded_status(" · 載入更多…")
+        threading.Thread(target=self._fetch_page, daemon=True,
+                         args=(self._log_seq, self._page_size(), pager)).start()
+
+    def _fetch_page(self, seq, size, pager, open_pager=None):
+        """Worker: one page from pager (or a new one from open_pager) into the queue."""
+        rows, err = [], None
+
+        def flush(part):
+            self.queue.put(("commits", seq, pager, part, None, False))
+
+        try:
+            if pager is None:
+                pager = open_pager()
+            rows = pager.next_page(size, flush)
+        except Exception as e:
+            err = str(e)
+        if pager is not None and pager.closed:
+            pager.close()
+        self.queue.put(("commits", seq, pager, rows, err, True))
+
+    def _refresh_commits(self):
+        """F5: put commits made since the last load on top, without reloading the rest.
+
+        Falls back to a full reload when the branch changed, or was rewritten so the
+        old tip is no longer part of it.
+        """
+        if not self.repo_ok:
+            return
+        pager = self._pager
+        rev = self.branch_var.get() or "HEAD"
+        if (pager is None or pager.rev != rev or pager.search != self._search
+                or not self.commits or self._pager_busy):
+            self._load_commits()
+            return
+        path = self.repo_var.get().strip()
+        top = self.commits[0][0]
+        self._pager_busy = True
+        seq = self._log_seq
+
+        def work():
+            rows, err = None, None
+            try:
+                repo = Repo(path)
+                if repo.is_ancestor(top, rev):
+                    args = search_log_args(pager.search) if pager.search else {}
+                    rows = [self._commit_row(e)
+                            for e in iter_log(repo, rev, f"^{top}", **args)]
+                    if rows and not pager.search:
+                        cache_commits(path, repo.commit(rev).hexsha)
+            except Exception as e:
+                err = str(e)
+            self.queue.put(("commits_new", seq, rows, err))
+
+        threading.Thread(target=work, daemon=True).start()
+
+    @staticmethod
+    def _commit_row(entry):
+        return (entry.sha, entry.sha[:8],
+                datetime.fromtimestamp(entry.date).strftime("%Y-%m-%d %H:%M"),
+                entry.author, entry.subject)
+
+    def _maybe_load_more(self):
+        # Near the bottom (or everything fits): time for the next page. Also asked
+        # after a load or a filter, since a page the filter hid entirely does not
+        # move the view.
+        if self.commit_view.near_end():
+            self._load_more()
+
+    def _add_rows(self, rows, at_top=False):
+        """Index newly loaded rows and show those the current search lets through."""
+        rows = [row for row in rows if row[0] not in self._commit_rows]
+        for row in rows:
+            full_sha, _short, _date, author, subject = row
+            self._commit_rows[full_sha] = row
+            self._search_keys[full_sha] = f"{full_sha} {author} {subject}".lower()
+        query = self._filter_query
+        matched = [row[0] for row in rows if query in self._search_keys[row[0]]]
+        self.commit_view.add(matched, at_top)
+        self._update_selection_hint()
+        return rows
+
+    def _reset_rows(self, rows):
+        self._commit_rows.clear()
+        self._search_keys.clear()
+        self.commit_view.reset()
+        return self._add_rows(rows)
+
+    def _schedule_filter(self):
+        # Typing fast re-filters once, after the last keystroke.
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(150, self._apply_filter)
+
+    def _apply_filter(self):
+        """Show the loaded commits matching the search box.
+
+        Matching runs against a lowercase index built once per row. A query that
+        contains the previous one can only narrow it, so then just the rows shown
+        are re-checked. The widget only redraws its visible lines either way.
+        """
+        self._filter_job = None
+        query = self.filter_var.get().strip().lower()
+        keys = self._search_keys
+        view = self.commit_view
+        narrowing = self._filter_query in query
+        candidates = view.rows if narrowing else [row[0] for row in self.commits]
+        view.set_rows([sha for sha in candidates if query in keys[sha]])
+        self._filter_query = query
+        self._update_selection_hint()
+        self.after_idle(self._maybe_load_more)
+
+    def _update_selection_hint(self):
+        shown = len(self.commit_view.rows)
+        picked = len(self.commit_view.picked)
+        if picked > 1:
+            tail = (" · 合併成 1 包匯出" if self.merge_mode.get() == "merged"
+                    else f" · 分開匯出成 {picked} 個資料夾")
+        elif picked:
+            tail = ""
+        else:
+            tail = " · 可用 Ctrl / Shift 複選,連按兩下看完整訊息"
+        self.select_hint.configure(text=f"顯示 {shown} 筆 · 已選取 {picked} 筆{tail}")
+
+    def _show_commit_detail(self, sha):
+        if not self.repo_ok:
+            return
+        try:
+            commit = Repo(self.repo_var.get().strip()).commit(sha)
+        except Exception as e:
+            self._append_log(f"✖ 無法讀取 commit：{e}", "error")
+            return
+        self._append_log(f"── {commit.hexsha}", "head")
+        self._append_log(f"   作者 : {commit.author.name} <{commit.author.email}>", "muted")
+        self._append_log(
+            f"   時間 : {datetime.fromtimestamp(commit.committed_date):%Y-%m-%d %H:%M:%S}",
+            "muted")
+        for line in (commit.message or "").strip().splitlines():
+            self._append_log(f"   {line}", "info")
+
+    # -- uncommitted -------------------------------------------------------
+    def _refresh_dirty(self):
+        if not self.repo_ok:
+            return
+        path = self.repo_var.get().strip()
+        previous_path, previous = self._worktree_status
+
+        def work():
+            status = None
+            try:
+                repo = Repo(path)
+                # One status pass tells whether the last listing still holds; only
+                # a changed tree pays for the full listing again.
+                if previous is not None and previous_path == path and previous.is_current(repo):
+                    status = previous
+                else:
+                    status = WorkTreeStatus(repo)
+                lines = [f"{'[' + c[0] + ']':<12}{c[1]}" for c in status.changes]
+                text = "\n".join(lines) if lines else "工作區沒有未提交的變更。"
+                text = f"共 {len(lines)} 個檔案\n\n" + text if lines else text
+            except Exception as e:
+                text = f"無法讀取工作區狀態：{e}"
+            self.queue.put(("dirty", text, path, status))
+
+        threading.Thread(target=work, daemon=True).start()
+
+    # -- export ------------------------------------------------------------
+    def _collect_targets(self):
+        """Return (mode, targets) based on the active tab, or (None, None)."""
+        idx = self.tabs.index(self.tabs.select())
+        if idx == 0:
+            picked = list(self.commit_view.picked)
+            if not picked:
+                Messagebox.show_warning("請先在清單中選擇至少一筆 commit",
+                                        title="尚未選取", parent=self)
+                return None, None
+            order = {row[0]: i for i, row in enumerate(self.commits)}
+            picked.sort(key=lambda s: order.get(s, 0))
+            return "commit", picked
+        if idx == 1:
+            raw = self.sha_text.get("1.0", END).strip()
+            targets = [s for s in re.split(r"[\s,;]+", raw) if s]
+            if not targets:
+                Messagebox.show_warning("請輸入至少一筆 commit SHA",
+                                        title="欄位未填", parent=self)
+                return None, None
+            return "commit", targets
+        return "worktree", [None]
+
+    def _start_export(self):
+        if self.worker and self.worker.is_alive():
+            return
+        repo_path = self.repo_var.get().strip()
+        out_path = self.out_var.get().strip()
+
+        if not self.repo_ok:
+            Messagebox.show_error("請先選擇有效的 Git 儲存庫", title="錯誤", parent=self)
+            return
+        if not out_path:
+            Messagebox.show_error("請選擇輸出資料夾", title="錯誤", parent=self)
+            return
+        if not os.path.isdir(out_path):
+            try:
+                os.makedirs(out_path, exist_ok=True)
+                self._append_log(f"ℹ 已建立輸出資料夾：{out_path}", "muted")
+            except Exception as e:
+                Messagebox.show_error(f"無法建立輸出資料夾：{e}", title="錯誤", parent=self)
+                return
+
+        mode, targets = self._collect_targets()
+        if not targets:
+            return
+        selection = None
+        if mode == "commit" and len(targets) > 1 and self.merge_mode.get() == "merged":
+            selection = self._confirm_merge(repo_path, targets)
+            if selection is None:
+                return
+            mode = "range"
+        self._remember_path("out", out_path)
+
+        options = {
+            "overwrite": self.opt_overwrite.get(),
+            "with_patch": self.opt_patch.get(),
+            "name_with_sha": self.opt_sha_suffix.get(),
+            "include_untracked": self.opt_untracked.get(),
+            "shared_store": self.opt_shared_store.get(),
+            "link_worktree": self.opt_link_worktree.get(),
+            "profile": self.opt_profile.get(),
+        }
+        self.cancel_event.clear()
+        self._set_running(True)
+        log_path = os.path.join(out_path, EXPORT_LOG_DIR,
+                                datetime.now().strftime("%Y-%m-%d_%H%M%S") + ".log")
+        try:
+            self._reporter = BufferedReporter(self.cancel_event, LOG_LINES, log_path)
+        except OSError as e:
+            self._append_log(f"⚠ 無法建立完整紀錄檔：{e}", "warning")
+            self._reporter = BufferedReporter(self.cancel_event, LOG_LINES)
+        self.worker = threading.Thread(
+            target=self._run_export, daemon=True,
+            args=(self._reporter, repo_path, out_path, mode, targets, options, selection))
+        self.worker.start()
+
+    def _confirm_merge(self, repo_path, targets):
+        """Pre-flight for merged export: same line of history? any commit in between?
+
+        Returns the MergeSelection to hand to the export, or None to abort.
+        """
+        try:
+            repo = Repo(repo_path)
+            commits, revs = resolve_commits(repo, targets)
+            selection = analyze_merge_selection(repo, commits, revs)
+            oldest, newest, contiguous, covered, outside = selection
+            if outside:
+                Messagebox.show_error(
+                    "選取的 commit 不在同一條線上(分屬不同分支),無法合併成一包。\n"
+                    "請改用「分開匯出」,或只選同一條路徑上的 commit。",
+                    title="無法合併", parent=self)
+                return None
+        except Exception as e:
+            Messagebox.show_error(f"無法分析選取的 commit：{e}", title="錯誤", parent=self)
+            return None
+
+        if contiguous and covered == len(commits):
+            return selection
+        extra = max(covered - len(commits), 0)
+        answer = Messagebox.show_question(
+            f"選取的 {len(commits)} 筆 commit 並不連續。\n\n"
+            f"{oldest.hexsha[:8]} → {newest.hexsha[:8]} 這段範圍實際包含 {covered} 筆 commit,"
+            f"其中 {extra} 筆並未被選取,\n它們的變更也會一併被合併進來。\n\n要繼續嗎?",
+            title="選取的 commit 不連續", parent=self,
+            buttons=["取消:secondary", "繼續合併:success"])
+        return selection if answer == "繼續合併" else None
+
+    def _run_export(self, reporter, repo_path, out_path, mode, targets, options,
+                    selection=None):
+        results = []
+        status_path, worktree_status = self._worktree_status
+        if status_path != repo_path:
+            worktree_status = None
+        try:
+            repo = Repo(repo_path)
+            # The profile sits beside the full log and shares its name.
+            name = (reporter.log_path
+                    and os.path.splitext(os.path.basename(reporter.log_path))[0])
+            with profile_export(out_path, reporter, enabled=options["profile"] or None,
+                                name=name):
+                if mode == "range":
+                    self.queue.put(("status", f"合併匯出 {len(targets)} 筆 commit…"))
+                    stats = extract_commit_range(
+                        repo, targets, out_path, reporter,
+                        overwrite=options["overwrite"],
+                        with_patch=options["with_patch"],
+                        name_with_sha=options["name_with_sha"],
+                        shared_store=options["shared_store"],
+                        selection=selection)
+                    if stats:
+                        results.append(stats)
+                else:
+                    index = ExportIndex(out_path, repo)
+                    total = len(targets)
+                    try:
+                        for i, target in enumerate(targets, 1):
+                            if reporter.cancelled:
+                                break
+                            self.queue.put(("status", f"處理中 {i}/{total}"))
+                            if mode == "worktree":
+                                stats = extract_working_tree(
+                                    repo, out_path, reporter,
+                                    overwrite=options["overwrite"],
+                                    with_patch=options["with_patch"],
+                                    include_untracked=options["include_untracked"],
+                                    shared_store=options["shared_store"],
+                                    status=worktree_status,
+                                    link_worktree=options["link_worktree"])
+                            else:
+                                stats = extract_commit_indexed(
+                                    repo, target, out_path, reporter, index,
+                                    overwrite=options["overwrite"],
+                                    with_patch=options["with_patch"],
+                                    name_with_sha=options["name_with_sha"],
+                                    shared_store=options["shared_store"])
+                            if stats:
+                                results.append(stats)
+                    finally:
+                        # Commits exported before an error still count next time.
+                        index.save()
+        except Exception as e:
+            reporter.log(f"✖ 執行失敗：{e}", "error")
+        self.queue.put(("done", results, self.cancel_event.is_set()))
+
+    def _cancel(self):
+        self.cancel_event.set()
+        self.status_var.set("取消中…")
+
+    def _set_running(self, running):
+        state = DISABLED if running else NORMAL
+        self.export_btn.configure(state=state)
+        self.cancel_btn.configure(state=NORMAL if running else DISABLED)
+        if running:
+            self.progress.configure(value=0)
+            self.status_var.set("開始匯出…")
+
+    # -- queue / log -------------------------------------------------------
+    def _drain_queue(self):
+        self._flush_reporter()
+        try:
+            while True:
+                msg = self.queue.get_nowait()
+                kind = msg[0]
+                if kind == "status":
+                    self.status_var.set(msg[1])
+                elif kind == "repo":
+                    self._on_repo_checked(msg[1], msg[2], msg[3])
+                elif kind == "repo_dirty":
+                    self._on_repo_dirty(msg[1], msg[2])
+                elif kind == "commits":
+                    self._on_commits_loaded(*msg[1:])
+                elif kind == "commits_new":
+                    self._on_new_commits(msg[1], msg[2], msg[3])
+                elif kind == "dirty":
+                    self._set_dirty_text(msg[1])
+                    # Reused by the export while WorkTreeStatus.is_current holds.
+                    self._worktree_status = (msg[2], msg[3])
+                elif kind == "done":
+                    # Lines logged just before the worker finished come first.
+                    self._flush_reporter()
+                    self._reporter.close()
+                    if self._reporter.log_path:
+                        self._full_log = self._reporter.log_path
+                        self.full_log_btn.configure(state=NORMAL)
+                    self._reporter = None
+                    self._on_done(msg[1], msg[2])
+        except queue.Empty:
+            pass
+        self.after(80, self._drain_queue)
+
+    def _on_commits_loaded(self, seq, pager, rows, err, final):
+        if seq != self._log_seq:
+            if pager is not None and final:
+                pager.close()
+            return
+        if final:
+            self._pager_busy = False
+        if err:
+            self.status_var.set("載入 commit 失敗")
+            self._append_log(f"✖ 載入 commit 清單失敗：{err}", "error")
+            return
+        rows = [self._commit_row(e) for e in rows]
+        if pager is not self._pager:
+            # First rows of a new load.
+            self._pager = pager
+            self.commits = self._reset_rows(rows)
+        else:
+            self.commits.extend(self._add_rows(rows))
+        self._show_loaded_status("" if final else " · 搜尋中…")
+        if final:
+            self.after_idle(self._maybe_load_more)
+
+    def _on_new_commits(self, seq, rows, err):
+        if seq != self._log_seq:
+            return
+        self._pager_busy = False
+        if err:
+            self.status_var.set("載入 commit 失敗")
+            self._append_log(f"✖ 載入 commit 清單失敗：{err}", "error")
+            return
+        if rows is None:
+            self._load_commits()
+            return
+        rows = self._add_rows(rows, at_top=True)
+        self.commits[:0] = rows
+        self._show_loaded_status(f" · 新增 {len(rows)} 筆" if rows else " · 沒有新的 commit")
+
+    def _show_loaded_status(self, extra=""):
+        more = "" if self._pager is None or self._pager.done else " · 捲到底部載入更多"
+        found = (f"找到 {len(self.commits)} 筆符合的 commit" if self._search
+                 else f"已載入 {len(self.commits)} 筆 commit")
+        self.status_var.set(f"{found}{extra}{more}")
+
+    def _set_dirty_text(self, text):
+        self.dirty_text.configure(state=NORMAL)
+        self.dirty_text.delete("1.0", END)
+        self.dirty_text.insert("1.0", text)
+        self.dirty_text.configure(state=DISABLED)
+
+    def _on_done(self, results, cancelled):
+        self._set_running(False)
+        files = sum(r["files"] for r in results)
+        failed = sum(r["failed"] for r in results)
+        if cancelled:
+            summary = f"已取消 · 完成 {len(results)} 筆 / {files} 個檔案"
+            tag = "warning"
+        elif results:
+            summary = f"完成 {len(results)} 筆 · 共 {files} 個檔案" + \
+                      (f" · 失敗 {failed}" if failed else "")
+            tag = "success"
+        else:
+            summary = "沒有任何輸出"
+            tag = "warning"
+        self.progress.configure(value=self.progress.cget("maximum") if results else 0)
+        self.status_var.set(summary)
+        self._append_log(f"═ {summary}", tag)
+        if results and self.opt_auto_open.get():
+            open_folder(self.out_var.get().strip())
+
+    def _flush_reporter(self):
+        """Show what the running export logged since the last tick, in one go."""
+        if self._reporter is None:
+            return
+        lines, dropped, progress = self._reporter.take()
+        if dropped:
+            lines.insert(0, (f"… 紀錄過多,略過 {dropped} 行", "muted"))
+        if lines:
+            self._append_lines(lines)
+        if progress is not None:
+            done, total = progress
+            self.progress.configure(maximum=max(total, 1), value=done)
+
+    def _append_log(self, message, tag="info"):
+        self._append_lines([(message, tag)])
+
+    def _append_lines(self, lines):
+        """Append (message, tag) lines with a single insert, then trim to LOG_LINES."""
+        args = []
+        for message, tag in lines[-LOG_LINES:]:
+            args += (message + "\n", tag)
+        self.log_text.configure(state=NORMAL)
+        self.log_text.insert(END, *args)
+        excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - LOG_LINES
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+        self.log_text.see(END)
+        self.log_text.configure(state=DISABLED)
+
+    def _open_full_log(self):
+        if not open_file(self._full_log):
+            Messagebox.show_warning("找不到完整紀錄檔,可能已被刪除",
+                                    title="開啟失敗", parent=self)
+
+    def _clear_log(self):
+        self.log_text.configure(state=NORMAL)
+        self.log_text.delete("1.0", END)
+        self.log_text.configure(state=DISABLED)
+        self.progress.configure(value=0)
+        self.status_var.set("就緒")
+
+    # -- config ------------------------------------------------------------
+    def _restore_config(self):
+        cfg = self.config_data
+        self.repo_var.set(cfg.get("git", ""))
+        self.out_var.set(cfg.get("out", ""))
+        self.sha_text.insert("1.0", cfg.get("sha", ""))
+        self.branch_var.set(cfg.get("branch", "HEAD"))
+        if cfg.get("limit") in COMMIT_LIMITS:
+            self.limit_var.set(cfg["limit"])
+        opts = cfg.get("options", {})
+        self.opt_overwrite.set(bool(opts.get("overwrite", False)))
+        self.opt_patch.set(bool(opts.get("with_patch", True)))
+        self.opt_sha_suffix.set(bool(opts.get("name_with_sha", False)))
+        self.opt_untracked.set(bool(opts.get("include_untracked", True)))
+        self.opt_auto_open.set(bool(opts.get("auto_open", False)))
+        self.opt_shared_store.set(bool(opts.get("shared_store", False)))
+        self.opt_link_worktree.set(bool(opts.get("link_worktree", False)))
+        self.opt_profile.set(bool(opts.get("profile", False)))
+        if opts.get("merge_mode") in ("separate", "merged"):
+            self.merge_mode.set(opts["merge_mode"])
+        size = cfg.get("size")
+        if isinstance(size, str) and re.fullmatch(r"\d+x\d+", size):
+            self.geometry(size)
+
+    def _on_close(self):
+        repo_history = push_history(self.repo_history, self.repo_var.get())
+        out_history = push_history(self.out_history, self.out_var.get())
+        save_config({
+            "git": self.repo_var.get().strip(),
+            "out": self.out_var.get().strip(),
+            "repo_history": repo_history,
+            "out_history": out_history,
+            "sha": self.sha_text.get("1.0", END).strip(),
+            "branch": self.branch_var.get(),
+            "limit": self.limit_var.get(),
+            "theme": self.style.theme.name,
+            "size": f"{self.winfo_width()}x{self.winfo_height()}",
+            "options": {
+                "overwrite": self.opt_overwrite.get(),
+                "with_patch": self.opt_patch.get(),
+                "name_with_sha": self.opt_sha_suffix.get(),
+                "include_untracked": self.opt_untracked.get(),
+                "auto_open": self.opt_auto_open.get(),
+                "shared_store": self.opt_shared_store.get(),
+                "link_worktree": self.opt_link_worktree.get(),
+                "profile": self.opt_profile.get(),
+                "merge_mode": self.merge_mode.get(),
+            },
+        })
+        self.cancel_event.set()
+        self._repo_check.cancel()
+        if self._pager is not None:
+            self._pager.close()
+        self.destroy()
+
+
+def run_gui():
+    GitExportApp().mainloop()
+
+
+if __name__ == "__main__":
+    run_gui()